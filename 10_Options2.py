@@ -1,5 +1,10 @@
+# region imports
+from AlgorithmImports import *
 from datetime import timedelta
 from QuantConnect.Data.Custom.CBOE import *
+from OptionSelection import *
+from RollingExtrema import *
+# endregion
 
 class OptionChainProviderPutProtection(QCAlgorithm):
 
@@ -28,6 +33,7 @@ class OptionChainProviderPutProtection(QCAlgorithm):
         self.rank = 0                    # VIX percentile rank indicator
         self.contract = str()           # stores current put contract symbol
         self.contractsAdded = set()     # avoid repeated subscription
+        self.contractLists = DailyContractLists(self)   # provider lists, fetched once a day
 
         # --------------------------------------------------------------
         # User Parameters / Strategy Inputs
@@ -56,6 +62,18 @@ class OptionChainProviderPutProtection(QCAlgorithm):
             self.VIXRank
         )
 
+        # --------------------------------------------------------------
+        # VIX high/low range over the last lookbackIV daily bars:
+        # warmed once from history, then updated by the VIX subscription
+        # --------------------------------------------------------------
+        self.vixRange = RollingRank("VIXRank", self.lookbackIV)
+        history = self.History(CBOE, self.vix, self.lookbackIV, Resolution.Daily)
+        if not history.empty:
+            bars = history.loc[self.vix]
+            self.vixRange.UpdateMany(bars["high"].values, bars["low"].values, bars["close"].values,
+                                     bars.index[-1])
+        self.RegisterIndicator(self.vix, self.vixRange, Resolution.Daily)
+
         # Warm-up period for VIX rank data
         self.SetWarmUp(timedelta(self.lookbackIV)) 
 
@@ -66,12 +84,7 @@ class OptionChainProviderPutProtection(QCAlgorithm):
         #
         # Higher rank = volatility high → hedge more likely
         # --------------------------------------------------------------
-        history = self.History(CBOE, self.vix, self.lookbackIV, Resolution.Daily)
-
-        self.rank = (
-            (self.Securities[self.vix].Price - min(history["low"])) /
-            (max(history["high"]) - min(history["low"]))
-        )
+        self.rank = self.vixRange.Rank(self.Securities[self.vix].Price)
  
  
     def OnData(self, data):
@@ -120,27 +133,17 @@ class OptionChainProviderPutProtection(QCAlgorithm):
         # Manually choose put contract using OptionChainProvider
         # Filter OTM puts near target DTE window
         # --------------------------------------------------------------
-        contracts = self.OptionChainProvider.GetOptionContractList(self.symbol, data.Time)
+        contracts = self.contractLists.Get(self.symbol, data.Time)
         self.underlyingPrice = self.Securities[self.symbol].Price
 
         # Filter:
         # - Put options
         # - Strike slightly below spot (OTM)
         # - Exp near 25 days (±8 days tolerance)
-        otm_puts = [
-            i for i in contracts
-            if i.ID.OptionRight == OptionRight.Put and
-               self.underlyingPrice - i.ID.StrikePrice > self.OTM * self.underlyingPrice and
-               self.DTE - 8 < (i.ID.Date - data.Time).days < self.DTE + 8
-        ]
-
-        if len(otm_puts) > 0:
-            # Sort by DTE proximity then strike
-            contract = sorted(
-                sorted(otm_puts, key=lambda x: abs((x.ID.Date - self.Time).days - self.DTE)),
-                key=lambda x: self.underlyingPrice - x.ID.StrikePrice
-            )[0]
+        # Pick the strike nearest spot, then the expiry nearest 25 days
+        contract = contracts.OutOfTheMoneyPut(data.Time, self.underlyingPrice, self.OTM, self.DTE, 8)
 
+        if contract is not None:
             # Subscribe to option data once
             if contract not in self.contractsAdded:
                 self.contractsAdded.add(contract)
@@ -1,4 +1,8 @@
-from QuantConnect.Indicators import MovingAverageType
+# region imports
+from AlgorithmImports import *
+import numpy as np
+from IndicatorBank import *
+# endregion
 
 class CreativeRedHornet(QCAlgorithm):
 
@@ -31,8 +35,17 @@ class CreativeRedHornet(QCAlgorithm):
             'ENJUSD','PAXUSD'
         ]
 
-        # Create objects for all crypto pairs
-        self.pairs = [CryptoPair(self, ticker, self.minimumVolume) for ticker in universe]
+        # Add every pair from Bitfinex; their RSI(14), BB(20, 2) and 30-day
+        # dollar volume are kept together in one vectorized indicator bank
+        symbols = [self.AddCrypto(ticker, Resolution.Daily, Market.Bitfinex).Symbol for ticker in universe]
+        self.bank = CryptoIndicatorBank(symbols)
+
+        # Liquidate tag per exit reason
+        self.exitTags = {
+            EXIT_VOLUME: "Volume dropped below threshold",
+            EXIT_RSI: "RSI exit condition triggered",
+            EXIT_MIDDLE_BAND: "Price dropped below Bollinger mid-band",
+        }
 
         # Use BTC as benchmark reference
         self.SetBenchmark("BTCUSD")
@@ -41,74 +54,31 @@ class CreativeRedHornet(QCAlgorithm):
         self.SetWarmup(30)
 
     def OnData(self, data):
+        bank = self.bank
 
-        for pair in self.pairs:
-
-            # Indicators must be ready before trading
-            if not pair.rsi.IsReady or not pair.bb.IsReady:
-                continue
-
-            symbol = pair.symbol
-            rsi = pair.rsi.Current.Value
-            price = self.Securities[symbol].Price
-
-            # Retrieve Bollinger values
-            lower = pair.bb.LowerBand.Current.Value
-            upper = pair.bb.UpperBand.Current.Value
-            middle = pair.bb.MiddleBand.Current.Value
-
-            # If position already held, manage exit
-            if self.Portfolio[symbol].Invested:
-
-                # Exit if volume drops
-                if not pair.Investable():
-                    self.Liquidate(symbol, "Volume dropped below threshold")
-                    continue
+        # One vectorized update for all pairs with a bar in this slice
+        bank.Update(data.Bars)
 
-                # Exit if RSI falls below threshold
-                if rsi < self.rsiExitThreshold:
-                    self.Liquidate(symbol, "RSI exit condition triggered")
-                    continue
+        # Exit: held and volume dropped, RSI below the exit level, or price below the middle band
+        # Entry: liquid, RSI overbought AND price breaks above upper band (trend breakout)
+        entry, exit, reason = bank.Signals(self.rsiEntryThreshold, self.rsiExitThreshold, self.minimumVolume)
 
-                # Exit if price closes below middle band (trend weakening)
-                if price < middle:
-                    self.Liquidate(symbol, "Price dropped below Bollinger mid-band")
-                    continue
+        # Only flagged pairs need orders; go through them in universe order
+        # since each order changes the margin left for the next one
+        for i in np.flatnonzero(entry | exit):
+            symbol = bank.symbols[i]
 
-            # Do not enter if coin fails liquidity requirements
-            if not pair.Investable():
+            if exit[i]:
+                self.Liquidate(symbol, self.exitTags[int(reason[i])])
                 continue
 
-            # Entry signal: RSI overbought AND price breaks above upper band (trend breakout)
-            if rsi > self.rsiEntryThreshold and price > upper and self.Portfolio.MarginRemaining > self.positionSizeUSD:
-                quantity = self.positionSizeUSD / price
+            if self.Portfolio.MarginRemaining > self.positionSizeUSD:
+                quantity = self.positionSizeUSD / float(bank.close[i])
                 self.Buy(symbol, quantity)
 
-
-class CryptoPair:
-    """
-    Handles tracking indicators and filtering conditions per asset
-    """
-
-    def __init__(self, algorithm, ticker, minimumVolume):
-        # Add crypto from Bitfinex exchange
-        self.symbol = algorithm.AddCrypto(ticker, Resolution.Daily, Market.Bitfinex).Symbol
-
-        # RSI for momentum measure
-        self.rsi = algorithm.RSI(self.symbol, 14, MovingAverageType.Simple, Resolution.Daily)
-
-        # Bollinger Bands: 20-period SMA, 2 std deviation
-        self.bb = algorithm.BB(self.symbol, 20, 2, MovingAverageType.Simple, Resolution.Daily)
-
-        # 30-day average dollar volume = SMA(volume) * SMA(price)
-        self.volume = IndicatorExtensions.Times(
-            algorithm.SMA(self.symbol, 30, Resolution.Daily, Field.Volume),
-            algorithm.SMA(self.symbol, 30, Resolution.Daily, Field.Close)
-        )
-
-        # Required liquidity threshold
-        self.minimumVolume = minimumVolume
-
-    def Investable(self):
-        # True if average dollar volume exceeds requirement
-        return self.volume.Current.Value > self.minimumVolume
+    def OnOrderEvent(self, orderEvent):
+        # Keep the bank's holdings mask in step with the portfolio
+        if orderEvent.Status == OrderStatus.Filled:
+            i = self.bank.index.get(orderEvent.Symbol)
+            if i is not None:
+                self.bank.held[i] = self.Portfolio[orderEvent.Symbol].Invested
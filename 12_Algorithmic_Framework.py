@@ -1,4 +1,6 @@
 from AlphaModel import *
+from TopKSelection import *
+from FundamentalStore import *
 
 class VerticalTachyonRegulators(QCAlgorithm):  # Define the algorithm class that inherits QCAlgorithm
 
@@ -11,8 +13,17 @@ class VerticalTachyonRegulators(QCAlgorithm):  # Define the algorithm class that
         self.month = 0                 # Track last rebalance month
         self.num_coarse = 500          # Limit coarse universe size to top 500 by volume
 
+        # Top num_coarse by dollar volume among stocks with fundamental data and price above $5
+        self.coarseSelector = TopKSelector(
+            lambda c: c.DollarVolume, self.num_coarse,
+            where=lambda c: c.HasFundamentalData and c.Price > 5, name="Coarse"
+        )
+
         self.UniverseSettings.Resolution = Resolution.Daily  # Apply daily resolution to universe data
 
+        # Columnar fine-fundamental snapshots, reused by later backtests over the same dates
+        self.fundamentalStore = FundamentalStore(self.GetParameter("fundamental_store") or DEFAULT_ROOT)
+
         # Add universe selection with two steps: coarse + fine filters
         self.AddUniverse(self.CoarseSelectionFunction, self.FineSelectionFunction)
 
@@ -46,13 +57,12 @@ class VerticalTachyonRegulators(QCAlgorithm):  # Define the algorithm class that
             return Universe.Unchanged
 
         # Filter: must have fundamental data + price above $5
-        filtered = [c for c in coarse if c.HasFundamentalData and c.Price > 5]
-
-        # Sort stocks by Dollar Volume (liquidity), descending
-        selected = sorted(filtered, key=lambda c: c.DollarVolume, reverse=True)
+        # Then partially sort by Dollar Volume (liquidity), descending, keeping the top N
+        selected = self.coarseSelector.Select(coarse)
+        self.Debug(self.coarseSelector.Summary())  # Track selection cost on each rebalance
 
         # Return only the top N symbols by liquidity
-        return [s.Symbol for s in selected[:self.num_coarse]]
+        return [s.Symbol for s in selected]
 
 
     def FineSelectionFunction(self, fine):  # Second universe filter layer (fundamentals)
@@ -71,14 +81,16 @@ class VerticalTachyonRegulators(QCAlgorithm):  # Define the algorithm class that
         # - Positive Return on Equity (profitable)
         # - Positive Net Margin (profitable)
         # - Positive PE ratio (no weird negative earnings valuation)
-        filtered_fine = [
-            f.Symbol for f in fine
-            if f.SecurityReference.IPODate + timedelta(365*5) < self.Time
-            and f.AssetClassification.MorningstarSectorCode in sectors
-            and f.OperationRatios.ROE.Value > 0
-            and f.OperationRatios.NetMargin.Value > 0
-            and f.ValuationRatios.PERatio > 0
-        ]
+        # One boolean mask over the snapshot's columns instead of reading each fine object
+        snapshot = self.fundamentalStore.Snapshot(self.Time, fine)
+        mask = (
+            (snapshot["ipoDate"] < np.datetime64(self.Time - timedelta(365*5), "us"))
+            & np.isin(snapshot["sector"], sectors)
+            & (snapshot["roe"] > 0)
+            & (snapshot["netMargin"] > 0)
+            & (snapshot["peRatio"] > 0)
+        )
+        filtered_fine = [snapshot.symbols[i] for i in np.flatnonzero(mask)]
 
         # Return final stock list for alpha model to generate signals on
         return filtered_fine
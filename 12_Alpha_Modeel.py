@@ -1,12 +1,22 @@
+from FactorScoring import *
+
 
 class FundamentalFactorAlphaModel(AlphaModel):  # Define a custom alpha model inheriting from QC AlphaModel class
     
-    def __init__(self):  # Constructor runs once when model is created
+    # factors: list of Factor (default ROE, net margin, PE); weights: one per factor (default all 1)
+    # refreshFactors: re-read every member's fundamentals at each rebalance; they change while
+    # a security is held (new filings, and the PE ratio with every price), so only turn it
+    # off if stale values are acceptable
+    def __init__(self, factors=QUALITY_VALUE_FACTORS, weights=None, refreshFactors=True):  # Constructor runs once when model is created
         self.rebalanceTime = datetime.min   # Track next rebalance time, initialize to earliest possible date
-        
-        # Dictionary mapping sectors to sets of securities in those sectors
-        # Example: { Technology: {AAPL, MSFT}, Healthcare: {JNJ, PFE}, ... }
-        self.sectors = {}
+
+        # Columnar rank scorer shared by all sectors
+        self.scorer = FactorScorer(factors, weights)
+        self.refreshFactors = refreshFactors
+
+        # Index of securities by sector, with their factor values as columns
+        # Example: { Technology: [AAPL, MSFT], Healthcare: [JNJ, PFE], ... } plus symbol -> (sector, slot)
+        self.sectors = SectorIndex(self.scorer.factors)
 
 
     def Update(self, algorithm, data):  # Called automatically each time new data arrives
@@ -21,55 +31,32 @@ class FundamentalFactorAlphaModel(AlphaModel):  # Define a custom alpha model in
         
         insights = []  # List to store trading signals (insights)
         
+        # Bring the cached factor columns up to date
+        if self.refreshFactors:
+            self.sectors.Refresh()
+
         # Loop through each sector group in universe
         for sector in self.sectors:
-            securities = self.sectors[sector]  # Get list of securities belonging to this sector
+            securities = self.sectors.Members(sector)  # Get list of securities belonging to this sector
 
-            # Sort securities by fundamental factors:
+            # Nothing left to rank once every member has been removed
+            if not securities:
+                continue
 
+            # Rank every security on each factor and sum the ranks:
             # 1️⃣ Highest Return on Equity (ROE) is better
-            sortedByROE = sorted(
-                securities, 
-                key=lambda x: x.Fundamentals.OperationRatios.ROE.Value, 
-                reverse=True
-            )
-
             # 2️⃣ Highest Net Profit Margin is better
-            sortedByPM = sorted(
-                securities, 
-                key=lambda x: x.Fundamentals.OperationRatios.NetMargin.Value, 
-                reverse=True
-            )
-
             # 3️⃣ Lowest Price-to-Earnings Ratio (more value) is better
-            sortedByPE = sorted(
-                securities, 
-                key=lambda x: x.Fundamentals.ValuationRatios.PERatio, 
-                reverse=False
-            )
-
-            # Dictionary to hold score per security
-            # Lower score = better fundamentals
-            scores = {}
+            # Lower score = better fundamentals; ties keep the sector's slot order
+            scores = self.scorer.ScoreColumns(self.sectors.Columns(sector))
 
-            # Score system: sum of ranks in ROE, PM, PE
-            for security in securities:
-                score = (
-                    sortedByROE.index(security) +
-                    sortedByPM.index(security) +
-                    sortedByPE.index(security)
-                )
-                scores[security] = score  # Store combined score
-            
             # Select **top 20%** fundamentally strongest stocks in each sector
             # Ensure at least **one stock** is selected per sector
-            length = max(int(len(scores) / 5), 1)
+            length = max(int(len(securities) / 5), 1)
 
-            # Sort by score (lower is better) and select top candidates
-            topStocks = sorted(scores.items(), key=lambda x: x[1])[:length]
-
-            for security, score in topStocks:
-                symbol = security.Symbol  # Get symbol object
+            # Lowest scores first, then select top candidates
+            for i in TopByScore(scores, length):
+                symbol = securities[i].Symbol  # Get symbol object
 
                 # Create a long (bullish) signal until quarter end
                 insights.append(
@@ -85,20 +72,11 @@ class FundamentalFactorAlphaModel(AlphaModel):  # Define a custom alpha model in
 
     def OnSecuritiesChanged(self, algorithm, changes):  # Called whenever universe adds/removes symbols
         
-        # Remove securities that left the universe
+        # Remove securities that left the universe (O(1) through the symbol index)
         for security in changes.RemovedSecurities:
-            for sector in self.sectors:
-                if security in self.sectors[sector]:
-                    self.sectors[sector].remove(security)  # Remove from correct sector grouping
-        
+            self.sectors.Remove(security)
+
         # Add securities that entered universe
+        # Their Morningstar sector code picks the bucket, created on first use
         for security in changes.AddedSecurities:
-            # Get Morningstar sector code of new stock
-            sector = security.Fundamentals.AssetClassification.MorningstarSectorCode
-            
-            # If sector is not tracked yet, create a set for it
-            if sector not in self.sectors:
-                self.sectors[sector] = set()
-            
-            # Add security to its sector bucket
-            self.sectors[sector].add(security)
+            self.sectors.Add(security)
@@ -111,18 +111,40 @@ bac = qb.AddOption("BAC")
 # Set filter for options only near money and near expiration
 bac.SetFilter(-5, 5, timedelta(20), timedelta(50))
 
-# Fetch option history data
-option_history = qb.GetOptionHistory(
-    bac.Symbol,
-    datetime(2021, 1, 1),
-    datetime(2021, 1, 10)
-)
+# Fetch option history data: from the local columnar quote store when BAC
+# has been imported into it (python OptionQuoteStore.py import data/options BAC
+# quotes.csv), with the option's filter pushed down to its index: the same
+# 20-50 day expiry window, and the strikes the -5/+5 strike filter would have
+# kept while BAC traded over the period
+from OptionQuoteStore import OptionQuoteStore, StrikeWindow
+
+option_store = OptionQuoteStore("data/options")
+if option_store.Contains("BAC"):
+    start, end = datetime(2021, 1, 1), datetime(2021, 1, 10)
+    bac_prices = qb.History(bac.Symbol.Underlying, start, end, Resolution.Daily)
+    listed = option_store.History("BAC", start, end, days=(20, 50)).GetStrikes()
+    strike_range = StrikeWindow(listed, bac_prices["low"].min(), bac_prices["high"].max(), -5, 5)
+    option_history = option_store.History(
+        "BAC",
+        start,
+        end,
+        strikes=strike_range,
+        days=(20, 50)
+    )
+else:
+    option_history = qb.GetOptionHistory(
+        bac.Symbol,
+        datetime(2021, 1, 1),
+        datetime(2021, 1, 10)
+    )
 
 # Print available strikes and expiration dates
+# (answered from the store's index without reading any quotes)
 print(option_history.GetStrikes())
 print(option_history.GetExpiryDates())
 
 # View complete option dataset
+# (the store reads only the partitions and strikes kept by the filter)
 option_history.GetAllData()
 
 # -----------------------------------------------------------
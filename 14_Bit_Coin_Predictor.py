@@ -1,7 +1,8 @@
 # Import necessary libraries available inside QuantConnect
 import json
 import numpy as np
-from tensorflow.keras.models import Sequential
+from ModelInference import *
+from ModelArtifact import *
 
 class MeasuredYellowBarracuda(QCAlgorithm):
 
@@ -11,23 +12,29 @@ class MeasuredYellowBarracuda(QCAlgorithm):
         self.SetEndDate(2020, 1, 1)
 
         # -------------------------------------------------------------
-        # Load the saved Keras model from ObjectStore
+        # Load the saved model (architecture + trained weights) from ObjectStore
         # -------------------------------------------------------------
 
-        # This must match the key you used while saving the model config
+        # This must match the key you used while saving the model
         model_key = 'bitcoin_price_predictor'
 
         # Check if the model exists in ObjectStore
         if self.ObjectStore.ContainsKey(model_key):
 
-            # Read the stored JSON text
-            model_str = self.ObjectStore.Read(model_key)
-
-            # Extract 'config' field from JSON string
-            config = json.loads(model_str)['config']
-
-            # Rebuild Keras model from saved config
-            self.model = Sequential.from_config(config)
+            # Read the stored bytes (a .NET byte[] in LEAN, so convert once here)
+            model_bytes = bytes(self.ObjectStore.ReadBytes(model_key))
+
+            if IsModelArtifact(model_bytes):
+                # Weights are read in place; Dense/Flatten models run in NumPy without Keras
+                self.artifact = LoadModelArtifact(model_bytes)
+                self.forward = self.artifact.Compile()
+            else:
+                # Older saves hold only the architecture JSON: the rebuilt
+                # model has untrained weights, so retrain and save again
+                from tensorflow.keras.models import Sequential
+                self.Debug("Model in Object Store has no weights; re-run 14_model.py to save an artifact.")
+                config = json.loads(model_bytes.decode("utf-8"))['config']
+                self.forward = CompileModel(Sequential.from_config(config))
 
         else:
             # Fail early if model not found
@@ -46,43 +53,48 @@ class MeasuredYellowBarracuda(QCAlgorithm):
         # Set benchmark to BTC itself
         self.SetBenchmark(self.symbol)
 
+        # -------------------------------------------------------------
+        # Inference: rolling 31-bar OHLCV buffer per traded symbol and a
+        # NumPy forward pass of the model, batched across the symbols
+        # -------------------------------------------------------------
+        self.symbols = [self.symbol]
+        self.features = FeatureWindow(self.symbols, steps=30)
+        self.features.Seed(self.History(self.symbols, 31, Resolution.Daily))
+
     # -------------------------------------------------------------
     # Called every time new market data comes in
     # -------------------------------------------------------------
     def OnData(self, data):
-        # Only act when model gives a direction
-        prediction = self.GetPrediction()
+        # Add this slice's bars to the rolling feature buffer
+        self.features.Update(data.Bars)
 
-        if prediction == "Up":
-            # Go long the asset if model predicts upward price move
-            self.SetHoldings(self.symbol, 1)
-        else:
-            # Short the asset if down
-            self.SetHoldings(self.symbol, -0.5)
+        # Only act when model gives a direction
+        predictions = self.GetPredictions()
+
+        # Split the exposure across the traded symbols (all of it with one symbol)
+        weight = 1 / len(self.symbols)
+        for symbol, prediction in predictions.items():
+            if prediction == "Up":
+                # Go long the asset if model predicts upward price move
+                self.SetHoldings(symbol, weight)
+            else:
+                # Short the asset if down
+                self.SetHoldings(symbol, -0.5 * weight)
 
     # -------------------------------------------------------------
-    # Prepare input sequence, run through model, and interpret output
+    # Run the last 30 percent changes of every ready symbol through
+    # the model in one batch and interpret the outputs
     # -------------------------------------------------------------
-    def GetPrediction(self):
-
-        # Pull 40 bars of OHLCV history
-        df = self.History(self.symbol, 40).loc[self.symbol]
-
-        # We need percent change training format (same as training pipeline)
-        df_change = df[["open", "high", "low", "close", "volume"]].pct_change().dropna()
-
-        # Collect last 30 rows as input window
-        model_input = []
-        for index, row in df_change.tail(30).iterrows():
-            model_input.append(np.array(row))
-
-        # Convert to numpy array and add batch dimension
-        model_input = np.array([model_input])
+    def GetPredictions(self):
+        rows = np.flatnonzero(self.features.Ready)
+        if rows.size == 0:
+            return {}
 
-        # Predict using the loaded Keras model
-        pred = self.model.predict(model_input)[0][0]
+        # (symbols, 30, 5) inputs, same format as the training pipeline
+        pred = self.forward(self.features.Inputs(rows))[:, 0]
 
         # Round output: 1 = Up, 0 = Down
-        if round(pred) == 0:
-            return "Down"
-        return "Up"
+        return {
+            self.symbols[i]: "Down" if round(float(p)) == 0 else "Up"
+            for i, p in zip(rows, pred)
+        }
@@ -9,6 +9,8 @@ from datetime import datetime, timedelta
 import numpy as np
 import pandas as pd
 import json
+from WindowDataset import *
+from ModelArtifact import *
 
 # Initialize QuantBook to access market data
 qb = QuantBook()
@@ -37,31 +39,23 @@ df["volume"].fillna(df["volume"].max(), inplace=True)
 # --------------------------------
 # Build sequences of 30 days (lookback window) for ML model input
 # --------------------------------
+# Every window is a strided view over one float32 copy of df, so memory
+# doesn't grow with n_steps; only the mini-batches fed to fit are copied
 n_steps = 30
-features, labels = [], []
 
-for i in range(len(df) - n_steps):
-    # Collect 30 recent rows as input feature sequence
-    features.append(df.iloc[i:i+n_steps].values)
+# Output label of window i: 1 = next price change (row i+30) up, 0 = down
+labels = NextStepLabels(df["close"].values, n_steps)
+dataset = WindowDataset.FromValues(df.values, n_steps, labels)
 
-    # Output label: 1 = next price change up, 0 = down
-    label = 1 if df["close"].iloc[i+n_steps] > 0 else 0
-    labels.append(label)
-
-# Convert to numpy arrays for training
-features = np.array(features)
-labels   = np.array(labels)
-
-# Split dataset into train and test
-train_size = int(len(features) * 0.7)
-X_train, X_test = features[:train_size],  features[train_size:]
-y_train, y_test = labels[:train_size],    labels[train_size:]
+# Split dataset into train and test (views, nothing is copied)
+train, test = dataset.Split(0.7)
+X_test, y_test = test.features, test.labels
 
 # --------------------------------
 # Build the neural network model
 # --------------------------------
 model = Sequential([
-    Dense(30, activation="relu", input_shape=X_train[0].shape),
+    Dense(30, activation="relu", input_shape=train.WindowShape),
     Dense(20, activation="relu"),
     Flatten(),
     Dense(1, activation="sigmoid")  # output probability of upward price move
@@ -70,16 +64,24 @@ model = Sequential([
 # Compile with binary classification settings
 model.compile(loss="binary_crossentropy", optimizer=Adam(), metrics=["accuracy"])
 
-# Train the model for a few epochs
-model.fit(X_train, y_train, epochs=5, verbose=1)
+# Train the model for a few epochs on shuffled mini-batches of 32 (Keras' defaults)
+batch_size = 32
+model.fit(
+    train.Batches(batch_size, shuffle=True, repeat=True),
+    steps_per_epoch=train.Steps(batch_size),
+    epochs=5,
+    verbose=1
+)
 
 # --------------------------------
 # Serialize model to save into ObjectStore
 # --------------------------------
-model_json = model.to_json()
+# One binary artifact with the architecture AND the trained weights
+# (to_json alone would leave the algorithm with random weights)
+artifact = ModelArtifactBytes(model, meta={"n_steps": n_steps, "features": list(df.columns)})
 model_key = "bitcoin_price_predictor"   # This string is the model's storage name
 
-# Save model architecture into ObjectStore
-qb.ObjectStore.Save(model_key, model_json)
+# Save model artifact into ObjectStore
+qb.ObjectStore.SaveBytes(model_key, artifact)
 
 print("Model saved with key:", model_key)
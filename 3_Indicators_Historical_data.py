@@ -1,6 +1,8 @@
 # region imports
 from AlgorithmImports import *
-from collections import deque
+import math
+import numpy as np
+from RollingExtrema import *
 # endregion
 
 """
@@ -35,12 +37,25 @@ class AdaptableSkyBlueCat(QCAlgorithm):
         #    for time, price in closing_prices.loc[self.spy].items():
         #        self.sma.Update(time, price)
 
+        # Bulk warm-up for the custom SMA below (one call instead of one Update per bar):
+        #    closes = self.History(self.spy, 30, Resolution.Daily)["close"]
+        #    self.sma.UpdateMany(closes.values, closes.index[-1][1])
+
 
 
         # Create and register custom SMA indicator
         self.sma = CustomSimpleMovingAverage("CustomSMA", 30)
         self.RegisterIndicator(self.spy, self.sma, Resolution.Daily)
 
+        # 52-week high/low over the last 365 daily bars, warmed once here and
+        # then updated by the daily consolidator (no History call per bar)
+        self.yearly = RollingHighLow("52wHighLow", 365)
+        hist = self.History(self.spy, 365, Resolution.Daily)
+        if not hist.empty:
+            bars = hist.loc[self.spy]
+            self.yearly.UpdateMany(bars["high"].values, bars["low"].values)
+        self.RegisterIndicator(self.spy, self.yearly, Resolution.Daily)
+
         self.Debug("Strategy initialized")
 
 
@@ -49,14 +64,13 @@ class AdaptableSkyBlueCat(QCAlgorithm):
         if not self.sma.IsReady:
             return
 
-        # Get 1-year historical data
-        hist = self.History(self.spy, 365, Resolution.Daily)
-        if hist.empty:
+        # No daily bars seen yet
+        if self.yearly.Count == 0:
             return
 
-        # Compute 52-week high/low
-        low = hist.loc[self.spy]["low"].min()
-        high = hist.loc[self.spy]["high"].max()
+        # 52-week high/low
+        low = self.yearly.Low
+        high = self.yearly.High
 
         # Current price
         price = self.Securities[self.spy].Price
@@ -91,23 +105,86 @@ class AdaptableSkyBlueCat(QCAlgorithm):
 # Custom SMA indicator
 class CustomSimpleMovingAverage(PythonIndicator):
 
+    # Recompute the running sum from the buffer every N updates so the
+    # incremental add/subtract can never drift far from the true sum
+    RebaseInterval = 10000
+
     def __init__(self, name, period):
         self.Name = name
         self.Time = datetime.min
         self.Value = 0
         self.period = period
-        self.queue = deque(maxlen=period)  # sliding window buffer
 
-    def Update(self, input):
-        # Add new closing price
-        self.queue.appendleft(input.Close)
+        # Fixed-size ring buffer: head is the slot the next close overwrites
+        self.window = np.zeros(period)
+        self.head = 0
+        self.count = 0
+
+        # Running sum with Kahan compensation
+        self.total = 0.0
+        self.compensation = 0.0
+        self.updatesSinceRebase = 0
 
+    def Update(self, input):
         # Update timestamp
         self.Time = input.EndTime
 
-        # Calculate average
-        count = len(self.queue)
-        self.Value = sum(self.queue) / count
+        close = float(input.Close)
+
+        # Value leaving the window (0 while the buffer is still filling)
+        dropped = self.window[self.head] if self.count == self.period else 0.0
+        self.window[self.head] = close
+        self.head = (self.head + 1) % self.period
+        if self.count < self.period:
+            self.count += 1
 
-        # Indicator ready when queue is full
-        return count == self.period
+        self.updatesSinceRebase += 1
+        if self.updatesSinceRebase >= self.RebaseInterval:
+            self.Rebase()
+        else:
+            # Kahan summation of the net change keeps rounding error bounded
+            delta = (close - dropped) - self.compensation
+            total = self.total + delta
+            self.compensation = (total - self.total) - delta
+            self.total = total
+
+        # Calculate average
+        self.Value = self.total / self.count
+
+        # Indicator ready when the window is full
+        return self.count == self.period
+
+    def UpdateMany(self, closes, time=None):
+        # Bulk warm-up: equivalent to calling Update once per close, but only
+        # the last `period` values are copied into the buffer
+        closes = np.asarray(closes, dtype=float)
+        if closes.size == 0:
+            return self.count == self.period
+
+        if closes.size < self.period:
+            # Keep the newest part of the current window in front of the new closes
+            keep = min(self.count, self.period - closes.size)
+            closes = np.concatenate((self.Ordered()[self.count - keep:], closes))
+
+        tail = closes[-self.period:]
+        self.count = tail.size
+        self.window[:self.count] = tail
+        self.head = self.count % self.period
+        self.Rebase()
+
+        if time is not None:
+            self.Time = time
+        self.Value = self.total / self.count
+        return self.count == self.period
+
+    def Ordered(self):
+        # Window contents from oldest to newest
+        if self.count < self.period:
+            return self.window[:self.count]
+        return np.roll(self.window, -self.head)
+
+    def Rebase(self):
+        # Exact recomputation of the running sum from the buffer
+        self.total = math.fsum(self.window[:self.count].tolist())
+        self.compensation = 0.0
+        self.updatesSinceRebase = 0
@@ -1,5 +1,6 @@
 # region imports
 from AlgorithmImports import *
+from TopKSelection import *
 # endregion
 
 class AdaptableSkyBlueCat(QCAlgorithm):
@@ -23,6 +24,18 @@ class AdaptableSkyBlueCat(QCAlgorithm):
 
         # Set resolution for universe data
         self.UniverseSettings.Resolution = Resolution.Hour
+
+        # Top 200 by dollar volume among stocks with price > $10 and fundamental data
+        self.coarseSelector = TopKSelector(
+            lambda x: x.DollarVolume, 200,
+            where=lambda x: x.Price > 10 and x.HasFundamentalData, name="Coarse"
+        )
+
+        # 10 smallest positive market caps
+        self.fineSelector = TopKSelector(
+            lambda x: x.MarketCap, 10,
+            where=lambda x: x.MarketCap > 0, descending=False, name="Fine"
+        )
         
         # Will hold desired target portfolio weights
         self.portfolioTargets = []
@@ -36,24 +49,19 @@ class AdaptableSkyBlueCat(QCAlgorithm):
         # Set next rebalance time
         self.rebalanceTime = self.Time + timedelta(30)
         
-        # Sort by dollar volume (liquid stocks first)
-        sortedByDollarVolume = sorted(
-            coarse, key=lambda x: x.DollarVolume, reverse=True
-        )
-
-        # Filter stocks with price > $10 and fundamental data available
-        return [
-            x.Symbol for x in sortedByDollarVolume 
-            if x.Price > 10 and x.HasFundamentalData
-        ][:200]  # take top 200 by liquidity
+        # Filter stocks with price > $10 and fundamental data available,
+        # then take the top 200 by dollar volume (liquid stocks first)
+        selected = self.coarseSelector.Select(coarse)
+        self.Debug(self.coarseSelector.Summary())
+        return [x.Symbol for x in selected]
 
     # ---------------- Fine Universe Filter ----------------
     def FineFilter(self, fine):
-        # Sort by MarketCap ascending (picking smaller market caps first)
-        sortedByPE = sorted(fine, key=lambda x: x.MarketCap)
-
-        # Keep only stocks with valid MarketCap > 0, take top 10
-        return [x.Symbol for x in sortedByPE if x.MarketCap > 0][:10]
+        # Keep only stocks with valid MarketCap > 0, then take the 10
+        # smallest market caps (ascending)
+        selected = self.fineSelector.Select(fine)
+        self.Debug(self.fineSelector.Summary())
+        return [x.Symbol for x in selected]
 
     # ---------------- Universe Change Handler ----------------
     def OnSecuritiesChanged(self, changes):
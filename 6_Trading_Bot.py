@@ -1,10 +1,8 @@
 # region imports
 from AlgorithmImports import *
+from TweetSentimentCache import *
 # endregion
 
-# Import NLTK VADER sentiment analyzer (supported in new QC environment)
-from nltk.sentiment import SentimentIntensityAnalyzer
-
 
 class AdaptableSkyBlueCat(QCAlgorithm):
 
@@ -22,6 +20,11 @@ class AdaptableSkyBlueCat(QCAlgorithm):
         # Add Musk tweet sentiment stream as custom data
         self.musk = self.AddData(MuskTweet, "MUSKTWTS", Resolution.Minute).Symbol
 
+        # With a local copy of the tweet CSV, score it once (cached next to it)
+        # and let the reader look scores up instead of running VADER per line
+        source = self.GetParameter("tweet_source")
+        MuskTweet.scores = LoadTweetScores(source) if source else None
+
         # Schedule exit function 15 minutes before close every day
         self.Schedule.On(
             self.DateRules.EveryDay(self.tsla),
@@ -59,13 +62,19 @@ class AdaptableSkyBlueCat(QCAlgorithm):
         self.Liquidate()
 
 
+    def OnEndOfAlgorithm(self):
+        # A cache that stopped matching the streamed file shows up as misses here
+        if MuskTweet.scores is not None:
+            self.Log(f"Tweet score cache: {MuskTweet.scores.Stats()}")
+
+
 
 # -------------------- Custom Data Class --------------------
 
 class MuskTweet(PythonData):
-    
-    # Initialize NLTK sentiment analyzer once
-    sia = SentimentIntensityAnalyzer()
+
+    # Pre-scored tweets (TweetScores), or None to score each line with VADER
+    scores = None
 
     def GetSource(self, config, date, isLive):
         # CSV file containing pre-processed tweet dataset
@@ -82,20 +91,29 @@ class MuskTweet(PythonData):
     
         fields = line.split(',')
         obj = MuskTweet()
+        cached = MuskTweet.scores.Next(line) if MuskTweet.scores is not None else None
 
         try:
-            # Assign symbol and timestamp (+1 minute offset to sync with bar)
-            obj.Symbol = config.Symbol
-            obj.Time   = datetime.strptime(fields[0], '%Y-%m-%d %H:%M:%S') + timedelta(minutes=1)
-
             # Raw tweet text
             content = fields[1]
 
-            # Compute compound sentiment score using NLTK VADER
-            sentiment = self.sia.polarity_scores(content)["compound"]
+            if cached is not None:
+                # Score, relevance and time from the cache
+                time, sentiment, relevant, valid = cached
+                if not valid:
+                    return None
+            else:
+                time = ParseTweetTime(fields[0])
+                # Compute compound sentiment score using NLTK VADER
+                sentiment = SentimentAnalyzer().polarity_scores(content)["compound"]
+                relevant = IsRelevant(content)
+
+            # Assign symbol and timestamp (+1 minute offset to sync with bar)
+            obj.Symbol = config.Symbol
+            obj.Time   = time + timedelta(minutes=1)
 
             # Only apply sentiment when tweet explicitly references Tesla
-            if "tsla" in content.lower() or "tesla" in content.lower():
+            if relevant:
                 obj.Value = sentiment      # store sentiment score as Value
             else:
                 obj.Value = 0              # ignore irrelevant tweets
@@ -1,3 +1,8 @@
+# region imports
+from AlgorithmImports import *
+from OptionSelection import *
+# endregion
+
 class BreakoutCallBuy(QCAlgorithm):
 
     def Initialize(self):
@@ -37,6 +42,10 @@ class BreakoutCallBuy(QCAlgorithm):
         # MAX(period=21) = Highest High over the last 21 days
         # --------------------------------------------------------------
         self.high = self.MAX(self.equity, 21, Resolution.Daily, Field.High)
+
+        # Filtered contracts bucketed by (expiry, right) with sorted strikes,
+        # kept in step with the chain as the filter adds and drops contracts
+        self.chainIndex = OptionChainIndex()
     
     
     def OnData(self, data):
@@ -83,19 +92,19 @@ class BreakoutCallBuy(QCAlgorithm):
         # Pick the furthest expiration available in the filtered set
         # This gives more time value and smoother trades
         # --------------------------------------------------------------
-        expiry = sorted(chains, key=lambda x: x.Expiry, reverse=True)[0].Expiry
-        
-        # Filter only call contracts with this expiration
-        calls = [i for i in chains if i.Expiry == expiry and i.Right == OptionRight.Call]
-        
-        # Sort calls by nearest strike to current price (ATM or near-ATM)
-        call_contracts = sorted(calls, key=lambda x: abs(x.Strike - x.UnderlyingLastPrice))
-        
-        if len(call_contracts) == 0:
+        index = self.chainIndex
+        index.Sync(chains)
+        expiry = index.LastExpiry
+        if expiry is None:
+            return
+
+        # Call at this expiration with the strike nearest the current price (ATM or near-ATM);
+        # with the price exactly between two strikes the lower one is taken, whatever
+        # order the chain lists them in
+        self.call = index.NearestStrike(chains, expiry, OptionRight.Call, chains.Underlying.Price)
+
+        if self.call is None:
             return
-        
-        # Select closest-to-spot strike call
-        self.call = call_contracts[0]
         
         # --------------------------------------------------------------
         # Position sizing:
@@ -0,0 +1,213 @@
+"""
+Columnar on-disk bar store, one memory-mapped file per symbol and resolution
+
+Layout of <root>/<resolution>/<TICKER>.bars (little endian):
+    magic    4 bytes   b"QCBR"
+    version  uint16    FORMAT_VERSION
+    flags    uint16    reserved, 0
+    count    uint64    number of bars
+    padding  to HEADER_SIZE bytes
+    time     int64[count]     bar start, epoch seconds (exchange-local, as LoadBars)
+    open, high, low, close, volume   float64[count] each, in that order
+
+Times are strictly increasing. A BarFile maps the file and wraps every
+column with np.frombuffer, so opening costs the same for a week of daily
+bars as for ten years of minutes, and only the pages a replay actually
+touches are ever read. Date ranges are found by binary search on the time
+column; Slice and Chunks hand out views into the mapping, never copies.
+
+Files are written to a temporary name and renamed into place, so readers
+never see a partial file.
+
+Usage:
+    store = BarStore("data/bars")
+    store.Import("SPY", "Minute", "data/spy_minute.csv")
+    bars = store.Open("SPY", "Minute")
+    for chunk in bars.Chunks(datetime(2015, 1, 1), datetime(2016, 1, 1)):
+        chunk["close"]      # float64 view, no copy
+
+    # Replay through LocalLean straight from the store
+    RunAlgorithm("4_ Rolling_Windows_Consolidators.py", store.DataSources())
+
+Command line:
+    python BarStore.py import data/bars SPY Minute data/spy_minute.csv
+    python BarStore.py list data/bars
+"""
+
+import os
+import struct
+from datetime import datetime, timedelta
+
+import numpy as np
+
+MAGIC = b"QCBR"
+FORMAT_VERSION = 1
+HEADER_SIZE = 64
+SUFFIX = ".bars"
+BAR_COLUMNS = ("open", "high", "low", "close", "volume")
+DEFAULT_CHUNK = 1 << 16
+_HEADER = struct.Struct("<4sHHQ")
+
+_EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+
+
+def _Seconds(value, ceil=False):
+    # datetime / datetime64 / number -> integer epoch seconds, rounded down (or up)
+    if isinstance(value, np.datetime64):
+        value = value.astype("datetime64[us]").astype(datetime)
+    if isinstance(value, datetime):
+        whole, rest = divmod(value - _EPOCH, _SECOND)
+        return whole + (1 if ceil and rest else 0)
+    return int(np.ceil(value)) if ceil else int(np.floor(value))
+
+
+def WriteBars(path, columns):
+    # columns: {"time": epoch seconds or datetime64, "open": ..., ...}, e.g. from LoadBars
+    times = np.asarray(columns["time"])
+    if times.dtype.kind == "M":
+        times = times.astype("datetime64[s]")
+    times = times.astype("<i8")
+    if times.size > 1 and not np.all(np.diff(times) > 0):
+        raise ValueError(f"Bar times for {path} must be strictly increasing")
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    staging = f"{path}.tmp-{os.getpid()}"
+    with open(staging, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, times.size).ljust(HEADER_SIZE, b"\0"))
+        f.write(times.tobytes())
+        for name in BAR_COLUMNS:
+            values = np.asarray(columns[name], dtype="<f8")
+            if values.shape != times.shape:
+                raise ValueError(f"Column {name} has {values.size} values for {times.size} times")
+            f.write(values.tobytes())
+    os.replace(staging, path)
+    return path
+
+
+class BarFile:
+    # One memory-mapped bar file; columns are read-only views into the mapping
+
+    def __init__(self, path):
+        self.path = path
+        buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        if buffer.size < HEADER_SIZE:
+            raise ValueError(f"{path} is not a bar file: too short")
+        magic, version, _, count = _HEADER.unpack(buffer[:_HEADER.size].tobytes())
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a bar file: bad magic")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"Bar file version {version} is newer than this reader ({FORMAT_VERSION})")
+
+        self.columns = {"time": np.frombuffer(buffer, dtype="<i8", count=count, offset=HEADER_SIZE)}
+        for k, name in enumerate(BAR_COLUMNS):
+            offset = HEADER_SIZE + (k + 1) * count * 8
+            self.columns[name] = np.frombuffer(buffer, dtype="<f8", count=count, offset=offset)
+        self.time = self.columns["time"]
+
+    def __len__(self):
+        return self.time.size
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def Search(self, value, side="left"):
+        # Index of the first bar starting at/after (left) or after (right) value
+        if side == "left":
+            return int(np.searchsorted(self.time, _Seconds(value, ceil=True), "left"))
+        return int(np.searchsorted(self.time, _Seconds(value), "right"))
+
+    def Range(self, start=None, end=None):
+        # (first, last) positions of the bars with start <= time < end
+        first = 0 if start is None else self.Search(start, "left")
+        last = len(self) if end is None else self.Search(end, "left")
+        return first, max(first, last)
+
+    def Slice(self, start=None, end=None):
+        # LoadBars-style column dict of views for start <= time < end
+        first, last = self.Range(start, end)
+        return {name: column[first:last] for name, column in self.columns.items()}
+
+    def Chunks(self, start=None, end=None, size=DEFAULT_CHUNK):
+        # The same range as Slice, as consecutive views of at most `size` bars
+        first, last = self.Range(start, end)
+        for position in range(first, last, size):
+            stop = min(position + size, last)
+            yield {name: column[position:stop] for name, column in self.columns.items()}
+
+    @property
+    def Start(self):
+        return _EPOCH + timedelta(seconds=int(self.time[0])) if len(self) else None
+
+    @property
+    def End(self):
+        # Start of the last bar
+        return _EPOCH + timedelta(seconds=int(self.time[-1])) if len(self) else None
+
+
+class BarStore:
+
+    def __init__(self, root=os.path.join("data", "bars")):
+        self.root = root
+        self.open = {}
+
+    def Path(self, ticker, resolution):
+        return os.path.join(self.root, str(resolution).lower(), ticker.upper() + SUFFIX)
+
+    def Write(self, ticker, resolution, columns):
+        path = WriteBars(self.Path(ticker, resolution), columns)
+        self.open.pop(path, None)
+        return path
+
+    def Import(self, ticker, resolution, source):
+        # CSV / Parquet bar file (VectorizedBacktest.LoadBars format) into the store
+        import VectorizedBacktest
+        return self.Write(ticker, resolution, VectorizedBacktest.LoadBars(source))
+
+    def Open(self, ticker, resolution):
+        path = self.Path(ticker, resolution)
+        if path not in self.open:
+            self.open[path] = BarFile(path)
+        return self.open[path]
+
+    def Contents(self):
+        # [(ticker, resolution)] of every file in the store
+        contents = []
+        if not os.path.isdir(self.root):
+            return contents
+        for directory in sorted(os.listdir(self.root)):
+            folder = os.path.join(self.root, directory)
+            if not os.path.isdir(folder):
+                continue
+            for name in sorted(os.listdir(folder)):
+                if name.endswith(SUFFIX):
+                    contents.append((name[:-len(SUFFIX)], directory.capitalize()))
+        return contents
+
+    def DataSources(self):
+        # {(ticker, resolution): path}, the data argument of LocalLean.RunAlgorithm
+        return {(ticker, resolution): self.Path(ticker, resolution) for ticker, resolution in self.Contents()}
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Columnar bar store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importing = commands.add_parser("import", help="add a CSV / Parquet bar file to the store")
+    importing.add_argument("root")
+    importing.add_argument("ticker")
+    importing.add_argument("resolution", help="Daily, Hour, Minute, Second")
+    importing.add_argument("source")
+    listing = commands.add_parser("list", help="show the files in the store")
+    listing.add_argument("root")
+    arguments = parser.parse_args()
+
+    store = BarStore(arguments.root)
+    if arguments.command == "import":
+        print(store.Import(arguments.ticker, arguments.resolution, arguments.source))
+    else:
+        for ticker, resolution in store.Contents():
+            bars = store.Open(ticker, resolution)
+            print(f"{ticker:<10} {resolution:<8} {len(bars):>10} bars  {bars.Start} .. {bars.End}")
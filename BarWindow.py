@@ -0,0 +1,147 @@
+# region imports
+from AlgorithmImports import *
+import numpy as np
+# endregion
+
+"""
+RollingWindow[TradeBar] backed by NumPy columns.
+
+TradeBarWindow(size) keeps time, end time, open, high, low, close and volume
+in preallocated arrays instead of a deque of TradeBar objects: an int64
+block of (time, end) in microseconds and a float64 block of OHLCV, one row
+per bar, so an Add is two row writes. Indexing, Add, IsReady, Count and
+Samples behave like RollingWindow: window[0] is the most recent bar,
+returned as a TradeBar built on access. Value(name, i) reads one field of
+bar i as a plain float (or datetime) without building the bar.
+
+It pays off for long windows read as columns (means, extremes, regressions
+over hundreds of bars). For a few bars read by index, such as the previous
+day's close, RollingWindow[TradeBar] is cheaper: it hands back the bar it
+already holds, while any read here goes through NumPy.
+
+Every row is stored twice over, at slot and slot + size, so the window in
+time order is always one contiguous run of rows: Closes, Highs, ... and
+Column() are (strided) views into the buffer, never copies, whether or not
+the ring has wrapped. A view reflects the window at the time it was taken
+and is overwritten by later Adds; copy it to keep it.
+
+Usage:
+    self.window = TradeBarWindow(20)
+    self.window.Add(bar)
+    if self.window.IsReady:
+        lastClose = self.window.Value("close")  # no TradeBar built
+        mean = self.window.Closes.mean()        # oldest first, no copy
+"""
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# column -> (block, position in the row)
+WINDOW_COLUMNS = {
+    "time": ("stamps", 0),
+    "end": ("stamps", 1),
+    "open": ("prices", 0),
+    "high": ("prices", 1),
+    "low": ("prices", 2),
+    "close": ("prices", 3),
+    "volume": ("prices", 4),
+}
+
+
+class TradeBarWindow:
+
+    def __init__(self, size):
+        if size < 1:
+            raise ValueError("Window size must be at least 1")
+        self.Size = size
+        self.stamps = np.zeros((2 * size, 2), dtype=np.int64)      # time, end (epoch microseconds)
+        self.prices = np.zeros((2 * size, 5))                      # open, high, low, close, volume
+        self.head = 0           # slot the next bar goes to
+        self.Samples = 0
+        self.symbol = None
+
+    def Add(self, bar):
+        self.AddValues(bar.Time, bar.EndTime, bar.Open, bar.High, bar.Low, bar.Close, bar.Volume, bar.Symbol)
+
+    def AddValues(self, time, end, open, high, low, close, volume, symbol=None):
+        head = self.head
+        stamps = ((time - _EPOCH) // _MICROSECOND, (end - _EPOCH) // _MICROSECOND)
+        self.stamps[head] = self.stamps[head + self.Size] = stamps
+        self.prices[head] = self.prices[head + self.Size] = (open, high, low, close, volume)
+        self.head = (head + 1) % self.Size
+        self.Samples += 1
+        if symbol is not None:
+            self.symbol = symbol
+
+    @property
+    def Count(self):
+        return min(self.Samples, self.Size)
+
+    def __len__(self):
+        return self.Count
+
+    @property
+    def IsReady(self):
+        return self.Samples >= self.Size
+
+    def _Slot(self, index):
+        count = self.Count
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError(f"Index {index} out of range for window of {count} items")
+        return (self.head - 1 - index) % self.Size
+
+    def __getitem__(self, index):
+        slot = self._Slot(index)
+        start, end = (_EPOCH + timedelta(microseconds=t) for t in self.stamps[slot].tolist())
+        return TradeBar(start, self.symbol, *self.prices[slot].tolist(), end - start)
+
+    def Value(self, name, index=0):
+        # One field of bar `index` (0 = most recent), without building a TradeBar
+        block, position = WINDOW_COLUMNS[name]
+        value = getattr(self, block)[self._Slot(index), position].item()
+        return _EPOCH + timedelta(microseconds=value) if block == "stamps" else value
+
+    def __iter__(self):
+        # Most recent first, as RollingWindow enumerates
+        return (self[i] for i in range(self.Count))
+
+    def Column(self, name, newestFirst=False):
+        # View of one column over the window, oldest first (or newest first)
+        count = self.Count
+        # The `count` slots before head (+ Size, in the mirror) are the window in time order
+        stop = self.head + self.Size
+        block, position = WINDOW_COLUMNS[name]
+        view = getattr(self, block)[stop - count:stop, position]
+        if block == "stamps":
+            view = view.view("datetime64[us]")
+        return view[::-1] if newestFirst else view
+
+    @property
+    def Times(self):
+        return self.Column("time")
+
+    @property
+    def Opens(self):
+        return self.Column("open")
+
+    @property
+    def Highs(self):
+        return self.Column("high")
+
+    @property
+    def Lows(self):
+        return self.Column("low")
+
+    @property
+    def Closes(self):
+        return self.Column("close")
+
+    @property
+    def Volumes(self):
+        return self.Column("volume")
+
+    def Reset(self):
+        self.head = 0
+        self.Samples = 0
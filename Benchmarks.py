@@ -0,0 +1,709 @@
+"""
+Per-bar OnData benchmarks for the strategies in this repo
+
+Every case replays a synthetic bar stream through an algorithm file,
+unchanged, on LocalLean and times each OnData call:
+    - latency percentiles per slice (p50 / p90 / p99 / max, microseconds)
+    - allocations per slice, from a second pass under tracemalloc: the peak
+      bytes allocated inside one OnData call, and the net memory blocks the
+      call leaves behind (CPython has no cheap count of gross allocations)
+    - throughput: bars and slices replayed per second, harness included
+
+Bars before a case's lead-in (indicator warm-up that happens in OnData
+time, e.g. the 21-day MAX in 9_Options.py) are replayed but not measured.
+Parts the harness can't drive, universe selection and the alpha model,
+are timed by calling them directly with synthetic fundamentals.
+
+Usage:
+    python Benchmarks.py --bars 5000 --save bench/baseline.json
+    python Benchmarks.py --bars 5000 --save bench/new.json 11_Crypto 9_Options
+    python Benchmarks.py --compare bench/baseline.json bench/new.json
+
+A comparison flags a case whose p50 or p99 latency grew, or whose
+throughput fell, by more than --threshold (default 10%), and exits with
+status 1 if any case regressed. Latencies are machine dependent: only
+compare baselines recorded on the same machine.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import LocalLean
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CRYPTO_UNIVERSE = [
+    'BTCUSD', 'LTCUSD', 'ETHUSD', 'ETCUSD', 'RRTUSD', 'ZECUSD', 'XMRUSD', 'XRPUSD', 'EOSUSD',
+    'SANUSD', 'OMGUSD', 'NEOUSD', 'ETPUSD', 'BTGUSD', 'SNTUSD', 'BATUSD', 'FUNUSD', 'ZRXUSD',
+    'TRXUSD', 'REQUSD', 'LRCUSD', 'WAXUSD', 'DAIUSD', 'BFTUSD', 'ODEUSD', 'ANTUSD', 'XLMUSD',
+    'XVGUSD', 'MKRUSD', 'KNCUSD', 'LYMUSD', 'UTKUSD', 'VEEUSD', 'ESSUSD', 'IQXUSD', 'ZILUSD',
+    'BNTUSD', 'XRAUSD', 'VETUSD', 'GOTUSD', 'XTZUSD', 'MLNUSD', 'PNKUSD', 'DGBUSD', 'BSVUSD',
+    'ENJUSD', 'PAXUSD'
+]
+
+SECTORS = [getattr(LocalLean.MorningstarSectorCode, name) for name in dir(LocalLean.MorningstarSectorCode)
+           if not name.startswith("_")]
+
+
+# ---------------------------------------------------------------------
+# Synthetic data
+# ---------------------------------------------------------------------
+def _Rng(*key):
+    # Same stream for the same ticker/case on every run
+    return np.random.default_rng(zlib.crc32(repr(key).encode()))
+
+
+def _Sessions(resolution, calendar):
+    # Bar start offsets within one trading day
+    if resolution == LocalLean.Resolution.Daily:
+        return [timedelta(0)]
+    if calendar == "equity":
+        if resolution == LocalLean.Resolution.Hour:
+            return [timedelta(hours=h) for h in range(9, 16)]
+        return [timedelta(hours=9, minutes=30 + m) for m in range(390)]
+    step = LocalLean._RESOLUTION_PERIOD[resolution]
+    return [step * k for k in range(timedelta(days=1) // step)]
+
+
+def _IsSession(day, calendar):
+    return calendar == "crypto" or day.weekday() < 5
+
+
+def BarTimes(start, before, after, resolution, calendar="equity"):
+    # `before` bar starts strictly before `start` and `after` from `start` on
+    sessions = _Sessions(resolution, calendar)
+    earlier = []
+    day = start - timedelta(days=1)
+    while len(earlier) < before:
+        if _IsSession(day, calendar):
+            earlier.extend(reversed([day + offset for offset in sessions]))
+        day -= timedelta(days=1)
+    later = []
+    day = start
+    while len(later) < after:
+        if _IsSession(day, calendar):
+            later.extend(day + offset for offset in sessions)
+        day += timedelta(days=1)
+    return earlier[:before][::-1] + later[:after]
+
+
+def SyntheticBars(ticker, times, price=100.0, volatility=0.01, volume=1e6):
+    # Geometric random walk OHLCV columns, in the form LocalLean accepts
+    rng = _Rng(ticker, len(times))
+    n = len(times)
+    close = price * np.exp(np.cumsum(rng.normal(0.0, volatility, n)))
+    opens = np.concatenate(([price], close[:-1]))
+    wick = np.abs(rng.normal(0.0, volatility / 2, (2, n)))
+    return {
+        "time": np.array([int((t - LocalLean._EPOCH).total_seconds()) for t in times], dtype=np.int64),
+        "open": opens,
+        "high": np.maximum(opens, close) * (1 + wick[0]),
+        "low": np.minimum(opens, close) * (1 - wick[1]),
+        "close": close,
+        "volume": np.round(volume * rng.lognormal(0.0, 0.5, n)),
+    }
+
+
+def SyntheticTweets(path, times, every=97):
+    # Lines in the MuskTweet CSV format, one tweet every `every` bars
+    rng = _Rng("tweets", len(times))
+    words = ["tesla", "tsla", "great", "terrible", "rocket", "model", "love", "hate", "battery", "delay"]
+    with open(path, "w") as f:
+        for t in times[::every]:
+            text = " ".join(rng.choice(words, 6))
+            f.write(f"{t:%Y-%m-%d %H:%M:%S},{text}\n")
+    return path
+
+
+def SyntheticFundamentals(count, start):
+    # Coarse and fine fundamental objects for `count` made-up tickers
+    rng = _Rng("fundamentals", count)
+    symbols = [LocalLean.Symbol(f"S{k:05d}") for k in range(count)]
+    prices = rng.lognormal(3.5, 1.0, count)
+    volumes = rng.lognormal(13.0, 1.5, count)
+    hasFundamentals = rng.random(count) < 0.9
+    coarse = [LocalLean.CoarseFundamental(s, float(p), float(v), bool(h))
+              for s, p, v, h in zip(symbols, prices, volumes, hasFundamentals)]
+
+    sectors = rng.choice(SECTORS, count)
+    ipoDays = rng.integers(0, 40 * 365, count)
+    fine = [LocalLean.FineFundamental(
+        s, marketCap=float(c.DollarVolume * rng.uniform(50, 500)), sector=int(sector),
+        ipoDate=start - timedelta(days=int(days)), roe=float(rng.normal(0.08, 0.1)),
+        netMargin=float(rng.normal(0.06, 0.1)), peRatio=float(rng.normal(20, 10)))
+        for s, c, sector, days in zip(symbols, coarse, sectors, ipoDays)]
+    return coarse, fine
+
+
+# ---------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------
+class _Samples:
+
+    def __init__(self):
+        self.latency = []     # ns per call
+        self.peak = []        # bytes, tracing pass only
+        self.blocks = []      # net allocated blocks, tracing pass only
+
+
+def _Timed(function, samples, measured=lambda args: True):
+    clock = time.perf_counter_ns
+
+    def timed(*args):
+        if not measured(args):
+            return function(*args)
+        started = clock()
+        value = function(*args)
+        samples.latency.append(clock() - started)
+        return value
+    return timed
+
+
+def _Traced(function, samples, measured=lambda args: True):
+    blocks, reset, traced = sys.getallocatedblocks, tracemalloc.reset_peak, tracemalloc.get_traced_memory
+
+    def wrapped(*args):
+        if not measured(args):
+            return function(*args)
+        before = blocks()
+        reset()
+        base = traced()[0]
+        value = function(*args)
+        samples.peak.append(traced()[1] - base)
+        samples.blocks.append(blocks() - before)
+        return value
+    return wrapped
+
+
+def _Percentile(ordered, q):
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+def Summarize(samples):
+    latency = sorted(samples.latency)
+    summary = {"measured": len(latency)}
+    for name, q in (("p50_us", 0.5), ("p90_us", 0.9), ("p99_us", 0.99), ("max_us", 1.0)):
+        summary[name] = _Percentile(latency, q) / 1e3
+    summary["mean_us"] = sum(latency) / len(latency) / 1e3 if latency else 0.0
+    if samples.peak:
+        summary["peak_bytes_per_bar"] = sum(samples.peak) / len(samples.peak)
+        summary["peak_bytes_p99"] = _Percentile(sorted(samples.peak), 0.99)
+        summary["net_blocks_per_bar"] = sum(samples.blocks) / len(samples.blocks)
+    return summary
+
+
+def _Tracing(run):
+    tracemalloc.start()
+    try:
+        return run()
+    finally:
+        tracemalloc.stop()
+
+
+# ---------------------------------------------------------------------
+# Cases
+# ---------------------------------------------------------------------
+class StrategyCase:
+    """One algorithm file replayed over synthetic bars.
+
+    feeds lists (ticker, resolution, calendar, price, volatility, volume)
+    per subscription; multi=True marks the case whose feeds are cut down
+    to the --symbols count. history bars come before StartDate (History
+    and SetWarmUp), lead bars after it are replayed but not measured.
+    """
+
+    def __init__(self, name, path, start, feeds, history=0, lead=0, multi=False, extra=None, store=None,
+                 parameters=None):
+        self.name = name
+        self.path = path
+        self.start = start
+        self.feeds = feeds
+        self.history = history
+        self.lead = lead
+        self.multi = multi
+        self.extra = extra      # (case, times, directory) -> extra data sources
+        self.store = store      # (LocalObjectStore) -> None, fills the case's object store
+        self.parameters = parameters    # (directory) -> algorithm parameters
+
+    def Data(self, bars, symbols, directory):
+        feeds = self.feeds[:symbols] if self.multi else self.feeds
+        data = {}
+        times = None
+        for ticker, resolution, calendar, price, volatility, volume in feeds:
+            times = BarTimes(self.start, self.history, self.lead + bars, resolution, calendar)
+            data[ticker] = SyntheticBars(ticker, times, price, volatility, volume)
+        if self.extra is not None:
+            data.update(self.extra(self, times, directory))
+
+        # Measuring starts after the lead-in; the replay ends with the last bar
+        measureFrom = times[self.history + self.lead] if self.lead else self.start
+        end = max(t for t in times)
+        return data, measureFrom, datetime(end.year, end.month, end.day), len(feeds)
+
+    def Run(self, bars, symbols, allocations=True):
+        algorithmType = LocalLean.LoadAlgorithm(os.path.join(HERE, self.path))
+        with tempfile.TemporaryDirectory() as directory:
+            data, measureFrom, end, count = self.Data(bars, symbols, directory)
+            measured = lambda args: args[0].Time >= measureFrom
+            store = LocalLean.LocalObjectStore(os.path.join(directory, "object_store"))
+            if self.store is not None:
+                self.store(store)
+            parameters = self.parameters(directory) if self.parameters is not None else None
+
+            samples = _Samples()
+            algorithm = algorithmType()
+            algorithm.OnData = _Timed(algorithm.OnData, samples, measured)
+            # A multi-symbol case feeds only the first `symbols` of its universe
+            result = LocalLean.RunAlgorithm(algorithm, data, parameters, end=end, objectStore=store,
+                                            allowMissing=self.multi)
+
+            if allocations:
+                def traced():
+                    algorithm = algorithmType()
+                    algorithm.OnData = _Traced(algorithm.OnData, samples, measured)
+                    LocalLean.RunAlgorithm(algorithm, data, parameters, end=end, objectStore=store,
+                                           allowMissing=self.multi)
+                _Tracing(traced)
+
+        summary = Summarize(samples)
+        summary.update({
+            "symbols": count,
+            "bars": result.Bars,
+            "slices": result.Slices,
+            "replay_s": result.ReplaySeconds,
+            "ondata_s": result.OnDataSeconds,
+            "bars_per_s": result.Bars / result.ReplaySeconds if result.ReplaySeconds else 0.0,
+            "slices_per_s": result.Slices / result.ReplaySeconds if result.ReplaySeconds else 0.0,
+            "dispatch_us_per_slice": result.DispatchSecondsPerSlice * 1e6,
+            "orders": result.Algorithm.Transactions.OrdersCount,
+        })
+        return summary
+
+
+class ComponentCase:
+    """A selection function or framework model called directly.
+
+    setup(universe) returns a no-argument callable making one call; it is
+    run `warmup` times unmeasured, then `calls` times.
+    """
+
+    def __init__(self, name, setup, calls=200, warmup=5):
+        self.name = name
+        self.setup = setup
+        self.calls = calls
+        self.warmup = warmup
+
+    def Run(self, bars, symbols, allocations=True, universe=8000):
+        call = self.setup(universe)
+        for _ in range(self.warmup):
+            call()
+        samples = _Samples()
+        timed = _Timed(call, samples)
+        started = time.perf_counter()
+        for _ in range(self.calls):
+            timed()
+        elapsed = time.perf_counter() - started
+
+        if allocations:
+            traced = _Traced(call, samples)
+            _Tracing(lambda: [traced() for _ in range(self.calls)])
+
+        summary = Summarize(samples)
+        summary.update({"universe": universe, "calls": self.calls,
+                        "calls_per_s": self.calls / elapsed if elapsed else 0.0})
+        return summary
+
+
+def _OptionChains(case, times, directory):
+    return {"?" + case.feeds[0][0]: LocalLean.SyntheticOptionChains()}
+
+
+def _VixAndChains(case, times, directory):
+    # Daily VIX from well before the warm-up (VIXRank looks back 150 bars) to the end
+    first = datetime(times[0].year, times[0].month, times[0].day)
+    vixTimes = BarTimes(first, 200, (times[-1] - first).days + 1, LocalLean.Resolution.Daily)
+    return {"VIX": SyntheticBars("VIX", vixTimes, 18.0, 0.06, 0.0),
+            "?SPY": LocalLean.SyntheticOptionChains()}
+
+
+def _Tweets(case, times, directory):
+    return {"MUSKTWTS": SyntheticTweets(os.path.join(directory, "tweets.csv"), times)}
+
+
+def _TweetSource(directory):
+    # Scores the synthetic tweets once into tweets.csv.scores
+    return {"tweet_source": os.path.join(directory, "tweets.csv")}
+
+
+def _BitcoinModel(store):
+    # Artifact shaped like 14_model.py's network: Dense(30) -> Dense(20) -> Flatten -> Dense(1)
+    import ModelArtifact
+    rng = _Rng("bitcoin model", 0)
+    shapes = [("dense", "relu", (5, 30)), ("dense_1", "relu", (30, 20)),
+              ("flatten", None, None), ("dense_2", "sigmoid", (600, 1))]
+    layers, arrays = [], []
+    for name, activation, shape in shapes:
+        if shape is None:
+            layers.append({"name": name, "class_name": "Flatten", "config": {}, "weights": []})
+            continue
+        layers.append({"name": name, "class_name": "Dense", "config": {"activation": activation},
+                       "weights": [len(arrays), len(arrays) + 1]})
+        arrays += [rng.normal(0, shape[0] ** -0.5, shape).astype(np.float32), np.zeros(shape[1], np.float32)]
+    store.SaveBytes("bitcoin_price_predictor", ModelArtifact.PackArtifact("{}", layers, arrays))
+
+
+def _LoadFile(path):
+    return LocalLean.LoadAlgorithm(os.path.join(HERE, path))
+
+
+def _FrameworkAlgorithm():
+    # 12_Algorithmic_Framework.py imports its alpha model as "AlphaModel"
+    LocalLean.LoadModule(os.path.join(HERE, "12_Alpha_Modeel.py"), "AlphaModel")
+    algorithm = _LoadFile("12_Algorithmic_Framework.py")()
+    # Keep the fundamental snapshots out of the working tree
+    algorithm.SetParameters({"fundamental_store": os.path.join(tempfile.gettempdir(), "benchmark-fundamentals")})
+    algorithm.Initialize()
+    return algorithm
+
+
+def _LoadBitcoinModel(universe):
+    # Object store read + artifact parse + forward-pass build, as in 14_Bit_Coin_Predictor.Initialize
+    _LoadFile("14_Bit_Coin_Predictor.py")
+    import ModelArtifact
+    store = LocalLean.LocalObjectStore(os.path.join(tempfile.gettempdir(), "benchmark-object-store"))
+    _BitcoinModel(store)
+    return lambda: ModelArtifact.LoadModelArtifact(bytes(store.ReadBytes("bitcoin_price_predictor"))).Compile()
+
+
+def _UniverseMerge(universe):
+    # LocalLean's stream merge over a 500-symbol hourly universe with ~5% missing bars
+    count = min(universe, 500)
+    times = BarTimes(datetime(2020, 1, 6), 0, 70, Hour)
+    rng = _Rng("merge", count)
+    streams = []
+    for k in range(count):
+        ticker = f"S{k:03d}"
+        columns = SyntheticBars(ticker, times, 50.0, 0.004, 1e5)
+        keep = rng.random(len(times)) > 0.05
+        subscription = types.SimpleNamespace(symbol=LocalLean.Symbol(ticker), period=timedelta(hours=1))
+        bars = LocalLean._LoadBarArrays({name: values[keep] for name, values in columns.items()}, subscription.period)
+        streams.append((subscription, bars))
+    start, end = times[0] - timedelta(days=1), times[-1] + timedelta(days=1)
+
+    def call():
+        cursors = [LocalLean._BarCursor(subscription, bars, start, end) for subscription, bars in streams]
+        for _, group in LocalLean._StreamMerge(cursors):
+            for k in group:
+                cursors[k].Point()
+    return call
+
+
+CONSOLIDATED_PERIODS = (timedelta(minutes=5), timedelta(minutes=15), timedelta(hours=1), timedelta(days=1))
+
+
+def _MinuteSlices(universe):
+    # A day of minute bars (slice.Bars dicts) for a 500-symbol universe, ~5% missing
+    count = min(universe, 500)
+    times = BarTimes(datetime(2020, 1, 6), 0, 390, Minute)
+    rng = _Rng("minute slices", count)
+    symbols = [LocalLean.Symbol(f"S{k:03d}") for k in range(count)]
+    closes = 50.0 * np.exp(np.cumsum(rng.normal(0.0, 0.001, (len(times), count)), axis=0))
+    slices = []
+    for t, row, keep in zip(times, closes.tolist(), (rng.random((len(times), count)) > 0.05).tolist()):
+        slices.append({symbols[k]: LocalLean.TradeBar(t, symbols[k], c, c * 1.001, c * 0.999, c, 100.0,
+                                                      timedelta(minutes=1))
+                       for k, (c, present) in enumerate(zip(row, keep)) if present})
+    return symbols, slices
+
+
+def _ConsolidatorEngine(universe):
+    # One slice per call through 5/15/60-minute and daily bars, daily bars to a handler
+    LocalLean.LoadModule(os.path.join(HERE, "ConsolidatorEngine.py"), "ConsolidatorEngine")
+    symbols, slices = _MinuteSlices(universe)
+    engine = sys.modules["ConsolidatorEngine"].ConsolidatorEngine(symbols, CONSOLIDATED_PERIODS)
+    engine.OnConsolidated(timedelta(days=1), lambda bar: None)
+    feed = iter(slices * 10)
+    return lambda: engine.Update(next(feed))
+
+
+def _TradeBarConsolidators(universe):
+    # The same work with one LocalLean TradeBarConsolidator per symbol and timeframe
+    symbols, slices = _MinuteSlices(universe)
+    consolidators = {}
+    for symbol in symbols:
+        consolidators[symbol] = [LocalLean.TradeBarConsolidator(period) for period in CONSOLIDATED_PERIODS]
+        consolidators[symbol][-1].DataConsolidated += lambda sender, bar: None
+    feed = iter(slices * 10)
+
+    def call():
+        for symbol, bar in next(feed).items():
+            for consolidator in consolidators[symbol]:
+                consolidator.Update(bar)
+    return call
+
+
+def _WindowMeans(universe, window):
+    # Per call: one new bar into each symbol's 1000-bar window, then every window's mean close
+    symbols, slices = _MinuteSlices(universe)
+    windows = {symbol: window() for symbol in symbols}
+    feed = iter(slices * 10)
+
+    def call(mean):
+        for symbol, bar in next(feed).items():
+            windows[symbol].Add(bar)
+        return [mean(w) for w in windows.values() if len(w)]
+    return call
+
+
+def _RollingWindows(universe):
+    call = _WindowMeans(universe, lambda: LocalLean.RollingWindow(1000))
+    return lambda: call(lambda w: sum(bar.Close for bar in w) / len(w))
+
+
+def _TradeBarWindows(universe):
+    LocalLean.LoadModule(os.path.join(HERE, "BarWindow.py"), "BarWindow")
+    call = _WindowMeans(universe, lambda: sys.modules["BarWindow"].TradeBarWindow(1000))
+    return lambda: call(lambda w: w.Closes.sum() / len(w))
+
+
+def _ChainGreeks(universe):
+    # Per call: implied vols and greeks of a `universe`-contract SPY-like chain
+    # quoted off a volatility smile, then the 25-delta put nearest 25 DTE
+    LocalLean.LoadModule(os.path.join(HERE, "BlackScholes.py"), "BlackScholes")
+    pricing = sys.modules["BlackScholes"]
+    rng = _Rng("chain greeks", universe)
+    days = rng.integers(1, 400, universe)
+    years = days / pricing.YEAR_DAYS
+    spot = np.full(universe, 300.0)
+    strike = np.round(spot * np.exp(rng.normal(0, 0.15, universe) * np.sqrt(years)), 0)
+    isCall = rng.random(universe) < 0.5
+    vol = 0.18 + 0.25 * np.log(strike / spot) ** 2
+    price = pricing.Price(spot, strike, years, vol, isCall, 0.02)
+    window = ~isCall & (np.abs(days - 25) <= 5)
+
+    def call():
+        iv = pricing.ImpliedVolatility(price, spot, strike, years, isCall, 0.02)
+        greeks = pricing.Greeks(spot, strike, years, iv, isCall, 0.02)
+        return pricing.NearestDelta(greeks["delta"], -0.25, window)
+    return call
+
+
+def _DynamicUniverseCoarse(universe):
+    algorithm = _LoadFile("5_Dynamic_Universe.py")()
+    algorithm.Initialize()
+    coarse, _ = SyntheticFundamentals(universe, algorithm.StartDate)
+
+    def call():
+        algorithm.rebalanceTime = datetime.min
+        return algorithm.CoarseFilter(coarse)
+    return call
+
+
+def _DynamicUniverseFine(universe):
+    algorithm = _LoadFile("5_Dynamic_Universe.py")()
+    algorithm.Initialize()
+    _, fine = SyntheticFundamentals(universe, algorithm.StartDate)
+    return lambda: algorithm.FineFilter(fine)
+
+
+def _FrameworkCoarse(universe):
+    algorithm = _FrameworkAlgorithm()
+    coarse, _ = SyntheticFundamentals(universe, algorithm.StartDate)
+
+    def call():
+        algorithm.month = 0
+        return algorithm.CoarseSelectionFunction(coarse)
+    return call
+
+
+def _FrameworkFine(universe):
+    algorithm = _FrameworkAlgorithm()
+    _, fine = SyntheticFundamentals(algorithm.num_coarse, algorithm.StartDate)
+    return lambda: algorithm.FineSelectionFunction(fine)
+
+
+def _FrameworkAlpha(universe):
+    algorithm = _FrameworkAlgorithm()
+    algorithm.Time = algorithm.StartDate
+    _, fine = SyntheticFundamentals(algorithm.num_coarse, algorithm.StartDate)
+    securities = []
+    for f in fine:
+        security = LocalLean.Security(f.Symbol, LocalLean.Resolution.Daily, algorithm)
+        security.Fundamentals = f
+        securities.append(security)
+
+    model = sys.modules["AlphaModel"].FundamentalFactorAlphaModel()
+    model.OnSecuritiesChanged(algorithm, LocalLean.SecurityChanges(securities))
+
+    def call():
+        model.rebalanceTime = datetime.min
+        return model.Update(algorithm, None)
+    return call
+
+
+Daily, Hour, Minute = LocalLean.Resolution.Daily, LocalLean.Resolution.Hour, LocalLean.Resolution.Minute
+
+CASES = [
+    StrategyCase("1_Handling_Data", "1_Handling_Data.py", datetime(2020, 9, 23),
+                 [("SPY", Daily, "equity", 330.0, 0.012, 8e7)]),
+    StrategyCase("2_Trading_And_Orders", "2_Trading_And_Orders.py", datetime(2018, 1, 1),
+                 [("QQQ", Hour, "equity", 155.0, 0.004, 5e6)]),
+    StrategyCase("3_Indicators_Historical_data", "3_Indicators_Historical_data.py", datetime(2020, 1, 1),
+                 [("SPY", Daily, "equity", 320.0, 0.012, 8e7)], history=400),
+    StrategyCase("4_Rolling_Windows_Consolidators", "4_ Rolling_Windows_Consolidators.py", datetime(2018, 1, 1),
+                 [("SPY", Minute, "equity", 270.0, 0.0008, 2e5)]),
+    StrategyCase("6_Trading_Bot", "6_Trading_Bot.py", datetime(2012, 11, 1),
+                 [("TSLA", Minute, "equity", 30.0, 0.0015, 5e4)], extra=_Tweets, parameters=_TweetSource),
+    StrategyCase("7_Backtesting", "7_Backtesting.py", datetime(2018, 1, 1),
+                 [("SPY", Daily, "equity", 270.0, 0.012, 8e7), ("BND", Daily, "equity", 80.0, 0.003, 3e6)],
+                 lead=30),
+    StrategyCase("8_Forex_Trading", "8_Forex_Trading.py", datetime(2015, 1, 1),
+                 [("EURUSD", Daily, "forex", 1.2, 0.005, 1e6)], lead=20),
+    StrategyCase("9_Options", "9_Options.py", datetime(2018, 1, 1),
+                 [("MSFT", Minute, "equity", 85.0, 0.001, 1e5)], lead=21 * 390, extra=_OptionChains),
+    StrategyCase("10_Options2", "10_Options2.py", datetime(2017, 10, 1),
+                 [("SPY", Minute, "equity", 250.0, 0.0008, 2e5)], history=110 * 390, extra=_VixAndChains),
+    StrategyCase("11_Crypto", "11_Crypto.py", datetime(2019, 1, 1),
+                 [(ticker, Daily, "crypto", 10.0 ** (k % 5), 0.04, 1e6 / 10.0 ** (k % 5) * 3)
+                  for k, ticker in enumerate(CRYPTO_UNIVERSE)], history=30, lead=20, multi=True),
+    StrategyCase("14_Bit_Coin_Predictor", "14_Bit_Coin_Predictor.py", datetime(2018, 1, 1),
+                 [("BTCUSD", Daily, "crypto", 10000.0, 0.04, 3e4)], history=40, store=_BitcoinModel),
+    ComponentCase("5_Dynamic_Universe.CoarseFilter", _DynamicUniverseCoarse),
+    ComponentCase("5_Dynamic_Universe.FineFilter", _DynamicUniverseFine),
+    ComponentCase("12_Algorithmic_Framework.CoarseSelectionFunction", _FrameworkCoarse),
+    ComponentCase("12_Algorithmic_Framework.FineSelectionFunction", _FrameworkFine),
+    ComponentCase("12_Alpha_Modeel.Update", _FrameworkAlpha),
+    ComponentCase("14_Bit_Coin_Predictor.LoadModel", _LoadBitcoinModel),
+    ComponentCase("LocalLean.StreamMerge", _UniverseMerge, calls=20, warmup=2),
+    ComponentCase("LocalLean.TradeBarConsolidator", _TradeBarConsolidators),
+    ComponentCase("ConsolidatorEngine.Update", _ConsolidatorEngine),
+    ComponentCase("LocalLean.RollingWindow", _RollingWindows),
+    ComponentCase("BarWindow.TradeBarWindow", _TradeBarWindows),
+    ComponentCase("BlackScholes.ChainGreeks", _ChainGreeks, calls=50),
+]
+
+
+# ---------------------------------------------------------------------
+# Running and comparing
+# ---------------------------------------------------------------------
+def RunBenchmarks(names=None, bars=5000, symbols=len(CRYPTO_UNIVERSE), universe=8000,
+                  allocations=True, log=print):
+    """Run the selected cases (all by default); a case whose file can't load
+    here, e.g. for a missing package, is recorded as skipped."""
+    results = {}
+    for case in CASES:
+        if names and not any(case.name.startswith(n) for n in names):
+            continue
+        started = time.perf_counter()
+        try:
+            if isinstance(case, ComponentCase):
+                results[case.name] = case.Run(bars, symbols, allocations, universe)
+            else:
+                results[case.name] = case.Run(bars, symbols, allocations)
+        except Exception as e:
+            results[case.name] = {"skipped": f"{type(e).__name__}: {e}"}
+        if log is not None:
+            log(_Line(case.name, results[case.name], time.perf_counter() - started))
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "bars": bars,
+            "symbols": symbols,
+            "universe": universe,
+            "allocations": allocations,
+        },
+        "cases": results,
+    }
+
+
+def _Line(name, result, elapsed):
+    if "skipped" in result:
+        return f"{name:<50} skipped ({result['skipped']})"
+    text = (f"{name:<50} p50 {result['p50_us']:9.1f}us  p99 {result['p99_us']:9.1f}us  "
+            f"max {result['max_us']:9.1f}us")
+    if "bars_per_s" in result:
+        text += f"  {result['bars_per_s']:9.0f} bars/s"
+    if "peak_bytes_per_bar" in result:
+        text += f"  {result['peak_bytes_per_bar']:9.0f} B peak  {result['net_blocks_per_bar']:6.2f} blocks"
+    return text + f"  [{elapsed:.1f}s]"
+
+
+def SaveBaseline(path, baseline):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def LoadBaseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+# metric -> True if larger is better
+COMPARED = {"p50_us": False, "p99_us": False, "bars_per_s": True, "calls_per_s": True}
+
+
+def Compare(old, new, threshold=0.10):
+    """Rows of (case, metric, old, new, relative change, regressed) for the
+    cases measured in both baselines."""
+    rows = []
+    for name, after in new["cases"].items():
+        before = old["cases"].get(name)
+        if before is None or "skipped" in before or "skipped" in after:
+            continue
+        for metric, higherIsBetter in COMPARED.items():
+            if metric not in before or metric not in after or not before[metric]:
+                continue
+            change = after[metric] / before[metric] - 1
+            regressed = change < -threshold if higherIsBetter else change > threshold
+            rows.append((name, metric, before[metric], after[metric], change, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("cases", nargs="*", help="case name prefixes (default: all)")
+    parser.add_argument("--bars", type=int, default=5000, help="measured bars per symbol")
+    parser.add_argument("--symbols", type=int, default=len(CRYPTO_UNIVERSE), help="symbols in multi-symbol cases")
+    parser.add_argument("--universe", type=int, default=8000, help="coarse universe size for selection cases")
+    parser.add_argument("--no-allocations", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--save", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two saved baselines")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        old, new = LoadBaseline(args.compare[0]), LoadBaseline(args.compare[1])
+        for key in ("bars", "symbols", "universe", "python", "machine"):
+            if old["meta"].get(key) != new["meta"].get(key):
+                print(f"warning: {key} differs ({old['meta'].get(key)} vs {new['meta'].get(key)})")
+        rows = Compare(old, new, args.threshold)
+        for name, metric, before, after, change, regressed in rows:
+            flag = "REGRESSED" if regressed else ""
+            print(f"{name:<50} {metric:<12} {before:12.1f} -> {after:12.1f} {change:+8.1%} {flag}")
+        return 1 if any(row[-1] for row in rows) else 0
+
+    baseline = RunBenchmarks(args.cases, args.bars, args.symbols, args.universe, not args.no_allocations)
+    if args.save:
+        SaveBaseline(args.save, baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
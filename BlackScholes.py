@@ -0,0 +1,243 @@
+# region imports
+from AlgorithmImports import *
+import math
+import numpy as np
+# endregion
+
+"""
+Black-Scholes-Merton prices, greeks and implied volatility over whole arrays.
+
+Every function takes NumPy arrays (or scalars) that broadcast together, so a
+chain of tens of thousands of contracts is priced in one call:
+    spot, strike    underlying price and strike
+    years           time to expiry in years (ACT/365.25 via YearsToExpiry)
+    vol             annualized volatility
+    call            True for calls, False for puts
+    rate, dividend  continuously compounded risk-free rate and dividend yield
+
+Greeks returns price, delta, gamma, vega (per 1.00 of volatility) and theta
+(per year; divide by 365 for a calendar day). Contracts at or past expiry are
+worth their intrinsic value, with a delta of 1 / -1 in the money and 0 out
+of it.
+
+ImpliedVolatility runs Newton's method on all contracts at once, inside a
+per-contract [low, high] bracket: a Newton step that leaves the bracket, or
+meets a vanishing vega, is replaced by a bisection step, so every contract
+converges. Quotes outside the no-arbitrage bounds (or needing a volatility
+above `high`) come back as NaN.
+
+The normal CDF is W. J. Cody's rational erf / erfc (as in Cephes), good to
+double precision, so there is no SciPy dependency.
+
+Usage:
+    columns = ChainColumns(chain, self.Time)
+    mid = (columns["bid"] + columns["ask"]) / 2
+    iv = ImpliedVolatility(mid, columns["spot"], columns["strike"], columns["years"], columns["call"])
+    greeks = Greeks(columns["spot"], columns["strike"], columns["years"], iv, columns["call"])
+    put = NearestDelta(greeks["delta"], -0.25, ~columns["call"] & (np.abs(columns["days"] - 25) <= 5))
+    contract = columns["contracts"][put]
+"""
+
+YEAR_DAYS = 365.25
+_SQRT2 = math.sqrt(2.0)
+_INV_SQRT_2PI = 1.0 / math.sqrt(2.0 * math.pi)
+
+# Cody / Cephes coefficients, highest degree first
+_ERF_T = [9.60497373987051638749E0, 9.00260197203842689217E1, 2.23200534594684319226E3,
+          7.00332514112805075473E3, 5.55923013010394962768E4]
+_ERF_U = [1.0, 3.35617141647503099647E1, 5.21357949780152679795E2, 4.59432382970980127987E3,
+          2.26290000613890934246E4, 4.92673942608635921086E4]
+_ERFC_P = [2.46196981473530512524E-10, 5.64189564831068821977E-1, 7.46321056442269912687E0,
+           4.86371970985681366614E1, 1.96520832956077098242E2, 5.26445194995477358631E2,
+           9.34528527171957607540E2, 1.02755188689515710272E3, 5.57535335369399327526E2]
+_ERFC_Q = [1.0, 1.32281951154744992508E1, 8.67072140885989742329E1, 3.54937778887819891062E2,
+           9.75708501743205489753E2, 1.82390916687909736289E3, 2.24633760818710981792E3,
+           1.65666309194161350182E3, 5.57535340817727675546E2]
+_ERFC_R = [5.64189583547755073984E-1, 1.27536670759978104416E0, 5.01905042251180477414E0,
+           6.16021097993053585195E0, 7.40974269950448939160E0, 2.97886665372100240670E0]
+_ERFC_S = [1.0, 2.26052863220117276590E0, 9.39603524938001434673E0, 1.20489539808096656605E1,
+           1.70814450747565897222E1, 9.60896809063285878198E0, 3.36907645100081516050E0]
+
+
+def _Erfc(x):
+    # erfc(x) for any x; erf(x) = 1 - erfc(x)
+    x = np.asarray(x, dtype=np.float64)
+    a = np.abs(x)
+    result = np.empty_like(a)
+
+    small = a < 1.0
+    if small.any():
+        z = a[small] ** 2
+        erf = a[small] * np.polyval(_ERF_T, z) / np.polyval(_ERF_U, z)
+        result[small] = 1.0 - erf
+    large = ~small
+    if large.any():
+        b = a[large]
+        near = b < 8.0
+        ratio = np.where(near, np.polyval(_ERFC_P, b) / np.polyval(_ERFC_Q, b),
+                         np.polyval(_ERFC_R, b) / np.polyval(_ERFC_S, b))
+        result[large] = np.exp(-b * b) * ratio
+    return np.where(x < 0, 2.0 - result, result)
+
+
+def NormCdf(x):
+    return 0.5 * _Erfc(-np.asarray(x, dtype=np.float64) / _SQRT2)
+
+
+def NormPdf(x):
+    x = np.asarray(x, dtype=np.float64)
+    return _INV_SQRT_2PI * np.exp(-0.5 * x * x)
+
+
+def YearsToExpiry(expiries, time):
+    # Option expiries (datetime / datetime64, assumed to expire at the 16:00 close) -> years from time
+    expiries = np.asarray(expiries, dtype="datetime64[us]") + np.timedelta64(16, "h")
+    seconds = (expiries - np.datetime64(time, "us")) / np.timedelta64(1, "s")
+    return np.maximum(seconds, 0.0) / (YEAR_DAYS * 86400)
+
+
+def _Inputs(call, *values):
+    # Call flags as +1 / -1 and the float inputs, broadcast to one shape
+    values = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in values))
+    call = np.broadcast_to(np.asarray(call, dtype=bool), values[0].shape)
+    return (np.where(call, 1.0, -1.0),) + tuple(values)
+
+
+def _D1D2(spot, strike, years, vol, rate, dividend):
+    # d1, d2, sqrt(T) and the live (T > 0, vol > 0) mask; dead entries get finite dummies
+    live = (years > 0) & (vol > 0)
+    root = np.sqrt(np.where(live, years, 1.0))
+    width = np.where(live, vol, 1.0) * root
+    d1 = (np.log(spot / strike) + (rate - dividend) * years) / width + 0.5 * width
+    return d1, d1 - width, root, live
+
+
+def Price(spot, strike, years, vol, call=True, rate=0.0, dividend=0.0):
+    sign, spot, strike, years, vol, rate, dividend = _Inputs(call, spot, strike, years, vol, rate, dividend)
+    years = np.maximum(years, 0.0)
+    d1, d2, _, live = _D1D2(spot, strike, years, vol, rate, dividend)
+    forward = spot * np.exp(-dividend * years)
+    discounted = strike * np.exp(-rate * years)
+    value = sign * (forward * NormCdf(sign * d1) - discounted * NormCdf(sign * d2))
+    return np.where(live, value, np.maximum(sign * (forward - discounted), 0.0))
+
+
+def Greeks(spot, strike, years, vol, call=True, rate=0.0, dividend=0.0):
+    """{"price", "delta", "gamma", "vega", "theta"} arrays; vega per 1.00 of
+    volatility, theta per year."""
+    sign, spot, strike, years, vol, rate, dividend = _Inputs(call, spot, strike, years, vol, rate, dividend)
+    years = np.maximum(years, 0.0)
+    d1, d2, root, live = _D1D2(spot, strike, years, vol, rate, dividend)
+    forward = spot * np.exp(-dividend * years)
+    discounted = strike * np.exp(-rate * years)
+    nd1 = NormCdf(sign * d1)
+    nd2 = NormCdf(sign * d2)
+    density = NormPdf(d1)
+    sigma = np.where(live, vol, 1.0)
+
+    price = sign * (forward * nd1 - discounted * nd2)
+    delta = sign * np.exp(-dividend * years) * nd1
+    gamma = np.exp(-dividend * years) * density / (spot * sigma * root)
+    vega = forward * density * root
+    theta = -forward * density * sigma / (2 * root) - sign * (rate * discounted * nd2 - dividend * forward * nd1)
+
+    # Expired (or zero-volatility) contracts: intrinsic value, step delta
+    if not live.all():
+        dead = ~live
+        moneyness = sign * (forward - discounted)
+        price = np.where(dead, np.maximum(moneyness, 0.0), price)
+        delta = np.where(dead, np.where(moneyness > 0, sign * np.exp(-dividend * years), 0.0), delta)
+        gamma = np.where(dead, 0.0, gamma)
+        vega = np.where(dead, 0.0, vega)
+        theta = np.where(dead, 0.0, theta)
+    return {"price": price, "delta": delta, "gamma": gamma, "vega": vega, "theta": theta}
+
+
+def _PriceVega(spot, strike, years, vol, sign, rate, dividend):
+    # Price and vega of live contracts (years > 0, vol > 0); sign is +1 call / -1 put
+    root = np.sqrt(years)
+    width = vol * root
+    d1 = (np.log(spot / strike) + (rate - dividend) * years) / width + 0.5 * width
+    d2 = d1 - width
+    forward = spot * np.exp(-dividend * years)
+    discounted = strike * np.exp(-rate * years)
+    price = sign * (forward * NormCdf(sign * d1) - discounted * NormCdf(sign * d2))
+    return price, forward * NormPdf(d1) * root
+
+
+def ImpliedVolatility(price, spot, strike, years, call=True, rate=0.0, dividend=0.0,
+                      tolerance=1e-8, iterations=100, low=1e-4, high=5.0):
+    """Volatility that reprices every contract to `price` within `tolerance`,
+    NaN where no volatility in [low, high] does (or the contract has expired)."""
+    sign, price, spot, strike, years, rate, dividend = _Inputs(call, price, spot, strike, years, rate, dividend)
+    result = np.full(price.shape, np.nan)
+
+    # No-arbitrage bounds; a quote at or outside them has no implied volatility
+    forward = spot * np.exp(-dividend * years)
+    discounted = strike * np.exp(-rate * years)
+    floor = np.maximum(sign * (forward - discounted), 0.0)
+    cap = np.where(sign > 0, forward, discounted)
+    index = np.flatnonzero((years > 0) & (price > floor) & (price < cap))
+    inputs = [a.ravel()[index] for a in (price, spot, strike, years, sign, rate, dividend)]
+
+    # ... and one a volatility of `high` can't reach is out of range too
+    top, _ = _PriceVega(*inputs[1:4], np.full(index.shape, high), *inputs[4:])
+    keep = top >= inputs[0]
+    index = index[keep]
+    p, s, k, t, q, r, d = (a[keep] for a in inputs)
+
+    # Brenner-Subrahmanyam starting point, inside the bracket
+    lo = np.full(index.shape, low)
+    hi = np.full(index.shape, high)
+    vol = np.clip(np.sqrt(2 * np.pi / t) * p / s, 2 * low, high / 2)
+    solved = result.ravel()
+    for _ in range(iterations):
+        if index.size == 0:
+            break
+        value, vega = _PriceVega(s, k, t, vol, q, r, d)
+        diff = value - p
+
+        # Price rises with volatility: shrink the bracket around the root
+        hi = np.where(diff > 0, vol, hi)
+        lo = np.where(diff < 0, vol, lo)
+        done = (np.abs(diff) <= tolerance) | (hi - lo <= tolerance * 1e-3)
+        solved[index[done]] = vol[done]
+
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            step = vol - diff / vega
+        bisect = ~np.isfinite(step) | (step <= lo) | (step >= hi)
+        vol = np.where(bisect, 0.5 * (lo + hi), step)
+
+        pending = ~done
+        p, s, k, t, q, r, d, index, lo, hi, vol = (a[pending] for a in (p, s, k, t, q, r, d, index, lo, hi, vol))
+    return result
+
+
+def ChainColumns(chain, time):
+    """Arrays of an OptionChain (or any iterable of OptionContracts), for the
+    functions above: strike, expiry, days, years, call, bid, ask and spot,
+    plus the contracts themselves as a list in the same order."""
+    contracts = list(chain)
+    expiries = [c.Expiry for c in contracts]
+    columns = {
+        "contracts": contracts,
+        "strike": np.array([c.Strike for c in contracts], dtype=np.float64),
+        "expiry": np.array(expiries, dtype="datetime64[us]"),
+        "days": np.array([(e - time).days for e in expiries], dtype=np.int64),
+        "years": YearsToExpiry(expiries, time),
+        "call": np.array([c.Right == OptionRight.Call for c in contracts], dtype=bool),
+        "bid": np.array([c.BidPrice for c in contracts], dtype=np.float64),
+        "ask": np.array([c.AskPrice for c in contracts], dtype=np.float64),
+        "spot": np.array([c.UnderlyingLastPrice for c in contracts], dtype=np.float64),
+    }
+    return columns
+
+
+def NearestDelta(delta, target, mask=None):
+    # Position of the delta closest to target (among mask), None if there is none
+    distance = np.abs(np.asarray(delta, dtype=np.float64) - target)
+    if mask is not None:
+        distance = np.where(mask, distance, np.nan)
+    if distance.size == 0 or np.isnan(distance).all():
+        return None
+    return int(np.nanargmin(distance))
@@ -0,0 +1,197 @@
+# region imports
+from AlgorithmImports import *
+import numpy as np
+# endregion
+
+"""
+Many timeframes for many symbols, consolidated in one array pass per slice.
+
+The working bar of every (timeframe, symbol) pair lives in one state block:
+`start` holds the period start of each working bar (epoch seconds, -1 for
+none) and `working` its open / high / low / close / volume, shaped
+(timeframes, symbols). Update(slice.Bars) advances every timeframe of every
+symbol with a bar in the slice with a fixed number of array operations; only
+the bars that complete become TradeBar objects, for the handlers.
+
+The rules are TradeBarConsolidator's: a bar belongs to the period that
+contains its start (periods are aligned to midnight for daily bars and to
+multiples of the period otherwise); a bar in a new period emits the working
+bar, and a working bar is emitted as soon as an input bar reaches its end.
+Handlers see the same bars, in the same order, as one consolidator per
+symbol and timeframe would give them.
+
+ConsolidateBars is the batch form: it reduces a whole column dict (e.g. a
+BarStore file's Slice(), memory-mapped) to a higher timeframe with
+group-by-period reductions and returns columns in the same format.
+
+Usage:
+    self.engine = ConsolidatorEngine(symbols, (timedelta(minutes=5), timedelta(minutes=15),
+                                               timedelta(hours=1), Resolution.Daily))
+    self.engine.OnConsolidated(Resolution.Daily, self.OnDailyBar)
+    ...
+    def OnData(self, data):
+        self.engine.Update(data.Bars)
+
+    daily = ConsolidateBars(BarStore.BarFile("data/bars/minute/SPY.bars").Slice(), timedelta(days=1))
+"""
+
+_EPOCH = datetime(1970, 1, 1)
+_SECOND = timedelta(seconds=1)
+
+PERIOD_SECONDS = {
+    Resolution.Minute: 60,
+    Resolution.Hour: 3600,
+    Resolution.Daily: 86400,
+}
+
+OPEN, HIGH, LOW, CLOSE, VOLUME = range(5)
+
+
+def _Period(period):
+    # Resolution or timedelta -> timedelta
+    if isinstance(period, timedelta):
+        return period
+    return timedelta(seconds=PERIOD_SECONDS[period])
+
+
+class ConsolidatorEngine:
+
+    def __init__(self, symbols, periods=(timedelta(minutes=5), timedelta(minutes=15),
+                                         timedelta(hours=1), timedelta(days=1))):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.periods = [_Period(p) for p in periods]
+        self.steps = np.array([p // _SECOND for p in self.periods], dtype=np.int64)[:, None]
+        shape = (len(self.periods), len(self.symbols))
+
+        self.start = np.full(shape, -1, dtype=np.int64)       # working bar period start
+        self.working = np.zeros((5,) + shape)                 # working bar OHLCV
+        self.last = np.full((5,) + shape, np.nan)             # last emitted bar OHLCV
+        self.lastStart = np.full(shape, -1, dtype=np.int64)
+        self.counts = np.zeros(shape, dtype=np.int64)         # bars emitted
+        self.handlers = [[] for _ in self.periods]
+
+    def Row(self, period):
+        return self.periods.index(_Period(period))
+
+    def OnConsolidated(self, period, handler):
+        # handler(TradeBar) for every bar of `period`, as with QCAlgorithm.Consolidate
+        self.handlers[self.Row(period)].append(handler)
+
+    def Update(self, bars):
+        # slice.Bars (or any symbol -> TradeBar mapping)
+        lookup = self.index.get
+        seconds = {}
+        index, starts, ends, values = [], [], [], []
+        for symbol, bar in bars.items():
+            i = lookup(symbol)
+            if i is None:
+                continue
+            # Bars of one slice share their times: convert each distinct one once
+            times = (bar.Time, bar.EndTime)
+            span = seconds.get(times)
+            if span is None:
+                span = seconds[times] = ((bar.Time - _EPOCH) // _SECOND, (bar.EndTime - _EPOCH) // _SECOND)
+            index.append(i)
+            starts.append(span[0])
+            ends.append(span[1])
+            values.append((bar.Open, bar.High, bar.Low, bar.Close, bar.Volume))
+        if index:
+            values = np.array(values, dtype=float).T
+            self.UpdateMany(np.array(index), np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64),
+                            *values)
+
+    def UpdateMany(self, index, starts, ends, opens, highs, lows, closes, volumes):
+        # One input bar per symbol in `index` (no repeats); times in epoch seconds
+        steps = self.steps
+        periodStart = starts - starts % steps                  # (timeframes, bars)
+        current = self.start[:, index]
+        roll = (current >= 0) & (current != periodStart)
+        fresh = (current < 0) | roll
+
+        old = self.working[:, :, index]
+        new = np.empty_like(old)
+        new[OPEN] = np.where(fresh, opens, old[OPEN])
+        new[HIGH] = np.where(fresh, highs, np.maximum(old[HIGH], highs))
+        new[LOW] = np.where(fresh, lows, np.minimum(old[LOW], lows))
+        new[CLOSE] = closes
+        new[VOLUME] = np.where(fresh, volumes, old[VOLUME] + volumes)
+        done = ends >= periodStart + steps
+
+        self.start[:, index] = np.where(done, -1, periodStart)
+        self.working[:, :, index] = new
+        if roll.any() or done.any():
+            self._Emit(index, roll, current, old, done, periodStart, new)
+
+    def Flush(self):
+        # Emit every working bar, complete or not (end of data)
+        pending = self.start >= 0
+        self._Record(pending, self.start, self.working, np.arange(len(self.symbols)))
+        rows, columns = np.nonzero(pending)
+        for row, column in zip(rows.tolist(), columns.tolist()):
+            if self.handlers[row]:
+                self._Publish(row, column, int(self.start[row, column]), self.working[:, row, column])
+        self.start[pending] = -1
+
+    def _Emit(self, index, roll, rollStarts, rollValues, done, doneStarts, doneValues):
+        self._Record(roll, rollStarts, rollValues, index)
+        self._Record(done, doneStarts, doneValues, index)
+        rows = np.flatnonzero(roll.any(axis=1) | done.any(axis=1))
+        if not any(self.handlers[row] for row in rows.tolist()):
+            return
+
+        # Per input bar, per timeframe: the rolled-over bar first, then a completed one
+        rolled, completed = np.nonzero(roll), np.nonzero(done)
+        kinds = np.r_[np.zeros(rolled[0].size, np.int64), np.ones(completed[0].size, np.int64)]
+        periods = np.r_[rolled[0], completed[0]]
+        positions = np.r_[rolled[1], completed[1]]
+        for k in np.lexsort((kinds, periods, positions)).tolist():
+            row, position = int(periods[k]), int(positions[k])
+            if self.handlers[row]:
+                starts, values = (rollStarts, rollValues) if kinds[k] == 0 else (doneStarts, doneValues)
+                self._Publish(row, int(index[position]), int(starts[row, position]), values[:, row, position])
+
+    def _Record(self, mask, starts, values, index):
+        # Last emitted bar and counts for the (timeframe, position) cells in mask
+        rows, positions = np.nonzero(mask)
+        if rows.size:
+            columns = index[positions]
+            self.last[:, rows, columns] = values[:, rows, positions]
+            self.lastStart[rows, columns] = starts[rows, positions]
+            self.counts[rows, columns] += 1
+
+    def _Publish(self, row, column, start, values):
+        bar = TradeBar(_EPOCH + timedelta(seconds=start), self.symbols[column], *values.tolist(), self.periods[row])
+        for handler in self.handlers[row]:
+            handler(bar)
+
+
+def ConsolidateBars(columns, period, barPeriod=timedelta(minutes=1), partial=False):
+    """Higher-timeframe bars from a column dict {"time", "open", ..., "volume"}.
+
+    `time` is the bar start in epoch seconds, strictly increasing, as in
+    BarStore / LoadBars, and every input bar lasts barPeriod. Returns the
+    same format with one row per period that has bars. The last period is
+    dropped unless it is complete (its last input bar reaches the period
+    end) or partial=True, matching what a streaming consolidator has
+    emitted by the end of the data.
+    """
+    times = np.asarray(columns["time"], dtype=np.int64)
+    if times.size == 0:
+        return {name: np.asarray(columns[name])[:0] for name in ("time", "open", "high", "low", "close", "volume")}
+    step = _Period(period) // _SECOND
+    keys = times // step
+    first = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    last = np.r_[first[1:], times.size] - 1
+
+    result = {
+        "time": keys[first] * step,
+        "open": np.asarray(columns["open"])[first],
+        "high": np.maximum.reduceat(np.asarray(columns["high"]), first),
+        "low": np.minimum.reduceat(np.asarray(columns["low"]), first),
+        "close": np.asarray(columns["close"])[last],
+        "volume": np.add.reduceat(np.asarray(columns["volume"], dtype=np.float64), first),
+    }
+    if not partial and times[-1] + _Period(barPeriod) // _SECOND < result["time"][-1] + step:
+        result = {name: values[:-1] for name, values in result.items()}
+    return result
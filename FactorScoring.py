@@ -0,0 +1,247 @@
+# region imports
+from AlgorithmImports import *
+import numpy as np
+# endregion
+
+"""
+Columnar multi-factor rank scoring.
+
+Each factor is pulled into one array per group, ranked with a stable argsort
+and the ranks are summed with per-factor weights; the best `count` rows by
+score come out of one more stable argsort.
+
+Ties:
+    "ordinal"  each row gets its own rank and equal values keep their input
+               order. This is what sorted(...).index(x) gives, so a scorer
+               over the same iteration order reproduces it exactly.
+    "min"      equal values share the best rank of their run (1224 ranking)
+    "average"  equal values share the mean rank of their run
+Equal scores always keep their input order. NaN values rank last.
+
+SectorIndex keeps the groups themselves: symbol -> (sector, slot) and, per
+sector, a compact member list with its factor columns, so adding, moving or
+removing a security is O(1) and scoring a sector reads ready arrays.
+
+Usage:
+    scorer = FactorScorer([Factor("ROE", lambda f: f.OperationRatios.ROE.Value),
+                           Factor("PE", lambda f: f.ValuationRatios.PERatio, descending=False)],
+                          weights=[2, 1])
+    best = scorer.Select([security.Fundamentals for security in securities], count)
+"""
+
+RANK_TIES = ("ordinal", "min", "average")
+
+
+class Factor:
+    # A named value read from each item; descending=True means higher is better
+
+    def __init__(self, name, value, descending=True):
+        self.name = name
+        self.value = value
+        self.descending = descending
+
+    def Column(self, items):
+        return np.fromiter((self.value(item) for item in items), dtype=np.float64, count=len(items))
+
+
+# The three factors of FundamentalFactorAlphaModel, read from a Fundamentals object
+RETURN_ON_EQUITY = Factor("ROE", lambda f: f.OperationRatios.ROE.Value)
+NET_MARGIN = Factor("NetMargin", lambda f: f.OperationRatios.NetMargin.Value)
+PE_RATIO = Factor("PERatio", lambda f: f.ValuationRatios.PERatio, descending=False)
+QUALITY_VALUE_FACTORS = (RETURN_ON_EQUITY, NET_MARGIN, PE_RATIO)
+
+
+def Ranks(values, descending=False, ties="ordinal"):
+    # 0-based rank of every value, best first
+    values = np.asarray(values, dtype=np.float64)
+    if ties not in RANK_TIES:
+        raise ValueError(f"ties must be one of {RANK_TIES}, got {ties!r}")
+
+    # Negating keeps a stable sort stable for descending order, and NaN still sorts last
+    keys = -values if descending else values
+    order = np.argsort(keys, kind="stable")
+    ranks = np.empty(values.size, dtype=np.int64 if ties != "average" else np.float64)
+    ranks[order] = np.arange(values.size)
+    if ties == "ordinal" or values.size == 0:
+        return ranks
+
+    # Runs of equal values in sorted order (NaNs form one run)
+    ordered = keys[order]
+    starts = np.ones(values.size, dtype=bool)
+    starts[1:] = ~((ordered[1:] == ordered[:-1]) | (np.isnan(ordered[1:]) & np.isnan(ordered[:-1])))
+    run = np.cumsum(starts) - 1
+    first = np.flatnonzero(starts)
+    if ties == "min":
+        ranks[order] = first[run]
+    else:
+        last = np.append(first[1:], values.size) - 1
+        ranks[order] = ((first + last) / 2)[run]
+    return ranks
+
+
+def RankScores(columns, descending, weights=None, ties="ordinal"):
+    # Weighted sum of the per-factor ranks of a (factors, rows) block; lower is better
+    columns = np.atleast_2d(np.asarray(columns, dtype=np.float64))
+    if weights is None:
+        weights = np.ones(columns.shape[0], dtype=np.int64)
+    scores = 0
+    for column, down, weight in zip(columns, descending, weights):
+        scores = scores + weight * Ranks(column, down, ties)
+    return np.broadcast_to(scores, columns.shape[1:]).copy()
+
+
+def TopByScore(scores, count):
+    # Positions of the `count` lowest scores, best first; equal scores keep input order
+    return np.argsort(scores, kind="stable")[:count]
+
+
+class FactorScorer:
+
+    def __init__(self, factors=QUALITY_VALUE_FACTORS, weights=None, ties="ordinal"):
+        self.factors = list(factors)
+        if weights is not None and len(weights) != len(self.factors):
+            raise ValueError(f"{len(self.factors)} factors but {len(weights)} weights")
+        self.weights = weights
+        self.ties = ties
+        self.descending = [factor.descending for factor in self.factors]
+
+    def Columns(self, items):
+        # (factors, items) array of factor values
+        columns = np.empty((len(self.factors), len(items)))
+        for row, factor in enumerate(self.factors):
+            columns[row] = factor.Column(items)
+        return columns
+
+    def Scores(self, items):
+        return self.ScoreColumns(self.Columns(items))
+
+    def ScoreColumns(self, columns):
+        # Scores from an already gathered (factors, items) block
+        return RankScores(columns, self.descending, self.weights, self.ties)
+
+    def Select(self, items, count):
+        # Positions in `items` of the best `count` items, best first
+        if not items:
+            return np.empty(0, dtype=np.int64)
+        return TopByScore(self.Scores(items), count)
+
+
+def MorningstarSector(security):
+    return security.Fundamentals.AssetClassification.MorningstarSectorCode
+
+
+class _SectorGroup:
+    __slots__ = ("members", "columns", "filled")
+
+    def __init__(self, factors):
+        self.members = []                         # securities, in slot order
+        self.columns = np.empty((factors, 8))     # factor values, one column per slot
+        self.filled = 0                           # slots below this hold current values
+
+
+class SectorIndex:
+    """
+    Securities grouped by sector with their factor values kept as columns.
+
+    Members of a sector sit in slots 0..n-1; removing one moves the last
+    member into its slot, so the arrays stay compact and the order within a
+    sector is the order of that history, not of insertion.
+    Factor values are read from security.Fundamentals the first time a
+    sector's columns are asked for after the member arrived, or after
+    Refresh() marked it stale; adds and removes themselves never read
+    fundamentals, and members nobody marked keep the values they had.
+    """
+
+    def __init__(self, factors, sectorOf=MorningstarSector):
+        self.factors = list(factors)
+        self.sectorOf = sectorOf
+        self.location = {}    # symbol -> (sector, slot)
+        self.groups = {}      # sector -> _SectorGroup
+
+    def __iter__(self):
+        return iter(self.groups)
+
+    def __len__(self):
+        return len(self.location)
+
+    def __contains__(self, symbol):
+        return symbol in self.location
+
+    def SectorOf(self, symbol):
+        entry = self.location.get(symbol)
+        return None if entry is None else entry[0]
+
+    def Members(self, sector):
+        group = self.groups.get(sector)
+        return [] if group is None else group.members
+
+    def Columns(self, sector):
+        # (factors, members) view of the sector's factor values
+        group = self.groups.get(sector)
+        if group is None:
+            return np.empty((len(self.factors), 0))
+        members = group.members
+        size = len(members)
+        if group.filled < size:
+            if size > group.columns.shape[1]:
+                grown = np.empty((len(self.factors), max(2 * group.columns.shape[1], size)))
+                grown[:, :group.filled] = group.columns[:, :group.filled]
+                group.columns = grown
+            fundamentals = [security.Fundamentals for security in members[group.filled:]]
+            for row, factor in enumerate(self.factors):
+                group.columns[row, group.filled:size] = factor.Column(fundamentals)
+            group.filled = size
+        return group.columns[:, :size]
+
+    def Add(self, security):
+        symbol = security.Symbol
+        sector = self.sectorOf(security)
+        entry = self.location.get(symbol)
+        if entry is not None:
+            if entry[0] == sector:
+                # Already in this sector: take the new object, re-read its values
+                group = self.groups[sector]
+                group.members[entry[1]] = security
+                group.filled = min(group.filled, entry[1])
+                return
+            self.Remove(symbol)
+
+        group = self.groups.get(sector)
+        if group is None:
+            group = self.groups[sector] = _SectorGroup(len(self.factors))
+        self.location[symbol] = (sector, len(group.members))
+        group.members.append(security)
+
+    def Remove(self, security):
+        # Accepts a security or a symbol; returns False if it wasn't indexed
+        symbol = getattr(security, "Symbol", security)
+        entry = self.location.pop(symbol, None)
+        if entry is None:
+            return False
+        sector, slot = entry
+        group = self.groups[sector]
+        members = group.members
+        last = len(members) - 1
+        if slot != last:
+            moved = members[slot] = members[last]
+            self.location[moved.Symbol] = (sector, slot)
+            if last < group.filled:
+                group.columns[:, slot] = group.columns[:, last]
+            else:
+                group.filled = min(group.filled, slot)
+        members.pop()
+        group.filled = min(group.filled, last)
+        return True
+
+    def Refresh(self, securities=None):
+        # Re-read the factor values of these securities (or symbols), or of every
+        # member if none are given, on next use
+        if securities is None:
+            for group in self.groups.values():
+                group.filled = 0
+            return
+        for security in securities:
+            entry = self.location.get(getattr(security, "Symbol", security))
+            if entry is not None:
+                group = self.groups[entry[0]]
+                group.filled = min(group.filled, entry[1])
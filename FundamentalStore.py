@@ -0,0 +1,109 @@
+# region imports
+from AlgorithmImports import *
+import os
+import numpy as np
+# endregion
+
+"""
+Date-partitioned columnar cache of fine fundamentals.
+
+A snapshot is the fine universe of one selection date, stored as one
+structured .npy file per date, <root>/<YYYYMMDD>.npy: a ticker column plus
+one column per field, rows in the order the fine objects arrived. The first
+backtest over a date reads every field once from the fine objects and
+writes the partition; later backtests over the same date memory-map the
+file instead, so fine selection becomes a boolean mask over columns.
+
+A partition is only reused when its tickers match the fine universe being
+selected, in the same order; otherwise it is rebuilt. Partitions are
+written to a temporary file and renamed into place, so a run that is
+interrupted, or two runs racing on one date, never leave a partial snapshot.
+
+Usage:
+    store = FundamentalStore("data/fundamentals")
+    snapshot = store.Snapshot(self.Time, fine)
+    mask = (snapshot["roe"] > 0) & np.isin(snapshot["sector"], sectors)
+    return [snapshot.symbols[i] for i in np.flatnonzero(mask)]
+"""
+
+DEFAULT_ROOT = os.path.join("data", "fundamentals")
+
+# name -> (dtype, reader of a FineFundamental)
+FUNDAMENTAL_FIELDS = {
+    "ipoDate": ("datetime64[us]", lambda f: f.SecurityReference.IPODate),
+    "sector": (np.int64, lambda f: f.AssetClassification.MorningstarSectorCode),
+    "roe": (np.float64, lambda f: f.OperationRatios.ROE.Value),
+    "netMargin": (np.float64, lambda f: f.OperationRatios.NetMargin.Value),
+    "peRatio": (np.float64, lambda f: f.ValuationRatios.PERatio),
+    "marketCap": (np.float64, lambda f: f.MarketCap),
+}
+
+
+class FundamentalSnapshot:
+    # Columns of one selection date, row i belonging to symbols[i]
+
+    def __init__(self, date, symbols, table, cached):
+        self.date = date
+        self.symbols = symbols      # Symbol objects of the current fine universe
+        self.table = table          # structured array (read-only memmap when cached)
+        self.cached = cached        # True if the partition was already on disk
+
+    def __getitem__(self, name):
+        return self.table[name]
+
+    def __len__(self):
+        return len(self.symbols)
+
+
+class FundamentalStore:
+
+    def __init__(self, root=DEFAULT_ROOT, fields=FUNDAMENTAL_FIELDS):
+        self.root = root
+        self.fields = fields
+        self.hits = 0
+        self.builds = 0
+
+    def PartitionPath(self, date):
+        return os.path.join(self.root, f"{date:%Y%m%d}.npy")
+
+    def Snapshot(self, date, fine):
+        fine = list(fine)
+        symbols = [f.Symbol for f in fine]
+        tickers = np.array([symbol.Value for symbol in symbols], dtype=str)
+        path = self.PartitionPath(date)
+
+        table = self._Load(path, tickers)
+        if table is not None:
+            self.hits += 1
+            return FundamentalSnapshot(date, symbols, table, True)
+
+        dtype = [("ticker", tickers.dtype)] + [(name, dtype) for name, (dtype, _) in self.fields.items()]
+        table = np.empty(len(fine), dtype=dtype)
+        table["ticker"] = tickers
+        for name, (_, read) in self.fields.items():
+            table[name] = [read(f) for f in fine]
+        self._Save(path, table)
+        self.builds += 1
+        return FundamentalSnapshot(date, symbols, table, False)
+
+    def _Load(self, path, tickers):
+        if not os.path.isfile(path):
+            return None
+        try:
+            table = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        names = table.dtype.names or ()
+        # A store written with other fields, or for a different fine universe, is rebuilt
+        if "ticker" not in names or any(name not in names for name in self.fields):
+            return None
+        if table.shape != tickers.shape or not np.array_equal(table["ticker"], tickers):
+            return None
+        return table
+
+    def _Save(self, path, table):
+        os.makedirs(self.root, exist_ok=True)
+        staging = f"{path}.tmp-{os.getpid()}"
+        with open(staging, "wb") as f:
+            np.save(f, table)
+        os.replace(staging, path)
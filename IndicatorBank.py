@@ -0,0 +1,159 @@
+# region imports
+from AlgorithmImports import *
+import numpy as np
+# endregion
+
+"""
+Struct-of-arrays indicators for a whole universe, updated in one step per slice.
+
+Instead of one RSI / BB / SMA object per symbol, the recent samples of every
+symbol sit in one ring array (depth, fields, symbols) and each indicator
+window is a row of running sums over it. A slice updates all the symbols
+that have a bar with a fixed number of array operations, so the per-bar
+cost barely grows with the universe size.
+
+Sums are updated in the same order as the per-symbol indicators (add the new
+sample, then drop the expired one), so between rebases the values are
+identical to theirs. Every RebaseInterval updates a symbol's sums are
+recomputed from its ring instead, so the rounding error of the add/subtract
+updates, which matters most for the sum of squared closes at BTC prices,
+can't build up over a long backtest; right after a rebase the values can
+differ from the per-symbol indicators in the last few digits.
+"""
+
+# Exit reasons returned by CryptoIndicatorBank.Signals, in the order they are checked
+EXIT_NONE = 0
+EXIT_VOLUME = 1
+EXIT_RSI = 2
+EXIT_MIDDLE_BAND = 3
+
+
+class CryptoIndicatorBank:
+    """
+    RSI(rsiPeriod, Simple), BB(bbPeriod, k, Simple) and the average dollar
+    volume SMA(volume) * SMA(close) over volumePeriod, for every symbol.
+
+    Feed it slice.Bars once per OnData; read the columns (rsi, middle,
+    upper, lower, dollarVolume, close) or ask Signals() for the entry and
+    exit masks. `held` is kept by the algorithm from its fills.
+    """
+
+    # Recompute a symbol's running sums from the ring every N of its updates so
+    # the incremental add/subtract can never drift far from the true sums
+    RebaseInterval = 1000
+
+    def __init__(self, symbols, rsiPeriod=14, bbPeriod=20, k=2, volumePeriod=30):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        size = len(self.symbols)
+
+        self.rsiPeriod = rsiPeriod
+        self.bbPeriod = bbPeriod
+        self.k = k
+
+        # Six running sums per symbol: gain and loss over rsiPeriod, close and
+        # close² over bbPeriod, volume and close over volumePeriod. The ring
+        # keeps the last samples of each, so the one leaving a window is a lookup.
+        self.windows = np.array([rsiPeriod, rsiPeriod, bbPeriod, bbPeriod, volumePeriod, volumePeriod])[:, None]
+        self.depth = int(self.windows.max())
+        self.rows = np.arange(6)[:, None]
+        self.ring = np.zeros((self.depth, 6, size))
+        self.sums = np.zeros((6, size))
+        # Gains start with the second sample, so their windows fill one sample later
+        self.lag = np.array([1, 1, 0, 0, 0, 0])[:, None]
+
+        self.samples = np.zeros(size, dtype=np.int64)
+        self.updatesSinceRebase = np.zeros(size, dtype=np.int64)
+        self.close = np.zeros(size)          # last close, i.e. the security price
+        self.rsi = np.zeros(size)
+        self.middle = np.zeros(size)
+        self.upper = np.zeros(size)
+        self.lower = np.zeros(size)
+        self.dollarVolume = np.zeros(size)
+        self.held = np.zeros(size, dtype=bool)
+
+    def Update(self, bars):
+        # Only the symbols with a bar in this slice advance
+        lookup = self.index.get
+        index, closes, volumes = [], [], []
+        for symbol, bar in bars.items():
+            i = lookup(symbol)
+            if i is not None:
+                index.append(i)
+                closes.append(bar.Close)
+                volumes.append(bar.Volume)
+        if index:
+            self.UpdateMany(np.array(index), np.array(closes, dtype=float), np.array(volumes, dtype=float))
+
+    def UpdateMany(self, index, closes, volumes):
+        count = self.samples[index]
+        change = np.where(count > 0, closes - self.close[index], 0.0)
+
+        new = np.empty((6, index.size))
+        new[0] = np.where(change > 0, change, 0.0)
+        new[1] = np.where(change < 0, -change, 0.0)
+        new[2] = closes
+        new[3] = closes * closes
+        new[4] = volumes
+        new[5] = closes
+
+        # Samples leaving each window; zero while a window isn't full (the
+        # first, missing gain is stored as zero too)
+        ring = self.ring
+        expired = ring[(count - self.windows) % self.depth, self.rows, index]
+        expired[count < self.windows] = 0.0
+        ring[count % self.depth, :, index] = new.T
+
+        # Add the new sample, then drop the expired one
+        sums = self.sums[:, index]
+        sums += new
+        sums -= expired
+        since = self.updatesSinceRebase[index] + 1
+        due = since >= self.RebaseInterval
+        if due.any():
+            sums[:, due] = self._RingSums(index[due], count[due] + 1)
+            since[due] = 0
+        self.updatesSinceRebase[index] = since
+        self.sums[:, index] = sums
+        lengths = np.maximum(np.minimum(count + 1 - self.lag, self.windows), 1)
+        averageGain, averageLoss, middle, squares, volume, price = sums / lengths
+
+        # RSI over the average gain and loss
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100.0 - 100.0 / (1 + averageGain / averageLoss)
+        self.rsi[index] = np.where(averageLoss == 0, np.where(averageGain != 0, 100.0, 50.0), rsi)
+
+        # Bollinger bands, population standard deviation
+        width = self.k * np.sqrt(np.maximum(squares - middle * middle, 0.0))
+        self.middle[index] = middle
+        self.upper[index] = middle + width
+        self.lower[index] = middle - width
+
+        # Average dollar volume
+        self.dollarVolume[index] = volume * price
+
+        self.close[index] = closes
+        self.samples[index] = count + 1
+
+    def _RingSums(self, index, samples):
+        # Exact sums of each window from the ring, for symbols with `samples` samples stored
+        back = np.arange(self.depth)[:, None]
+        slots = (samples - 1 - back) % self.depth                           # (depth, symbols), newest first
+        inside = back[:, None, :] < np.minimum(samples, self.windows)       # (depth, 6, symbols)
+        values = self.ring[slots[:, None, :], self.rows, index]             # (depth, 6, symbols)
+        return np.where(inside, values, 0.0).sum(axis=0)
+
+    @property
+    def Ready(self):
+        return (self.samples >= self.rsiPeriod + 1) & (self.samples >= self.bbPeriod)
+
+    def Signals(self, entryRsi, exitRsi, minimumVolume):
+        # entry: liquid, RSI above entryRsi and close above the upper band
+        # exit: held and one of the EXIT_* reasons, reported per symbol in `reason`
+        ready = self.Ready
+        investable = self.dollarVolume > minimumVolume
+        entry = ready & investable & (self.rsi > entryRsi) & (self.close > self.upper)
+        reason = np.select([~investable, self.rsi < exitRsi, self.close < self.middle],
+                           [EXIT_VOLUME, EXIT_RSI, EXIT_MIDDLE_BAND], EXIT_NONE)
+        exit = ready & self.held & (reason != EXIT_NONE)
+        return entry, exit, reason
@@ -0,0 +1,2961 @@
+"""
+Minimal local stand-in for the LEAN runtime
+
+Replays local bar files through an algorithm's Initialize / OnData /
+OnOrderEvent so the scripts in this repo run offline, unchanged, in well
+under a second:
+
+    result = RunAlgorithm("1_Handling_Data.py", {"SPY": "data/spy_daily.csv"})
+    print(result.Algorithm.Portfolio.TotalPortfolioValue, result.Timings())
+
+The algorithm file is executed in a namespace pre-filled with this module's
+names (the same role `from AlgorithmImports import *` plays in LEAN), and
+small shim modules are registered for AlgorithmImports, System.Drawing and
+the QuantConnect namespaces the scripts import from.
+
+Covered: equities / forex / crypto / custom data bars, Slice, TradeBar,
+RollingWindow, Portfolio and holdings, market / limit / stop market orders
+with tickets, SetHoldings, Liquidate, Schedule.On with the common date and
+time rules, consolidators, warm-up, History (needs pandas), GetParameter,
+the SMA / EMA / BB / RSI / MAX / MIN indicators, option chains /
+OptionChainProvider quoted by a chain source (SyntheticOptionChains), and
+an ObjectStore backed by a local directory (LocalObjectStore).
+
+Not covered: universe selection (the framework and fundamental types only
+exist so those files load), option exercise and expiry, fees, margin calls,
+time zones (bar times are exchange-local naive datetimes).
+
+Bar files are CSV or Parquet with time/open/high/low/close/volume columns
+(see VectorizedBacktest.LoadBars); `time` is the bar start. Data can also be
+passed as {"time": ..., "open": ...} arrays, keyed by ticker or by
+(ticker, resolution). BarStore .bars files are memory-mapped and replayed
+a chunk at a time, so their size doesn't affect startup or memory
+(BarStore.DataSources() gives the whole store as a data argument).
+
+Cost is kept low and measured: numpy and pandas are imported only when a
+file is loaded or History is called, and RunResult reports import, load,
+Initialize, replay and OnData time separately so the per-slice dispatch
+overhead of the harness itself is visible.
+"""
+
+import time as _clock
+
+_importStarted = _clock.perf_counter()
+
+import bisect
+import hashlib
+import heapq
+import json
+import math
+import os
+import sys
+import tempfile
+import types
+from collections import OrderedDict, deque
+from datetime import date, datetime, timedelta
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+# ---------------------------------------------------------------------
+# Enums
+# ---------------------------------------------------------------------
+class _Names(type):
+    # Stub enums: any member name resolves to itself
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return name
+
+
+class BrokerageName(metaclass=_Names):
+    pass
+
+
+class AccountType(metaclass=_Names):
+    pass
+
+
+class Market(metaclass=_Names):
+    pass
+
+
+class DataNormalizationMode(metaclass=_Names):
+    pass
+
+
+class SeriesType(metaclass=_Names):
+    pass
+
+
+class ScatterMarkerSymbol(metaclass=_Names):
+    pass
+
+
+class Color(metaclass=_Names):
+    pass
+
+
+class SubscriptionTransportMedium(metaclass=_Names):
+    pass
+
+
+class Resolution:
+    Tick = 0
+    Second = 1
+    Minute = 2
+    Hour = 3
+    Daily = 4
+
+
+_RESOLUTION_PERIOD = {
+    Resolution.Tick: timedelta(0),
+    Resolution.Second: timedelta(seconds=1),
+    Resolution.Minute: timedelta(minutes=1),
+    Resolution.Hour: timedelta(hours=1),
+    Resolution.Daily: timedelta(days=1),
+}
+
+
+class SecurityType:
+    Base = 0
+    Equity = 1
+    Option = 2
+    Commodity = 3
+    Forex = 4
+    Future = 5
+    Cfd = 6
+    Crypto = 7
+
+
+class OrderStatus:
+    New = 0
+    Submitted = 1
+    PartiallyFilled = 2
+    Filled = 3
+    Canceled = 5
+    Invalid = 7
+    CancelPending = 8
+    UpdateSubmitted = 9
+
+
+class OrderType:
+    Market = 0
+    Limit = 1
+    StopMarket = 2
+    StopLimit = 3
+    MarketOnOpen = 4
+    MarketOnClose = 5
+    OptionExercise = 6
+
+
+class OrderDirection:
+    Buy = 0
+    Sell = 1
+    Hold = 2
+
+
+class OptionRight:
+    Call = 0
+    Put = 1
+
+
+class OptionStyle:
+    American = 0
+    European = 1
+
+
+class InsightDirection:
+    Down = -1
+    Flat = 0
+    Up = 1
+
+
+class MorningstarSectorCode:
+    BasicMaterials = 101
+    ConsumerCyclical = 102
+    FinancialServices = 103
+    RealEstate = 104
+    ConsumerDefensive = 205
+    Healthcare = 206
+    Utilities = 207
+    CommunicationServices = 308
+    Energy = 309
+    Industrials = 310
+    Technology = 311
+
+
+class MovingAverageType:
+    Simple = 0
+    Exponential = 1
+    Wilders = 2
+
+
+class Field:
+    # Data selectors, as passed to indicator helpers
+    Open = staticmethod(lambda bar: bar.Open)
+    High = staticmethod(lambda bar: bar.High)
+    Low = staticmethod(lambda bar: bar.Low)
+    Close = staticmethod(lambda bar: bar.Close)
+    Volume = staticmethod(lambda bar: bar.Volume)
+    Value = staticmethod(lambda bar: bar.Value)
+
+
+# ---------------------------------------------------------------------
+# Symbols and data
+# ---------------------------------------------------------------------
+class SecurityIdentifier:
+    __slots__ = ("Symbol", "SecurityType", "Market", "Date", "StrikePrice", "OptionRight")
+
+    def __init__(self, ticker, securityType, market, expiry=None, strike=0.0, right=None):
+        self.Symbol = ticker
+        self.SecurityType = securityType
+        self.Market = market
+        self.Date = expiry
+        self.StrikePrice = strike
+        self.OptionRight = right
+
+
+class Symbol:
+    # Compares and hashes by ticker, so ticker strings work as keys too
+    __slots__ = ("Value", "ID", "SecurityType", "Underlying", "_hash")
+
+    def __init__(self, ticker, securityType=SecurityType.Equity, market="usa", underlying=None):
+        self.Value = ticker.upper()
+        self.SecurityType = securityType
+        self.ID = SecurityIdentifier(self.Value, securityType, market)
+        self.Underlying = underlying
+        self._hash = hash(self.Value)
+
+    @staticmethod
+    def Create(ticker, securityType, market):
+        return Symbol(ticker, securityType, market)
+
+    @staticmethod
+    def CreateOption(underlying, market, style, right, strike, expiry):
+        # OSI-style ticker, e.g. "SPY   201016P00330000"
+        if not isinstance(underlying, Symbol):
+            underlying = Symbol(underlying)
+        code = "C" if right == OptionRight.Call else "P"
+        symbol = Symbol(f"{underlying.Value:<6}{expiry:%y%m%d}{code}{round(strike * 1000):08d}",
+                        SecurityType.Option, market, underlying)
+        symbol.ID = SecurityIdentifier(underlying.Value, SecurityType.Option, market, expiry, strike, right)
+        return symbol
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if isinstance(other, Symbol):
+            return self.Value == other.Value
+        if isinstance(other, str):
+            return self.Value == other.upper()
+        return NotImplemented
+
+    def __str__(self):
+        return self.Value
+
+    def __repr__(self):
+        return self.Value
+
+
+class BaseData:
+    __slots__ = ()
+    Symbol = None
+    Time = datetime.min
+    Value = 0.0
+
+    @property
+    def EndTime(self):
+        return self.__dict__.get("_endTime", self.Time)
+
+    @EndTime.setter
+    def EndTime(self, value):
+        self.__dict__["_endTime"] = value
+
+    @property
+    def Price(self):
+        return self.Value
+
+
+class TradeBar(BaseData):
+    __slots__ = ("Time", "EndTime", "Symbol", "Open", "High", "Low", "Close", "Volume", "Period")
+
+    def __init__(self, time=datetime.min, symbol=None, open=0.0, high=0.0, low=0.0,
+                 close=0.0, volume=0.0, period=timedelta(days=1)):
+        self.Time = time
+        self.EndTime = time + period
+        self.Symbol = symbol
+        self.Open = open
+        self.High = high
+        self.Low = low
+        self.Close = close
+        self.Volume = volume
+        self.Period = period
+
+    @property
+    def Value(self):
+        return self.Close
+
+    @property
+    def Price(self):
+        return self.Close
+
+    def __repr__(self):
+        return f"{self.Symbol}: O:{self.Open} H:{self.High} L:{self.Low} C:{self.Close} V:{self.Volume}"
+
+
+class QuoteBar(BaseData):
+    # Top of book only; Close / Value / Price are the mid
+    __slots__ = ("Time", "EndTime", "Symbol", "BidPrice", "AskPrice", "Close", "Period")
+
+    def __init__(self, time=datetime.min, symbol=None, bid=0.0, ask=0.0, period=timedelta(minutes=1)):
+        self.Time = time
+        self.EndTime = time + period
+        self.Symbol = symbol
+        self.BidPrice = bid
+        self.AskPrice = ask
+        self.Close = (bid + ask) / 2
+        self.Period = period
+
+    @property
+    def Value(self):
+        return self.Close
+
+    @property
+    def Price(self):
+        return self.Close
+
+
+class PythonData(BaseData):
+    # Custom data base: dynamic members are plain attributes, obj["Name"] works too
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+    def __setitem__(self, name, value):
+        setattr(self, name, value)
+
+    def GetSource(self, config, date, isLive):
+        raise NotImplementedError
+
+    def Reader(self, config, line, date, isLive):
+        raise NotImplementedError
+
+
+class SubscriptionDataSource:
+
+    def __init__(self, source, transportMedium=None, format=None):
+        self.Source = source
+        self.TransportMedium = transportMedium
+
+
+class SubscriptionDataConfig:
+
+    def __init__(self, symbol, dataType, resolution):
+        self.Symbol = symbol
+        self.Type = dataType
+        self.Resolution = resolution
+
+
+class CBOE(PythonData):
+    # Volatility index bars (VIX); replayed from a local bar file like any other OHLC data
+    pass
+
+
+class KeyValuePair:
+    __slots__ = ("Key", "Value")
+
+    def __init__(self, key, value):
+        self.Key = key
+        self.Value = value
+
+
+class DataDictionary(dict):
+    # dict keyed by Symbol with the LEAN accessors the scripts use
+
+    def ContainsKey(self, key):
+        return key in self
+
+    @property
+    def Keys(self):
+        return list(self.keys())
+
+    @property
+    def Values(self):
+        return list(self.values())
+
+    @property
+    def Count(self):
+        return len(self)
+
+    def __iter__(self):
+        # C# dictionaries enumerate KeyValuePairs
+        return (KeyValuePair(k, v) for k, v in dict.items(self))
+
+
+class Slice:
+
+    def __init__(self, time, data, bars, optionChains=None):
+        self.Time = time
+        self._data = data
+        self.Bars = bars
+        self.OptionChains = DataDictionary() if optionChains is None else optionChains
+
+    def __contains__(self, symbol):
+        return symbol in self._data
+
+    def __getitem__(self, symbol):
+        return self._data[symbol]
+
+    def ContainsKey(self, symbol):
+        return symbol in self._data
+
+    def get(self, symbol, default=None):
+        return self._data.get(symbol, default)
+
+    @property
+    def Keys(self):
+        return list(self._data.keys())
+
+    @property
+    def Values(self):
+        return list(self._data.values())
+
+    @property
+    def Count(self):
+        return len(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RollingWindow:
+    # RollingWindow[TradeBar](size): index 0 is the most recent item
+
+    def __class_getitem__(cls, itemType):
+        return cls
+
+    def __init__(self, size):
+        self.Size = size
+        self._items = deque(maxlen=size)
+        self.Samples = 0
+
+    def Add(self, item):
+        self._items.appendleft(item)
+        self.Samples += 1
+
+    def __getitem__(self, index):
+        if index >= len(self._items):
+            raise IndexError(f"Index {index} out of range for window of {len(self._items)} items")
+        return self._items[index]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def Count(self):
+        return len(self._items)
+
+    @property
+    def IsReady(self):
+        return self.Samples >= self.Size
+
+    def Reset(self):
+        self._items.clear()
+        self.Samples = 0
+
+
+# ---------------------------------------------------------------------
+# Events
+# ---------------------------------------------------------------------
+class _Event:
+    # C#-style event: handlers attach with +=
+
+    def __init__(self):
+        self.handlers = []
+
+    def __iadd__(self, handler):
+        self.handlers.append(handler)
+        return self
+
+    def __isub__(self, handler):
+        self.handlers.remove(handler)
+        return self
+
+    def __call__(self, *args):
+        for handler in self.handlers:
+            handler(*args)
+
+
+# ---------------------------------------------------------------------
+# Indicators
+# ---------------------------------------------------------------------
+class IndicatorDataPoint(BaseData):
+    __slots__ = ("Time", "EndTime", "Value", "Symbol")
+
+    def __init__(self, time=datetime.min, value=0.0, symbol=None):
+        self.Time = time
+        self.EndTime = time
+        self.Value = value
+        self.Symbol = symbol
+
+    def __repr__(self):
+        return f"{self.Time}: {self.Value}"
+
+
+class IndicatorBase:
+
+    def __init__(self, name):
+        self.Name = name
+        self.Samples = 0
+        self.Current = IndicatorDataPoint()
+        self.Updated = _Event()
+
+    @property
+    def IsReady(self):
+        return self.Samples >= self.WarmUpPeriod
+
+    def Update(self, *args):
+        # Update(time, value) or Update(data point / bar)
+        if len(args) == 2:
+            input = IndicatorDataPoint(args[0], float(args[1]))
+        else:
+            input = args[0]
+        self.Samples += 1
+        value = self.ComputeNextValue(input)
+        self.Current = IndicatorDataPoint(input.EndTime, value)
+        if self.Updated.handlers:
+            self.Updated(self, self.Current)
+        return self.IsReady
+
+    def Reset(self):
+        self.Samples = 0
+        self.Current = IndicatorDataPoint()
+
+    def ComputeNextValue(self, input):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{self.Name}: {self.Current.Value}"
+
+
+class PythonIndicator(IndicatorBase):
+    # Subclasses set Name/Time/Value themselves and return readiness from Update;
+    # __init__ is usually not chained, so everything here has a class default
+    Name = ""
+    Time = datetime.min
+    Value = 0.0
+    Samples = 0
+    _isReady = False
+
+    @property
+    def IsReady(self):
+        return self._isReady
+
+    @property
+    def Current(self):
+        return IndicatorDataPoint(self.Time, self.Value)
+
+    @Current.setter
+    def Current(self, value):
+        pass
+
+    @property
+    def Updated(self):
+        return _Event()
+
+    @Updated.setter
+    def Updated(self, value):
+        pass
+
+
+def _FeedPythonIndicator(indicator, input):
+    indicator.Samples += 1
+    indicator._isReady = bool(indicator.Update(input))
+
+
+class SimpleMovingAverage(IndicatorBase):
+
+    def __init__(self, name, period=None):
+        if period is None:
+            name, period = f"SMA({name})", name
+        super().__init__(name)
+        self.Period = period
+        self.WarmUpPeriod = period
+        self._window = deque()
+        self._sum = 0.0
+
+    def ComputeNextValue(self, input):
+        value = input.Value
+        window = self._window
+        window.append(value)
+        self._sum += value
+        if len(window) > self.Period:
+            self._sum -= window.popleft()
+        return self._sum / len(window)
+
+    def Reset(self):
+        super().Reset()
+        self._window.clear()
+        self._sum = 0.0
+
+
+class ExponentialMovingAverage(IndicatorBase):
+
+    def __init__(self, name, period=None, smoothingFactor=None):
+        if period is None:
+            name, period = f"EMA({name})", name
+        super().__init__(name)
+        self.Period = period
+        self.WarmUpPeriod = period
+        self._k = 2.0 / (period + 1) if smoothingFactor is None else smoothingFactor
+        self._seed = 0.0
+
+    def ComputeNextValue(self, input):
+        # Seeded with the simple average of the first `period` samples
+        if self.Samples <= self.Period:
+            self._seed += input.Value
+            return self._seed / self.Samples
+        return input.Value * self._k + self.Current.Value * (1 - self._k)
+
+
+class WildersMovingAverage(ExponentialMovingAverage):
+
+    def __init__(self, name, period=None):
+        if period is None:
+            name, period = f"WWMA({name})", name
+        super().__init__(name, period, 1.0 / period)
+
+
+def _MovingAverage(movingAverageType, name, period):
+    if movingAverageType == MovingAverageType.Exponential:
+        return ExponentialMovingAverage(name, period)
+    if movingAverageType == MovingAverageType.Wilders:
+        return WildersMovingAverage(name, period)
+    return SimpleMovingAverage(name, period)
+
+
+class StandardDeviation(IndicatorBase):
+    # Population standard deviation over the window
+
+    def __init__(self, name, period=None):
+        if period is None:
+            name, period = f"STD({name})", name
+        super().__init__(name)
+        self.Period = period
+        self.WarmUpPeriod = period
+        self._window = deque()
+        self._sum = 0.0
+        self._squares = 0.0
+
+    def ComputeNextValue(self, input):
+        value = input.Value
+        self._window.append(value)
+        self._sum += value
+        self._squares += value * value
+        if len(self._window) > self.Period:
+            old = self._window.popleft()
+            self._sum -= old
+            self._squares -= old * old
+        n = len(self._window)
+        mean = self._sum / n
+        return math.sqrt(max(self._squares / n - mean * mean, 0.0))
+
+
+class BollingerBands(IndicatorBase):
+
+    def __init__(self, name, period, k=None, movingAverageType=MovingAverageType.Simple):
+        if k is None or not isinstance(name, str):
+            name, period, k, movingAverageType = f"BB({name},{period})", name, period, (
+                movingAverageType if k is None else k)
+        super().__init__(name)
+        self.K = k
+        self.WarmUpPeriod = period
+        self.MiddleBand = _MovingAverage(movingAverageType, name + "_MiddleBand", period)
+        self.StandardDeviation = StandardDeviation(name + "_StandardDeviation", period)
+        self.UpperBand = _Band(name + "_UpperBand", period)
+        self.LowerBand = _Band(name + "_LowerBand", period)
+
+    @property
+    def IsReady(self):
+        return self.MiddleBand.IsReady and self.StandardDeviation.IsReady
+
+    def ComputeNextValue(self, input):
+        self.MiddleBand.Update(input)
+        self.StandardDeviation.Update(input)
+        middle = self.MiddleBand.Current.Value
+        width = self.K * self.StandardDeviation.Current.Value
+        self.UpperBand.Set(input.EndTime, middle + width)
+        self.LowerBand.Set(input.EndTime, middle - width)
+        return middle
+
+
+class _Band(IndicatorBase):
+
+    def __init__(self, name, period):
+        super().__init__(name)
+        self.WarmUpPeriod = period
+
+    def Set(self, time, value):
+        self.Samples += 1
+        self.Current = IndicatorDataPoint(time, value)
+
+
+class RelativeStrengthIndex(IndicatorBase):
+
+    def __init__(self, name, period=None, movingAverageType=MovingAverageType.Wilders):
+        if period is None or not isinstance(name, str):
+            name, period, movingAverageType = f"RSI({name})", name, (
+                movingAverageType if period is None else period)
+        super().__init__(name)
+        self.WarmUpPeriod = period + 1
+        self.AverageGain = _MovingAverage(movingAverageType, name + "Up", period)
+        self.AverageLoss = _MovingAverage(movingAverageType, name + "Down", period)
+        self._previous = None
+
+    def ComputeNextValue(self, input):
+        value = input.Value
+        if self._previous is not None:
+            change = value - self._previous
+            self.AverageGain.Update(input.EndTime, change if change > 0 else 0.0)
+            self.AverageLoss.Update(input.EndTime, -change if change < 0 else 0.0)
+        self._previous = value
+
+        loss = self.AverageLoss.Current.Value
+        if loss == 0:
+            return 100.0 if self.AverageGain.Current.Value != 0 else 50.0
+        return 100.0 - 100.0 / (1 + self.AverageGain.Current.Value / loss)
+
+
+class Maximum(IndicatorBase):
+
+    def __init__(self, name, period=None):
+        if period is None:
+            name, period = f"MAX({name})", name
+        super().__init__(name)
+        self.Period = period
+        self.WarmUpPeriod = period
+        self._window = deque()    # (sample, value), values decreasing
+
+    def ComputeNextValue(self, input):
+        value, window = input.Value, self._window
+        while window and window[-1][1] <= value:
+            window.pop()
+        window.append((self.Samples, value))
+        if window[0][0] <= self.Samples - self.Period:
+            window.popleft()
+        return window[0][1]
+
+
+class Minimum(IndicatorBase):
+
+    def __init__(self, name, period=None):
+        if period is None:
+            name, period = f"MIN({name})", name
+        super().__init__(name)
+        self.Period = period
+        self.WarmUpPeriod = period
+        self._window = deque()    # (sample, value), values increasing
+
+    def ComputeNextValue(self, input):
+        value, window = input.Value, self._window
+        while window and window[-1][1] >= value:
+            window.pop()
+        window.append((self.Samples, value))
+        if window[0][0] <= self.Samples - self.Period:
+            window.popleft()
+        return window[0][1]
+
+
+class CompositeIndicator(IndicatorBase):
+    # Recomputed whenever either side updates; ready when both are
+
+    def __init__(self, name, left, right, composer):
+        super().__init__(name)
+        self.Left = left
+        self.Right = right
+        self._composer = composer
+        left.Updated += self._OnUpdated
+        right.Updated += self._OnUpdated
+
+    @property
+    def IsReady(self):
+        return self.Left.IsReady and self.Right.IsReady
+
+    def _OnUpdated(self, sender, point):
+        self.Samples += 1
+        self.Current = IndicatorDataPoint(point.EndTime,
+                                          self._composer(self.Left.Current.Value, self.Right.Current.Value))
+        if self.Updated.handlers:
+            self.Updated(self, self.Current)
+
+
+class IndicatorExtensions:
+
+    @staticmethod
+    def Times(left, right):
+        return CompositeIndicator(f"{left.Name}*{right.Name}", left, right, lambda a, b: a * b)
+
+    @staticmethod
+    def Plus(left, right):
+        return CompositeIndicator(f"{left.Name}+{right.Name}", left, right, lambda a, b: a + b)
+
+    @staticmethod
+    def Minus(left, right):
+        return CompositeIndicator(f"{left.Name}-{right.Name}", left, right, lambda a, b: a - b)
+
+    @staticmethod
+    def Over(left, right):
+        return CompositeIndicator(f"{left.Name}/{right.Name}", left, right,
+                                  lambda a, b: a / b if b != 0 else 0.0)
+
+    @staticmethod
+    def Of(indicator, source):
+        source.Updated += lambda sender, point: indicator.Update(point)
+        return indicator
+
+
+# ---------------------------------------------------------------------
+# Consolidators
+# ---------------------------------------------------------------------
+def _PeriodStart(time, period):
+    if period == timedelta(days=1):
+        return datetime(time.year, time.month, time.day)
+    step = period // timedelta(seconds=1)
+    seconds = (time - _EPOCH) // timedelta(seconds=1)
+    return _EPOCH + timedelta(seconds=seconds - seconds % step)
+
+
+class TradeBarConsolidator:
+
+    def __init__(self, period):
+        self.Period = _RESOLUTION_PERIOD[period] if isinstance(period, int) else period
+        self.WorkingBar = None
+        self.Consolidated = None
+        self.DataConsolidated = _Event()
+
+    def Update(self, bar):
+        working = self.WorkingBar
+        start = _PeriodStart(bar.Time, self.Period)
+        if working is not None and working.Time != start:
+            self._Emit()
+            working = None
+
+        if working is None:
+            self.WorkingBar = working = TradeBar(start, bar.Symbol, bar.Open, bar.High, bar.Low,
+                                                 bar.Close, bar.Volume, self.Period)
+        else:
+            if bar.High > working.High:
+                working.High = bar.High
+            if bar.Low < working.Low:
+                working.Low = bar.Low
+            working.Close = bar.Close
+            working.Volume += bar.Volume
+
+        if bar.EndTime >= working.EndTime:
+            self._Emit()
+
+    def _Emit(self):
+        bar, self.WorkingBar = self.WorkingBar, None
+        self.Consolidated = bar
+        self.DataConsolidated(self, bar)
+
+
+# ---------------------------------------------------------------------
+# Securities, portfolio and orders
+# ---------------------------------------------------------------------
+_LEVERAGE = {SecurityType.Equity: 2.0, SecurityType.Forex: 50.0, SecurityType.Crypto: 1.0}
+_MULTIPLIER = {SecurityType.Option: 100.0}
+
+
+class Security:
+
+    def __init__(self, symbol, resolution, algorithm):
+        self.Symbol = symbol
+        self.Type = symbol.SecurityType
+        self.Resolution = resolution
+        self.Leverage = _LEVERAGE.get(self.Type, 1.0)
+        self.Open = self.High = self.Low = self.Close = self.Price = 0.0
+        self.BidPrice = self.AskPrice = 0.0
+        self.Volume = 0.0
+        self.HasData = False
+        self.Fundamentals = None
+        self.Holdings = SecurityHolding(self)
+        self.DataNormalizationMode = DataNormalizationMode.Adjusted
+        self._algorithm = algorithm
+
+    def SetDataNormalizationMode(self, mode):
+        self.DataNormalizationMode = mode
+
+    def SetLeverage(self, leverage):
+        self.Leverage = leverage
+
+    @property
+    def Invested(self):
+        return self.Holdings.Invested
+
+    def Update(self, data):
+        self.HasData = True
+        if isinstance(data, TradeBar):
+            self.Open, self.High, self.Low = data.Open, data.High, data.Low
+            self.Close = self.Price = data.Close
+            self.Volume = data.Volume
+        elif isinstance(data, QuoteBar):
+            self.BidPrice, self.AskPrice = data.BidPrice, data.AskPrice
+            self.Close = self.Price = data.Close
+        else:
+            self.Close = self.Price = data.Value
+
+
+class Option(Security):
+    # Canonical option security (AddOption); its chain is built per slice
+    # from the underlying price, see _OptionChainFeed
+
+    def __init__(self, symbol, resolution, algorithm):
+        super().__init__(symbol, resolution, algorithm)
+        self.Underlying = algorithm.Securities.get(symbol.Underlying)
+        self._strikes = (-sys.maxsize, sys.maxsize)
+        self._expiries = (timedelta(0), timedelta(days=36500))
+
+    def SetFilter(self, *args):
+        # SetFilter(minStrike, maxStrike[, minExpiry, maxExpiry]): strikes are
+        # counted from the at-the-money strike; a universe function is ignored
+        if len(args) >= 2 and all(isinstance(a, int) for a in args[:2]):
+            self._strikes = (args[0], args[1])
+            if len(args) == 4:
+                self._expiries = (args[2], args[3])
+
+
+class SecurityHolding:
+
+    def __init__(self, security):
+        self.Security = security
+        self.Symbol = security.Symbol
+        self.Type = security.Type
+        self.Quantity = 0.0
+        self.AveragePrice = 0.0
+        self.TotalFees = 0.0
+        self.Profit = 0.0
+
+    @property
+    def Price(self):
+        return self.Security.Price
+
+    @property
+    def Invested(self):
+        return self.Quantity != 0
+
+    @property
+    def IsLong(self):
+        return self.Quantity > 0
+
+    @property
+    def IsShort(self):
+        return self.Quantity < 0
+
+    @property
+    def AbsoluteQuantity(self):
+        return abs(self.Quantity)
+
+    @property
+    def HoldingsValue(self):
+        return self.Quantity * self.Security.Price * _MULTIPLIER.get(self.Type, 1.0)
+
+    @property
+    def AbsoluteHoldingsValue(self):
+        return abs(self.HoldingsValue)
+
+    @property
+    def UnrealizedProfit(self):
+        return (self.Security.Price - self.AveragePrice) * self.Quantity * _MULTIPLIER.get(self.Type, 1.0)
+
+    def _Fill(self, quantity, price):
+        # Average price only moves when adding to the position
+        current = self.Quantity
+        total = current + quantity
+        multiplier = _MULTIPLIER.get(self.Type, 1.0)
+        if current == 0 or (current > 0) == (quantity > 0):
+            self.AveragePrice = (self.AveragePrice * current + price * quantity) / total if total else 0.0
+        else:
+            closed = min(abs(quantity), abs(current)) * (1 if current > 0 else -1)
+            self.Profit += (price - self.AveragePrice) * closed * multiplier
+            if total == 0:
+                self.AveragePrice = 0.0
+            elif (total > 0) != (current > 0):
+                self.AveragePrice = price
+        self.Quantity = total
+
+
+class SecurityManager(DataDictionary):
+    pass
+
+
+class SecurityPortfolioManager:
+
+    def __init__(self, securities):
+        self._securities = securities
+        self.Cash = 0.0
+
+    def __getitem__(self, symbol):
+        return self._securities[symbol].Holdings
+
+    def __contains__(self, symbol):
+        return symbol in self._securities
+
+    def __iter__(self):
+        return (KeyValuePair(s, security.Holdings) for s, security in dict.items(self._securities))
+
+    def ContainsKey(self, symbol):
+        return symbol in self._securities
+
+    @property
+    def Keys(self):
+        return list(dict.keys(self._securities))
+
+    @property
+    def Values(self):
+        return [security.Holdings for security in dict.values(self._securities)]
+
+    @property
+    def Invested(self):
+        return any(security.Holdings.Quantity != 0 for security in dict.values(self._securities))
+
+    @property
+    def TotalHoldingsValue(self):
+        return sum(security.Holdings.HoldingsValue for security in dict.values(self._securities))
+
+    @property
+    def TotalAbsoluteHoldingsCost(self):
+        return sum(abs(s.Holdings.Quantity * s.Holdings.AveragePrice * _MULTIPLIER.get(s.Type, 1.0))
+                   for s in dict.values(self._securities))
+
+    @property
+    def TotalPortfolioValue(self):
+        return self.Cash + self.TotalHoldingsValue
+
+    @property
+    def TotalUnrealizedProfit(self):
+        return sum(security.Holdings.UnrealizedProfit for security in dict.values(self._securities))
+
+    @property
+    def TotalMarginUsed(self):
+        return sum(security.Holdings.AbsoluteHoldingsValue / security.Leverage
+                   for security in dict.values(self._securities))
+
+    @property
+    def MarginRemaining(self):
+        return self.TotalPortfolioValue - self.TotalMarginUsed
+
+
+class PortfolioTarget:
+
+    def __init__(self, symbol, quantity):
+        self.Symbol = symbol
+        self.Quantity = quantity
+
+    @staticmethod
+    def Percent(algorithm, symbol, percent):
+        return PortfolioTarget(symbol, algorithm.CalculateOrderQuantity(symbol, percent))
+
+
+class UpdateOrderFields:
+
+    def __init__(self):
+        self.Quantity = None
+        self.LimitPrice = None
+        self.StopPrice = None
+        self.Tag = None
+
+
+class Order:
+
+    def __init__(self, orderId, symbol, quantity, orderType, time, tag="", limitPrice=0.0, stopPrice=0.0):
+        self.Id = orderId
+        self.Symbol = symbol
+        self.Quantity = quantity
+        self.Type = orderType
+        self.Time = time
+        self.Tag = tag
+        self.LimitPrice = limitPrice
+        self.StopPrice = stopPrice
+        self.Status = OrderStatus.New
+        self.Price = 0.0
+
+    @property
+    def Direction(self):
+        return OrderDirection.Buy if self.Quantity > 0 else OrderDirection.Sell
+
+    def __repr__(self):
+        return f"Order {self.Id}: {self.Symbol} {self.Quantity} type={self.Type} status={self.Status}"
+
+
+class OrderTicket:
+
+    def __init__(self, transactions, order):
+        self._transactions = transactions
+        self._order = order
+        self.OrderId = order.Id
+        self.Symbol = order.Symbol
+        self.Tag = order.Tag
+        self.AverageFillPrice = 0.0
+        self.QuantityFilled = 0.0
+
+    @property
+    def Status(self):
+        return self._order.Status
+
+    @property
+    def Quantity(self):
+        return self._order.Quantity
+
+    @property
+    def OrderType(self):
+        return self._order.Type
+
+    def Get(self, field):
+        return getattr(self._order, field)
+
+    def Update(self, fields):
+        order = self._order
+        if order.Status in (OrderStatus.Filled, OrderStatus.Canceled, OrderStatus.Invalid):
+            return OrderResponse(False)
+        if fields.Quantity is not None:
+            order.Quantity = fields.Quantity
+        if fields.LimitPrice is not None:
+            order.LimitPrice = fields.LimitPrice
+        if fields.StopPrice is not None:
+            order.StopPrice = fields.StopPrice
+        if fields.Tag is not None:
+            order.Tag = fields.Tag
+        return OrderResponse(True)
+
+    def UpdateLimitPrice(self, price, tag=None):
+        fields = UpdateOrderFields()
+        fields.LimitPrice, fields.Tag = price, tag
+        return self.Update(fields)
+
+    def UpdateStopPrice(self, price, tag=None):
+        fields = UpdateOrderFields()
+        fields.StopPrice, fields.Tag = price, tag
+        return self.Update(fields)
+
+    def Cancel(self, tag=None):
+        return self._transactions._Cancel(self._order)
+
+    def __repr__(self):
+        return f"OrderTicket {self.OrderId}: {self.Symbol} {self.Quantity} status={self.Status}"
+
+
+class OrderResponse:
+
+    def __init__(self, success):
+        self.IsSuccess = success
+        self.IsError = not success
+
+
+class OrderEvent:
+
+    def __init__(self, order, time, status, fillPrice=0.0, fillQuantity=0.0, message=""):
+        self.OrderId = order.Id
+        self.Symbol = order.Symbol
+        self.Status = status
+        self.FillPrice = fillPrice
+        self.FillQuantity = fillQuantity
+        self.Quantity = order.Quantity
+        self.Direction = order.Direction
+        self.UtcTime = time
+        self.Message = message
+        self.IsAssignment = False
+
+    def __str__(self):
+        text = f"Time: {self.UtcTime} OrderID: {self.OrderId} Symbol: {self.Symbol} Status: {self.Status}"
+        if self.Status == OrderStatus.Filled:
+            text += f" Quantity: {self.FillQuantity} FillPrice: {self.FillPrice}"
+        return text
+
+
+class SecurityTransactionManager:
+
+    def __init__(self, algorithm):
+        self._algorithm = algorithm
+        self._orders = {}
+        self._tickets = {}
+        self._open = []
+        self._nextId = 1
+
+    def GetOrderById(self, orderId):
+        return self._orders.get(orderId)
+
+    def GetOrderTicket(self, orderId):
+        return self._tickets.get(orderId)
+
+    def GetOrders(self, filter=None):
+        orders = list(self._orders.values())
+        return orders if filter is None else [o for o in orders if filter(o)]
+
+    def GetOpenOrders(self, symbol=None):
+        if symbol is None:
+            return list(self._open)
+        return [order for order in self._open if order.Symbol == symbol]
+
+    def GetOpenOrderTickets(self, symbol=None):
+        return [self._tickets[order.Id] for order in self.GetOpenOrders(symbol)]
+
+    def CancelOpenOrders(self, symbol=None, tag=None):
+        return [self._Cancel(order) for order in self.GetOpenOrders(symbol)]
+
+    @property
+    def OrdersCount(self):
+        return len(self._orders)
+
+    def _Submit(self, symbol, quantity, orderType, tag="", limitPrice=0.0, stopPrice=0.0):
+        algorithm = self._algorithm
+        if symbol not in algorithm.Securities and symbol.SecurityType == SecurityType.Option:
+            # Contracts picked from a chain are subscribed on their first order
+            algorithm.AddOptionContract(symbol)
+        order = Order(self._nextId, symbol, quantity, orderType, algorithm.Time, tag, limitPrice, stopPrice)
+        self._nextId += 1
+        ticket = OrderTicket(self, order)
+
+        if algorithm.IsWarmingUp or quantity == 0:
+            order.Status = OrderStatus.Invalid
+            return ticket
+
+        self._orders[order.Id] = order
+        self._tickets[order.Id] = ticket
+        order.Status = OrderStatus.Submitted
+        algorithm._OnOrderEvent(OrderEvent(order, algorithm.Time, OrderStatus.Submitted))
+
+        if orderType == OrderType.Market:
+            security = algorithm.Securities[symbol]
+            if security.Price > 0:
+                self._Fill(order, security.Price)
+                return ticket
+        self._open.append(order)
+        return ticket
+
+    def _Cancel(self, order):
+        if order.Status not in (OrderStatus.Submitted, OrderStatus.UpdateSubmitted, OrderStatus.PartiallyFilled):
+            return OrderResponse(False)
+        order.Status = OrderStatus.Canceled
+        self._open.remove(order)
+        self._algorithm._OnOrderEvent(OrderEvent(order, self._algorithm.Time, OrderStatus.Canceled))
+        return OrderResponse(True)
+
+    def _Fill(self, order, price):
+        algorithm = self._algorithm
+        security = algorithm.Securities[order.Symbol]
+        security.Holdings._Fill(order.Quantity, price)
+        algorithm.Portfolio.Cash -= order.Quantity * price * _MULTIPLIER.get(security.Type, 1.0)
+
+        order.Status = OrderStatus.Filled
+        order.Price = price
+        ticket = self._tickets[order.Id]
+        ticket.AverageFillPrice = price
+        ticket.QuantityFilled = order.Quantity
+        algorithm._OnOrderEvent(OrderEvent(order, algorithm.Time, OrderStatus.Filled, price, order.Quantity))
+
+    def _Scan(self, symbol, bar):
+        # Resting orders fill against bars that arrive after they were placed
+        if not self._open:
+            return
+        for order in [o for o in self._open if o.Symbol == symbol and o.Time < bar.EndTime]:
+            price = _FillPrice(order, bar)
+            if price is not None:
+                self._open.remove(order)
+                self._Fill(order, price)
+
+
+def _FillPrice(order, bar):
+    buy = order.Quantity > 0
+    if order.Type == OrderType.Market:
+        return bar.Open if isinstance(bar, TradeBar) else bar.Value
+    if not isinstance(bar, TradeBar):
+        return None
+    if order.Type == OrderType.Limit:
+        if buy and bar.Low < order.LimitPrice:
+            return min(bar.Open, order.LimitPrice)
+        if not buy and bar.High > order.LimitPrice:
+            return max(bar.Open, order.LimitPrice)
+    elif order.Type == OrderType.StopMarket:
+        if buy and bar.High > order.StopPrice:
+            return max(bar.Open, order.StopPrice)
+        if not buy and bar.Low < order.StopPrice:
+            return min(bar.Open, order.StopPrice)
+    return None
+
+
+# ---------------------------------------------------------------------
+# Options
+# ---------------------------------------------------------------------
+class OptionContract:
+    __slots__ = ("Symbol", "UnderlyingSymbol", "Strike", "Expiry", "Right", "Time", "BidPrice",
+                 "AskPrice", "LastPrice", "UnderlyingLastPrice", "Volume", "OpenInterest")
+
+    def __init__(self, symbol, time, bid, ask, underlyingPrice):
+        identifier = symbol.ID
+        self.Symbol = symbol
+        self.UnderlyingSymbol = symbol.Underlying
+        self.Strike = identifier.StrikePrice
+        self.Expiry = identifier.Date
+        self.Right = identifier.OptionRight
+        self.Time = time
+        self.BidPrice = bid
+        self.AskPrice = ask
+        self.LastPrice = (bid + ask) / 2
+        self.UnderlyingLastPrice = underlyingPrice
+        self.Volume = 0
+        self.OpenInterest = 0
+
+    def __repr__(self):
+        return f"{self.Symbol}: B:{self.BidPrice} A:{self.AskPrice}"
+
+
+class OptionChain:
+    # Iterates as OptionContracts, like the C# chain
+
+    def __init__(self, symbol, time, underlying, contracts):
+        self.Symbol = symbol
+        self.Time = time
+        self.Underlying = underlying
+        self.Contracts = DataDictionary((c.Symbol, c) for c in contracts)
+        self._contracts = contracts
+
+    def __iter__(self):
+        return iter(self._contracts)
+
+    def __len__(self):
+        return len(self._contracts)
+
+
+class OptionChainProvider:
+
+    def __init__(self, algorithm):
+        self._algorithm = algorithm
+
+    def GetOptionContractList(self, symbol, time):
+        algorithm = self._algorithm
+        symbol = algorithm._Symbol(symbol)
+        source = algorithm._dataSources.get("?" + symbol.Value)
+        security = algorithm.Securities.get(symbol)
+        if source is None or security is None or security.Price <= 0:
+            return []
+        return list(source.Contracts(symbol, time.date(), security.Price))
+
+
+class SyntheticOptionChains:
+    """Made-up listed contracts and quotes for one underlying, used as the
+    data source of an option ticker when there is no option data:
+
+        RunAlgorithm("9_Options.py", {"MSFT": "msft.csv", "?MSFT": SyntheticOptionChains()})
+
+    Each day lists the next `weeks` Friday expiries with `strikes` strikes on
+    either side of the day's first underlying price, `step` apart. Quotes are
+    intrinsic value plus a Brenner-Subrahmanyam style time value at a flat
+    `volatility`, with a relative `spread`.
+    """
+
+    def __init__(self, step=1.0, strikes=20, weeks=8, volatility=0.25, spread=0.02):
+        self.step = step
+        self.strikes = strikes
+        self.weeks = weeks
+        self.volatility = volatility
+        self.spread = spread
+        self._day = None
+        self._listed = []
+        self._symbols = {}      # (expiry, strike, right) -> Symbol, so contracts keep one identity
+
+    def Contracts(self, underlying, day, price):
+        # Listed contract Symbols for the day, by expiry, strike and right
+        if day != self._day:
+            self._day = day
+            self._listed = self._List(underlying, day, price)
+        return self._listed
+
+    def _List(self, underlying, day, price):
+        center = round(price / self.step) * self.step
+        strikes = [round(center + k * self.step, 4) for k in range(-self.strikes, self.strikes + 1)]
+        friday = day + timedelta(days=(4 - day.weekday()) % 7)
+        expiries = [datetime(friday.year, friday.month, friday.day) + timedelta(weeks=w) for w in range(self.weeks)]
+        return [self._Symbol(underlying, expiry, strike, right)
+                for expiry in expiries for strike in strikes if strike > 0
+                for right in (OptionRight.Call, OptionRight.Put)]
+
+    def _Symbol(self, underlying, expiry, strike, right):
+        key = (expiry, strike, right)
+        symbol = self._symbols.get(key)
+        if symbol is None:
+            symbol = self._symbols[key] = Symbol.CreateOption(underlying, underlying.ID.Market,
+                                                              OptionStyle.American, right, strike, expiry)
+        return symbol
+
+    def Quote(self, symbol, price, time):
+        # (bid, ask); contracts expire at the 16:00 close of their expiry date
+        identifier = symbol.ID
+        strike = identifier.StrikePrice
+        if identifier.OptionRight == OptionRight.Call:
+            value = max(price - strike, 0.0)
+        else:
+            value = max(strike - price, 0.0)
+        years = max((identifier.Date - time).total_seconds() + 57600, 0.0) / 31557600
+        width = self.volatility * math.sqrt(years)
+        if width > 0:
+            moneyness = math.log(price / strike) / width
+            value += 0.4 * price * width * math.exp(-0.5 * moneyness * moneyness)
+        half = max(value * self.spread / 2, 0.005)
+        return max(value - half, 0.0), value + half
+
+
+class _OptionChainFeed:
+    # Filtered chain of a canonical option, rebuilt in every slice the underlying has data
+
+    def __init__(self, algorithm, option, source):
+        self.algorithm = algorithm
+        self.option = option
+        self.source = source
+        self.underlying = option.Symbol.Underlying
+        self.day = None
+        self.strikes = []    # distinct strikes of the day's contracts inside the expiry filter
+        self.byStrike = []   # their contracts, per strike
+
+    def Emit(self, time, data, chains):
+        if self.underlying not in data:
+            return
+        underlying = self.algorithm.Securities[self.underlying]
+        price = underlying.Price
+        if price <= 0:
+            return
+
+        day = time.date()
+        if day != self.day:
+            self.day = day
+            today = datetime(day.year, day.month, day.day)
+            first, last = self.option._expiries
+            listed = {}
+            for s in self.source.Contracts(self.underlying, day, price):
+                if first <= s.ID.Date - today <= last:
+                    listed.setdefault(s.ID.StrikePrice, []).append(s)
+            self.strikes = sorted(listed)
+            self.byStrike = [listed[strike] for strike in self.strikes]
+        strikes = self.strikes
+        if not strikes:
+            return
+
+        # Strike filter is counted in strikes from the one nearest the price
+        atm = bisect.bisect_left(strikes, price)
+        if atm == len(strikes) or (atm > 0 and price - strikes[atm - 1] <= strikes[atm] - price):
+            atm -= 1
+        low, high = self.option._strikes
+        low = max(atm + low, 0)
+        high = min(atm + high, len(strikes) - 1)
+
+        quote = self.source.Quote
+        contracts = []
+        for symbols in self.byStrike[low:high + 1]:
+            for symbol in symbols:
+                bid, ask = quote(symbol, price, time)
+                contracts.append(OptionContract(symbol, time, bid, ask, price))
+        canonical = self.option.Symbol
+        chains[canonical] = OptionChain(canonical, time, underlying, contracts)
+
+
+class _OptionContractFeed:
+    # Quotes of one subscribed contract, emitted whenever its underlying has data
+
+    def __init__(self, algorithm, subscription, source):
+        self.algorithm = algorithm
+        self.subscription = subscription
+        self.source = source
+        self.symbol = subscription.symbol
+        self.underlying = self.symbol.Underlying
+        self.expiry = self.symbol.ID.Date + timedelta(hours=16)
+
+    def Emit(self, time, data, chains):
+        if self.underlying not in data or time > self.expiry:
+            return
+        bar = self._Quote(time)
+        if bar is not None:
+            data[self.symbol] = bar
+            self.subscription.security.Update(bar)
+            self.algorithm.Transactions._Scan(self.symbol, bar)
+
+    def Seed(self, time):
+        # Price the contract as soon as it is added, so an order placed
+        # right after the subscription fills
+        bar = self._Quote(time)
+        if bar is not None:
+            self.subscription.security.Update(bar)
+
+    def _Quote(self, time):
+        underlying = self.algorithm.Securities.get(self.underlying)
+        if underlying is None or underlying.Price <= 0:
+            return None
+        period = self.subscription.period
+        bid, ask = self.source.Quote(self.symbol, underlying.Price, time)
+        return QuoteBar(time - period, self.symbol, bid, ask, period)
+
+
+# ---------------------------------------------------------------------
+# Scheduling
+# ---------------------------------------------------------------------
+class _DateRule:
+
+    def __init__(self, name, includes):
+        self.Name = name
+        self._includes = includes   # (algorithm, date) -> bool
+
+    def Includes(self, algorithm, day):
+        return self._includes(algorithm, day)
+
+
+class _TimeRule:
+
+    def __init__(self, name, times):
+        self.Name = name
+        self._times = times   # (algorithm, date) -> iterable of datetimes
+
+    def Times(self, algorithm, day):
+        return self._times(algorithm, day)
+
+
+def _TradingDays(algorithm, symbol, first, last):
+    day = first
+    while day <= last:
+        if symbol is None or algorithm._IsTradingDay(symbol, day):
+            yield day
+        day += timedelta(days=1)
+
+
+class DateRules:
+
+    def __init__(self, algorithm):
+        self._algorithm = algorithm
+
+    def EveryDay(self, symbol=None):
+        if symbol is None:
+            return _DateRule("EveryDay", lambda a, day: True)
+        return _DateRule(f"EveryDay: {symbol}", lambda a, day: a._IsTradingDay(symbol, day))
+
+    def Every(self, *daysOfWeek):
+        # DayOfWeek as Sunday=0 .. Saturday=6, like .NET
+        weekdays = {(d - 1) % 7 for d in daysOfWeek}
+        return _DateRule("Every", lambda a, day: day.weekday() in weekdays)
+
+    def MonthStart(self, symbol=None, daysOffset=0):
+        def includes(a, day):
+            first = date(day.year, day.month, 1)
+            earlier = list(_TradingDays(a, symbol, first, day))
+            return bool(earlier) and earlier[-1] == day and len(earlier) == daysOffset + 1
+        return _DateRule("MonthStart", includes)
+
+    def MonthEnd(self, symbol=None, daysOffset=0):
+        def includes(a, day):
+            last = (date(day.year, day.month, 28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+            later = list(_TradingDays(a, symbol, day, last))
+            return bool(later) and later[0] == day and len(later) == daysOffset + 1
+        return _DateRule("MonthEnd", includes)
+
+    def WeekStart(self, symbol=None):
+        def includes(a, day):
+            monday = day - timedelta(days=day.weekday())
+            earlier = list(_TradingDays(a, symbol, monday, day))
+            return len(earlier) == 1 and earlier[0] == day
+        return _DateRule("WeekStart", includes)
+
+    def On(self, year, month, day):
+        target = date(year, month, day)
+        return _DateRule("On", lambda a, d: d == target)
+
+    @property
+    def Today(self):
+        today = self._algorithm.Time.date()
+        return _DateRule("Today", lambda a, d: d == today)
+
+
+_MARKET_HOURS = {SecurityType.Equity: (timedelta(hours=9, minutes=30), timedelta(hours=16)),
+                 SecurityType.Option: (timedelta(hours=9, minutes=30), timedelta(hours=16))}
+
+
+def _MarketHours(symbol):
+    return _MARKET_HOURS.get(getattr(symbol, "SecurityType", SecurityType.Equity),
+                             (timedelta(0), timedelta(days=1)))
+
+
+def _AtDay(day, offset):
+    return datetime(day.year, day.month, day.day) + offset
+
+
+class TimeRules:
+
+    def __init__(self, algorithm):
+        self._algorithm = algorithm
+
+    def At(self, hour, minute, second=0):
+        offset = timedelta(hours=hour, minutes=minute, seconds=second)
+        return _TimeRule("At", lambda a, day: [_AtDay(day, offset)])
+
+    def AfterMarketOpen(self, symbol, minutesAfterOpen=0, extendedMarketOpen=False):
+        symbol = self._algorithm._Symbol(symbol)
+        offset = _MarketHours(symbol)[0] + timedelta(minutes=minutesAfterOpen)
+        return _TimeRule("AfterMarketOpen", lambda a, day: [_AtDay(day, offset)])
+
+    def BeforeMarketClose(self, symbol, minutesBeforeClose=0, extendedMarketClose=False):
+        symbol = self._algorithm._Symbol(symbol)
+        offset = _MarketHours(symbol)[1] - timedelta(minutes=minutesBeforeClose)
+        return _TimeRule("BeforeMarketClose", lambda a, day: [_AtDay(day, offset)])
+
+    def Every(self, interval):
+        def times(a, day):
+            start = _AtDay(day, timedelta(0))
+            t = start
+            while t < start + timedelta(days=1):
+                yield t
+                t += interval
+        return _TimeRule("Every", times)
+
+    @property
+    def Midnight(self):
+        return self.At(0, 0)
+
+    @property
+    def Noon(self):
+        return self.At(12, 0)
+
+
+class ScheduledEvent:
+
+    def __init__(self, name, dateRule, timeRule, callback):
+        self.Name = name
+        self.DateRule = dateRule
+        self.TimeRule = timeRule
+        self.Callback = callback
+        self.Enabled = True
+
+
+class ScheduleManager:
+
+    def __init__(self, algorithm):
+        self._algorithm = algorithm
+        self._events = []
+
+    def On(self, dateRule, timeRule, callback, name=None):
+        event = ScheduledEvent(name or f"{dateRule.Name}: {timeRule.Name}", dateRule, timeRule, callback)
+        self._events.append(event)
+        return event
+
+    def Remove(self, event):
+        event.Enabled = False
+
+
+# ---------------------------------------------------------------------
+# Charting and settings
+# ---------------------------------------------------------------------
+class Series:
+
+    def __init__(self, name, seriesType=None, unit="$", color=None, markerSymbol=None, *args):
+        self.Name = name
+        self.SeriesType = seriesType
+        self.Unit = unit
+
+
+class Chart:
+
+    def __init__(self, name):
+        self.Name = name
+        self.Series = {}
+
+    def AddSeries(self, series):
+        self.Series[series.Name] = series
+
+
+class AlgorithmSettings:
+
+    def __init__(self):
+        self.FreePortfolioValuePercentage = 0.0025
+        self.FreePortfolioValue = None
+        self.MinimumOrderMarginPortfolioPercentage = 0.0
+
+
+class UniverseSettings:
+
+    def __init__(self):
+        self.Resolution = Resolution.Minute
+        self.Leverage = None
+        self.FillForward = True
+
+
+class SubscriptionManager:
+
+    def __init__(self, algorithm):
+        self._algorithm = algorithm
+
+    def AddConsolidator(self, symbol, consolidator):
+        self._algorithm._Subscription(symbol).consumers.append(consolidator.Update)
+
+    def RemoveConsolidator(self, symbol, consolidator):
+        consumers = self._algorithm._Subscription(symbol).consumers
+        if consolidator.Update in consumers:
+            consumers.remove(consolidator.Update)
+
+
+class _Subscription:
+
+    def __init__(self, security, resolution, dataType=None):
+        self.security = security
+        self.symbol = security.Symbol
+        self.resolution = resolution
+        self.period = _RESOLUTION_PERIOD[resolution]
+        self.dataType = dataType
+        self.consumers = []     # called with every bar, after the security price update
+        self.bars = None        # _BarArrays or _MappedBars once data is attached
+        self.points = None      # custom data objects, for Reader-based types
+        self.tradingDays = None
+
+
+class _BarArrays:
+    # One symbol's bars as parallel Python lists (fast scalar access in the replay loop)
+
+    def __init__(self, starts, ends, opens, highs, lows, closes, volumes):
+        self.starts = starts
+        self.ends = ends
+        self.opens = opens
+        self.highs = highs
+        self.lows = lows
+        self.closes = closes
+        self.volumes = volumes
+
+    def __len__(self):
+        return len(self.ends)
+
+    def Search(self, time, side="right"):
+        # bisect_right / bisect_left of `time` among the bar end times
+        return (bisect.bisect_right if side == "right" else bisect.bisect_left)(self.ends, time)
+
+    def End(self, i):
+        return self.ends[i]
+
+    def Columns(self, first, last):
+        # (starts, ends, opens, highs, lows, closes, volumes) of bars first..last-1
+        return (self.starts[first:last], self.ends[first:last], self.opens[first:last], self.highs[first:last],
+                self.lows[first:last], self.closes[first:last], self.volumes[first:last])
+
+    def Chunks(self, first, last):
+        # (lo, hi, columns): bars lo..hi-1 of the column lists cover first..last-1
+        yield first, last, (self.starts, self.ends, self.opens, self.highs, self.lows, self.closes, self.volumes)
+
+    def Days(self):
+        return {s.date() for s in self.starts}
+
+
+class _MappedBars:
+    # Bars of a memory-mapped BarStore file: searched on the int64 time column,
+    # Python lists are only built for the chunk being replayed
+
+    CHUNK = 1 << 14
+
+    def __init__(self, file, period):
+        self.file = file
+        self.period = period
+
+    def __len__(self):
+        return len(self.file)
+
+    def Search(self, time, side="right"):
+        # A bar ends at start + period, so search the starts for time - period
+        return self.file.Search(time - self.period, "right" if side == "right" else "left")
+
+    def End(self, i):
+        return _EPOCH + timedelta(seconds=int(self.file.time[i])) + self.period
+
+    def Columns(self, first, last):
+        period = self.period
+        starts = [_EPOCH + timedelta(seconds=s) for s in self.file.time[first:last].tolist()]
+        columns = [self.file[name][first:last].tolist() for name in ("open", "high", "low", "close", "volume")]
+        return (starts, [s + period for s in starts], *columns)
+
+    def Chunks(self, first, last):
+        for position in range(first, last, self.CHUNK):
+            stop = min(position + self.CHUNK, last)
+            yield 0, stop - position, self.Columns(position, stop)
+
+    def Days(self):
+        import numpy as np
+        days = self.file.time // 86400
+        # Times are sorted: one entry per run of equal days
+        days = days[np.flatnonzero(np.diff(days, prepend=days[:1] - 1))]
+        return {(_EPOCH + timedelta(days=d)).date() for d in days.tolist()}
+
+
+# ---------------------------------------------------------------------
+# Universe selection and the algorithm framework
+# ---------------------------------------------------------------------
+# Selection and the framework models are not run by the replay; these exist
+# so that framework files load and their parts can be called directly.
+class Universe:
+    Unchanged = "Universe.Unchanged"
+
+
+class CoarseFundamental:
+
+    def __init__(self, symbol, price=0.0, volume=0.0, hasFundamentalData=True):
+        self.Symbol = symbol
+        self.Price = self.Value = price
+        self.Volume = volume
+        self.DollarVolume = price * volume
+        self.HasFundamentalData = hasFundamentalData
+
+
+class FineFundamental:
+    # The Morningstar fields the scripts read
+
+    def __init__(self, symbol, marketCap=0.0, sector=0, ipoDate=datetime.min,
+                 roe=0.0, netMargin=0.0, peRatio=0.0):
+        self.Symbol = symbol
+        self.MarketCap = marketCap
+        self.SecurityReference = types.SimpleNamespace(IPODate=ipoDate)
+        self.AssetClassification = types.SimpleNamespace(MorningstarSectorCode=sector)
+        self.OperationRatios = types.SimpleNamespace(ROE=types.SimpleNamespace(Value=roe),
+                                                     NetMargin=types.SimpleNamespace(Value=netMargin))
+        self.ValuationRatios = types.SimpleNamespace(PERatio=peRatio)
+
+
+class SecurityChanges:
+
+    def __init__(self, added=(), removed=()):
+        self.AddedSecurities = list(added)
+        self.RemovedSecurities = list(removed)
+
+
+class Expiry:
+    # Functions time -> expiry, usable as an Insight period
+
+    @staticmethod
+    def EndOfDay(time):
+        return datetime(time.year, time.month, time.day) + timedelta(days=1)
+
+    @staticmethod
+    def EndOfWeek(time):
+        return Expiry.EndOfDay(time) + timedelta(days=6 - time.weekday())
+
+    @staticmethod
+    def EndOfMonth(time):
+        return datetime(time.year + time.month // 12, time.month % 12 + 1, 1)
+
+    @staticmethod
+    def EndOfQuarter(time):
+        month = (time.month - 1) // 3 * 3 + 4
+        return datetime(time.year + (month > 12), (month - 1) % 12 + 1, 1)
+
+    @staticmethod
+    def EndOfYear(time):
+        return datetime(time.year + 1, 1, 1)
+
+
+class Insight:
+
+    def __init__(self, symbol, period, direction, magnitude=None, confidence=None, sourceModel=None, weight=None):
+        self.Symbol = symbol
+        self.Period = period
+        self.Direction = direction
+        self.Magnitude = magnitude
+        self.Confidence = confidence
+        self.SourceModel = sourceModel
+        self.Weight = weight
+
+    @staticmethod
+    def Price(symbol, period, direction, magnitude=None, confidence=None, sourceModel=None, weight=None):
+        return Insight(symbol, period, direction, magnitude, confidence, sourceModel, weight)
+
+    def __repr__(self):
+        return f"Insight {self.Symbol} direction={self.Direction}"
+
+
+class AlphaModel:
+
+    def Update(self, algorithm, data):
+        return []
+
+    def OnSecuritiesChanged(self, algorithm, changes):
+        pass
+
+
+class EqualWeightingPortfolioConstructionModel:
+
+    def __init__(self, rebalance=None, portfolioBias=None):
+        self.Rebalance = rebalance
+
+
+class NullRiskManagementModel:
+    pass
+
+
+class ImmediateExecutionModel:
+    pass
+
+
+# ---------------------------------------------------------------------
+# Object store
+# ---------------------------------------------------------------------
+OBJECT_STORE_ROOT = os.path.join("data", "object_store")
+OBJECT_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class LocalObjectStore:
+    """ObjectStore on a local directory, safe to share between processes.
+
+    Contents are stored once per SHA-256 under <root>/objects/ab/abcd...,
+    and every key is a small ref file <root>/refs/cd/cdef... named by the
+    SHA-256 of the key, holding the content hash and then the key itself, so
+    saving the same bytes under many keys (or many runs) writes them once.
+    Ref names are flat, so "a" and "a/b" are independent keys like in LEAN.
+    Blobs and refs are written to a temporary file in <root>/tmp and renamed into place,
+    so readers in other processes see the old value or the new one, never
+    a partial file.
+
+    Reads go through an in-process LRU cache of blobs keyed by hash, capped
+    at cacheBytes. A blob never changes once written, so the cache can't go
+    stale; only the small ref file is read on every access. Counters and
+    read/write latencies are kept in Statistics().
+    """
+
+    def __init__(self, root=OBJECT_STORE_ROOT, cacheBytes=OBJECT_CACHE_BYTES):
+        self.root = root
+        self.cacheBytes = cacheBytes
+        self._cache = OrderedDict()     # hash -> bytes, least recently used first
+        self._cachedBytes = 0
+        self.ResetStatistics()
+
+    # ---- keys and paths ----
+    @staticmethod
+    def _Key(key):
+        # "a\\b", "/a//b" -> "a/b"
+        parts = [part for part in key.replace("\\", "/").split("/") if part]
+        if not parts or any(part in (".", "..") for part in parts):
+            raise ValueError(f"Invalid object store key {key!r}")
+        return "/".join(parts)
+
+    def _RefPath(self, key):
+        name = hashlib.sha256(self._Key(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.root, "refs", name[:2], name)
+
+    def _Ref(self, path):
+        # (content hash, key) of a ref file, None if it isn't there
+        try:
+            with open(path, encoding="utf-8") as f:
+                digest, _, key = f.read().partition("\n")
+        except FileNotFoundError:
+            return None
+        return (digest.strip() or None), key
+
+    def _BlobPath(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def _Hash(self, key):
+        ref = self._Ref(self._RefPath(key))
+        return None if ref is None else ref[0]
+
+    def GetFilePath(self, key):
+        # Path of the key's content; shared between keys with equal content, treat it as read-only
+        digest = self._Hash(key)
+        if digest is None:
+            raise KeyError(f"Object store key {key!r} not found")
+        return self._BlobPath(digest)
+
+    def ContainsKey(self, key):
+        return self._Hash(key) is not None
+
+    @property
+    def Keys(self):
+        # The keys are read back from the ref files, whose names are only hashes
+        top = os.path.join(self.root, "refs")
+        if not os.path.isdir(top):
+            return []
+        refs = (self._Ref(os.path.join(directory, name)) for directory, _, names in os.walk(top) for name in names)
+        return sorted(ref[1] for ref in refs if ref is not None and ref[0] is not None)
+
+    # ---- writing ----
+    def SaveBytes(self, key, data):
+        started = _clock.perf_counter()
+        data = bytes(data)
+        digest = hashlib.sha256(data).hexdigest()
+        blob = self._BlobPath(digest)
+        if os.path.exists(blob):
+            self.dedupedWrites += 1
+        else:
+            self._WriteAtomic(blob, data)
+            self.bytesWritten += len(data)
+        self._WriteAtomic(self._RefPath(key), f"{digest}\n{self._Key(key)}".encode("utf-8"))
+        self._Remember(digest, data)
+        self.writes += 1
+        self.writeSeconds += _clock.perf_counter() - started
+        return True
+
+    def Save(self, key, text):
+        return self.SaveBytes(key, text.encode("utf-8"))
+
+    def SaveJson(self, key, value):
+        return self.Save(key, json.dumps(value))
+
+    def Delete(self, key):
+        # Drops the key; its content stays until Collect() finds it unreferenced
+        try:
+            os.remove(self._RefPath(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def Collect(self):
+        # Remove blobs no key refers to; returns the bytes freed.
+        # Run it while no other process is saving: a blob is written before its ref
+        referenced = {self._Hash(key) for key in self.Keys}
+        freed = 0
+        top = os.path.join(self.root, "objects")
+        for directory, _, names in os.walk(top):
+            for name in names:
+                if name not in referenced:
+                    path = os.path.join(directory, name)
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+                    self._Forget(name)
+        return freed
+
+    # ---- reading ----
+    def ReadBytes(self, key):
+        started = _clock.perf_counter()
+        digest = self._Hash(key)
+        if digest is None:
+            raise KeyError(f"Object store key {key!r} not found")
+        data = self._cache.get(digest)
+        if data is not None:
+            self._cache.move_to_end(digest)
+            self.hits += 1
+        else:
+            with open(self._BlobPath(digest), "rb") as f:
+                data = f.read()
+            self._Remember(digest, data)
+            self.misses += 1
+            self.bytesRead += len(data)
+        self.reads += 1
+        self.readSeconds += _clock.perf_counter() - started
+        return data
+
+    def Read(self, key):
+        return self.ReadBytes(key).decode("utf-8")
+
+    def ReadJson(self, key):
+        return json.loads(self.Read(key))
+
+    def _WriteAtomic(self, path, data):
+        # Staged under <root>/tmp (same file system) and renamed into place
+        staging = os.path.join(self.root, "tmp")
+        os.makedirs(staging, exist_ok=True)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=staging)
+        try:
+            with os.fdopen(handle, "wb") as f:
+                f.write(data)
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    # ---- cache ----
+    def _Remember(self, digest, data):
+        if len(data) > self.cacheBytes:
+            return
+        if digest in self._cache:
+            self._cache.move_to_end(digest)
+            return
+        self._cache[digest] = data
+        self._cachedBytes += len(data)
+        while self._cachedBytes > self.cacheBytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cachedBytes -= len(evicted)
+            self.evictions += 1
+
+    def _Forget(self, digest):
+        data = self._cache.pop(digest, None)
+        if data is not None:
+            self._cachedBytes -= len(data)
+
+    def ClearCache(self):
+        self._cache.clear()
+        self._cachedBytes = 0
+
+    # ---- statistics ----
+    def ResetStatistics(self):
+        self.reads = self.writes = 0
+        self.hits = self.misses = self.evictions = self.dedupedWrites = 0
+        self.bytesRead = self.bytesWritten = 0
+        self.readSeconds = self.writeSeconds = 0.0
+
+    def Statistics(self):
+        return {
+            "reads": self.reads,
+            "writes": self.writes,
+            "hit_rate": self.hits / self.reads if self.reads else 0.0,
+            "evictions": self.evictions,
+            "deduped_writes": self.dedupedWrites,
+            "bytes_read": self.bytesRead,
+            "bytes_written": self.bytesWritten,
+            "cached_bytes": self._cachedBytes,
+            "read_us": self.readSeconds / self.reads * 1e6 if self.reads else 0.0,
+            "write_us": self.writeSeconds / self.writes * 1e6 if self.writes else 0.0,
+        }
+
+
+# ---------------------------------------------------------------------
+# Algorithm
+# ---------------------------------------------------------------------
+class QCAlgorithm:
+    Universe = Universe
+
+    def __init__(self):
+        self.Securities = SecurityManager()
+        self.Portfolio = SecurityPortfolioManager(self.Securities)
+        self.Portfolio.Cash = self._initialCash = 100000.0
+        self.Transactions = SecurityTransactionManager(self)
+        self.Schedule = ScheduleManager(self)
+        self.DateRules = DateRules(self)
+        self.TimeRules = TimeRules(self)
+        self.Settings = AlgorithmSettings()
+        self.UniverseSettings = UniverseSettings()
+        self.SubscriptionManager = SubscriptionManager(self)
+        self.OptionChainProvider = OptionChainProvider(self)
+        self.ObjectStore = LocalObjectStore()
+        self.StartDate = datetime(1998, 1, 1)
+        self.EndDate = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.Time = self.StartDate
+        self.IsWarmingUp = False
+        self.LiveMode = False
+        self.Benchmark = None
+        self.BrokerageModel = None
+        self.Logs = []
+        self.Charts = {}
+        self.RuntimeStatistics = {}
+        self._parameters = {}
+        self._subscriptions = {}
+        self._warmup = None
+        self._echo = False
+        self._dataSources = {}
+        self._allowMissing = True   # outside RunAlgorithm there is no data to miss
+        self._dataSeconds = 0.0
+        self._optionFeeds = []
+
+    # ---- setup ----
+    def SetStartDate(self, year, month=None, day=None):
+        self.StartDate = year if month is None else datetime(year, month, day)
+        self.Time = self.StartDate
+
+    def SetEndDate(self, year, month=None, day=None):
+        self.EndDate = year if month is None else datetime(year, month, day)
+
+    def SetCash(self, cash):
+        self.Portfolio.Cash = self._initialCash = float(cash)
+
+    def SetBenchmark(self, benchmark):
+        self.Benchmark = benchmark
+
+    def SetBrokerageModel(self, brokerage, accountType=None):
+        self.BrokerageModel = (brokerage, accountType)
+
+    def SetWarmUp(self, period, resolution=None):
+        self._warmup = period
+
+    SetWarmup = SetWarmUp
+
+    def GetParameter(self, name, defaultValue=None):
+        return self._parameters.get(name, defaultValue)
+
+    def SetParameters(self, parameters):
+        self._parameters = {k: str(v) for k, v in parameters.items()}
+
+    def AddUniverse(self, *args):
+        self._universe = args
+
+    def AddAlpha(self, model):
+        pass
+
+    def SetPortfolioConstruction(self, model):
+        pass
+
+    def SetRiskManagement(self, model):
+        pass
+
+    def SetExecution(self, model):
+        pass
+
+    # ---- subscriptions ----
+    def _AddSecurity(self, ticker, securityType, resolution, market, dataType=None):
+        if resolution is None:
+            resolution = Resolution.Minute
+        symbol = ticker if isinstance(ticker, Symbol) else Symbol(ticker, securityType, market)
+        security = self.Securities.get(symbol)
+        if security is None:
+            canonical = symbol.SecurityType == SecurityType.Option and symbol.ID.Date is None
+            security = (Option if canonical else Security)(symbol, resolution, self)
+            self.Securities[symbol] = security
+            subscription = _Subscription(security, resolution, dataType)
+            self._subscriptions[symbol] = subscription
+            _AttachData(self, subscription)
+        return security
+
+    def AddEquity(self, ticker, resolution=None, market="usa", fillForward=True, leverage=None, extendedMarketHours=False):
+        security = self._AddSecurity(ticker, SecurityType.Equity, resolution, market)
+        if leverage:
+            security.SetLeverage(leverage)
+        return security
+
+    def AddForex(self, ticker, resolution=None, market="oanda", fillForward=True, leverage=None):
+        return self._AddSecurity(ticker, SecurityType.Forex, resolution, market)
+
+    def AddCrypto(self, ticker, resolution=None, market="coinbase", fillForward=True, leverage=None):
+        return self._AddSecurity(ticker, SecurityType.Crypto, resolution, market)
+
+    def AddData(self, dataType, ticker, resolution=Resolution.Daily, *args):
+        return self._AddSecurity(ticker, SecurityType.Base, resolution, "usa", dataType)
+
+    def AddOption(self, ticker, resolution=None, market="usa", *args):
+        underlying = self._Symbol(ticker) if ticker in self.Securities else Symbol(ticker, SecurityType.Equity, market)
+        canonical = Symbol("?" + ticker, SecurityType.Option, market, underlying)
+        return self._AddSecurity(canonical, SecurityType.Option, resolution, market)
+
+    def AddOptionContract(self, symbol, resolution=None, fillForward=True, leverage=None, extendedMarketHours=False):
+        return self._AddSecurity(symbol, SecurityType.Option, resolution, symbol.ID.Market)
+
+    def _Symbol(self, symbol):
+        if isinstance(symbol, Symbol):
+            return symbol
+        security = self.Securities.get(symbol)
+        return security.Symbol if security is not None else Symbol(symbol)
+
+    def _Subscription(self, symbol):
+        return self._subscriptions[symbol]
+
+    def _IsTradingDay(self, symbol, day):
+        subscription = self._subscriptions.get(symbol)
+        if subscription is None or subscription.tradingDays is None:
+            return day.weekday() < 5
+        return day in subscription.tradingDays
+
+    # ---- indicators and consolidators ----
+    def RegisterIndicator(self, symbol, indicator, resolution=None, selector=None):
+        subscription = self._Subscription(symbol)
+        if isinstance(indicator, PythonIndicator):
+            feed = lambda bar: _FeedPythonIndicator(indicator, bar)
+        elif selector is None:
+            feed = indicator.Update
+        else:
+            feed = lambda bar: indicator.Update(bar.EndTime, selector(bar))
+
+        if isinstance(resolution, timedelta):
+            period = resolution
+        elif resolution is None:
+            period = subscription.period
+        else:
+            period = _RESOLUTION_PERIOD[resolution]
+
+        if period <= subscription.period:
+            subscription.consumers.append(feed)
+        else:
+            consolidator = TradeBarConsolidator(period)
+            consolidator.DataConsolidated += lambda sender, bar: feed(bar)
+            subscription.consumers.append(consolidator.Update)
+        return indicator
+
+    def _Indicator(self, symbol, indicator, resolution, selector):
+        self.RegisterIndicator(symbol, indicator, resolution, selector)
+        return indicator
+
+    def SMA(self, symbol, period, resolution=None, selector=None):
+        return self._Indicator(symbol, SimpleMovingAverage(f"SMA({symbol},{period})", period), resolution, selector)
+
+    def EMA(self, symbol, period, resolution=None, selector=None):
+        return self._Indicator(symbol, ExponentialMovingAverage(f"EMA({symbol},{period})", period),
+                               resolution, selector)
+
+    def STD(self, symbol, period, resolution=None, selector=None):
+        return self._Indicator(symbol, StandardDeviation(f"STD({symbol},{period})", period), resolution, selector)
+
+    def BB(self, symbol, period, k, movingAverageType=MovingAverageType.Simple, resolution=None, selector=None):
+        return self._Indicator(symbol, BollingerBands(f"BB({symbol},{period},{k})", period, k, movingAverageType),
+                               resolution, selector)
+
+    def RSI(self, symbol, period, movingAverageType=MovingAverageType.Wilders, resolution=None, selector=None):
+        return self._Indicator(symbol, RelativeStrengthIndex(f"RSI({symbol},{period})", period, movingAverageType),
+                               resolution, selector)
+
+    def MAX(self, symbol, period, resolution=None, selector=None):
+        return self._Indicator(symbol, Maximum(f"MAX({symbol},{period})", period), resolution, selector)
+
+    def MIN(self, symbol, period, resolution=None, selector=None):
+        return self._Indicator(symbol, Minimum(f"MIN({symbol},{period})", period), resolution, selector)
+
+    def Consolidate(self, symbol, period, handler):
+        consolidator = TradeBarConsolidator(period)
+        consolidator.DataConsolidated += lambda sender, bar: handler(bar)
+        self.SubscriptionManager.AddConsolidator(symbol, consolidator)
+        return consolidator
+
+    # ---- orders ----
+    def MarketOrder(self, symbol, quantity, asynchronous=False, tag=""):
+        return self.Transactions._Submit(self._Symbol(symbol), quantity, OrderType.Market, tag)
+
+    def LimitOrder(self, symbol, quantity, limitPrice, tag=""):
+        return self.Transactions._Submit(self._Symbol(symbol), quantity, OrderType.Limit, tag, limitPrice=limitPrice)
+
+    def StopMarketOrder(self, symbol, quantity, stopPrice, tag=""):
+        return self.Transactions._Submit(self._Symbol(symbol), quantity, OrderType.StopMarket, tag,
+                                         stopPrice=stopPrice)
+
+    def Buy(self, symbol, quantity):
+        return self.MarketOrder(symbol, abs(quantity))
+
+    def Sell(self, symbol, quantity):
+        return self.MarketOrder(symbol, -abs(quantity))
+
+    def Order(self, symbol, quantity):
+        return self.MarketOrder(symbol, quantity)
+
+    def CalculateOrderQuantity(self, symbol, target):
+        security = self.Securities[symbol]
+        if security.Price == 0:
+            return 0
+        settings = self.Settings
+        value = self.Portfolio.TotalPortfolioValue
+        free = settings.FreePortfolioValue if settings.FreePortfolioValue is not None \
+            else value * settings.FreePortfolioValuePercentage
+        targetValue = target * (value - free)
+        unit = security.Price * _MULTIPLIER.get(security.Type, 1.0)
+        quantity = (targetValue - security.Holdings.HoldingsValue) / unit
+        if security.Type == SecurityType.Crypto:
+            return math.trunc(quantity * 1e8) / 1e8
+        return float(math.trunc(quantity))
+
+    def SetHoldings(self, symbol, percentage=None, liquidateExistingHoldings=False, tag=""):
+        if isinstance(symbol, list):
+            targets = [(self._Symbol(t.Symbol), t.Quantity) for t in symbol]
+        else:
+            targets = [(self._Symbol(symbol), percentage)]
+
+        if liquidateExistingHoldings:
+            keep = {s for s, _ in targets}
+            for s, security in list(self.Securities.items()):
+                if s not in keep and security.Holdings.Invested:
+                    self.Liquidate(s, tag)
+
+        # Reduce positions before adding to others, as LEAN does for target lists
+        orders = [(s, self.CalculateOrderQuantity(s, p)) for s, p in targets]
+        orders.sort(key=lambda item: item[1] * self.Securities[item[0]].Holdings.Quantity >= 0)
+        for s, quantity in orders:
+            if quantity != 0:
+                self.MarketOrder(s, quantity, tag=tag)
+
+    def Liquidate(self, symbol=None, tag="Liquidated"):
+        symbols = list(self.Securities.keys()) if symbol is None else [self._Symbol(symbol)]
+        tickets = []
+        for s in symbols:
+            self.Transactions.CancelOpenOrders(s)
+            quantity = self.Securities[s].Holdings.Quantity
+            if quantity != 0:
+                tickets.append(self.MarketOrder(s, -quantity, tag=tag))
+        return tickets
+
+    def _OnOrderEvent(self, orderEvent):
+        handler = getattr(self, "OnOrderEvent", None)
+        if handler is not None:
+            handler(orderEvent)
+
+    # ---- history ----
+    def History(self, *args, **kwargs):
+        import pandas as pd
+
+        args = list(args)
+        if args and isinstance(args[0], type):
+            args.pop(0)
+        symbols = args.pop(0)
+        single = not isinstance(symbols, (list, tuple, set))
+        symbols = [symbols] if single else list(symbols)
+
+        span = args.pop(0) if args else kwargs.get("periods")
+        end = self.Time
+        resolution = kwargs.get("resolution")
+        if isinstance(span, datetime):
+            end = args.pop(0) if args and isinstance(args[0], datetime) else self.Time
+            end = min(end, self.Time)
+        if args:
+            resolution = args.pop(0)
+
+        frames = []
+        for symbol in symbols:
+            symbol = self._Symbol(symbol)
+            bars = self._HistoryBars(symbol, resolution)
+            stop = bars.Search(end)
+            if isinstance(span, int):
+                first = max(stop - span, 0)
+            elif isinstance(span, timedelta):
+                first = bars.Search(end - span)
+            else:
+                first = bars.Search(span, "left")
+            if first >= stop:
+                continue
+            _, ends, opens, highs, lows, closes, volumes = bars.Columns(first, stop)
+            index = pd.MultiIndex.from_arrays([[symbol] * (stop - first), ends], names=["symbol", "time"])
+            frames.append(pd.DataFrame({
+                "open": opens,
+                "high": highs,
+                "low": lows,
+                "close": closes,
+                "volume": volumes,
+            }, index=index))
+
+        if not frames:
+            return pd.DataFrame(columns=["open", "high", "low", "close", "volume"])
+        return pd.concat(frames) if len(frames) > 1 else frames[0]
+
+    def _HistoryBars(self, symbol, resolution):
+        subscription = self._Subscription(symbol)
+        bars = subscription.bars
+        if bars is None:
+            return _BarArrays([], [], [], [], [], [], [])
+        if resolution is None or _RESOLUTION_PERIOD[resolution] <= subscription.period:
+            return bars
+
+        # Coarser history than the subscription: consolidate the loaded bars once and cache
+        cache = subscription.__dict__.setdefault("history", {})
+        if resolution not in cache:
+            consolidated = []
+            consolidator = TradeBarConsolidator(resolution)
+            consolidator.DataConsolidated += lambda sender, bar: consolidated.append(bar)
+            for lo, hi, (starts, _, opens, highs, lows, closes, volumes) in bars.Chunks(0, len(bars)):
+                for i in range(lo, hi):
+                    consolidator.Update(TradeBar(starts[i], symbol, opens[i], highs[i], lows[i], closes[i], volumes[i],
+                                                 subscription.period))
+            if consolidator.WorkingBar is not None:
+                consolidator._Emit()
+            cache[resolution] = _BarArrays(
+                [b.Time for b in consolidated], [b.EndTime for b in consolidated],
+                [b.Open for b in consolidated], [b.High for b in consolidated], [b.Low for b in consolidated],
+                [b.Close for b in consolidated], [b.Volume for b in consolidated])
+        return cache[resolution]
+
+    # ---- logging and charting ----
+    def Log(self, message):
+        self.Logs.append(f"{self.Time} {message}")
+        if self._echo:
+            print(self.Logs[-1])
+
+    Debug = Log
+    Error = Log
+
+    def Plot(self, chart, series, value=None):
+        if value is None:
+            chart, series, value = "Strategy Equity", chart, series
+        self.Charts.setdefault(chart, {}).setdefault(series, []).append((self.Time, value))
+
+    def Record(self, series, value):
+        self.Plot("Custom", series, value)
+
+    def AddChart(self, chart):
+        self.Charts.setdefault(chart.Name, {})
+
+    def SetRuntimeStatistic(self, name, value):
+        self.RuntimeStatistics[name] = value
+
+    # ---- event handlers ----
+    def Initialize(self):
+        pass
+
+    def OnData(self, data):
+        pass
+
+    def OnEndOfAlgorithm(self):
+        pass
+
+
+# ---------------------------------------------------------------------
+# Loading and replay
+# ---------------------------------------------------------------------
+def _Shim(name, **members):
+    module = sys.modules.get(name)
+    if module is None:
+        module = types.ModuleType(name)
+        sys.modules[name] = module
+    module.__dict__.update(members)
+    return module
+
+
+def _Exports():
+    return {name: value for name, value in globals().items()
+            if not name.startswith("_") and name not in (
+                "RunAlgorithm", "LoadAlgorithm", "LoadModule", "RunResult", "SyntheticOptionChains")}
+
+
+def _InstallShims():
+    exports = _Exports()
+    exports.update(datetime=datetime, timedelta=timedelta, date=date)
+    _Shim("AlgorithmImports", **exports)
+    _Shim("System", Drawing=_Shim("System.Drawing", Color=Color))
+    _Shim("QuantConnect", **exports)
+    _Shim("QuantConnect.Indicators", **exports)
+    _Shim("QuantConnect.Data", **exports)
+    _Shim("QuantConnect.Data.Custom", **exports)
+    _Shim("QuantConnect.Data.Custom.CBOE", CBOE=CBOE)
+    return exports
+
+
+def LoadModule(path, name):
+    # Execute a file unchanged as module `name`, with the LEAN names pre-filled;
+    # also used to import helper files under the module name their imports expect
+    exports = _InstallShims()
+    directory = os.path.dirname(os.path.abspath(path))
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+
+    module = types.ModuleType(name)
+    module.__file__ = path
+    module.__dict__.update(exports)
+    sys.modules[name] = module
+    with open(path) as f:
+        exec(compile(f.read(), path, "exec"), module.__dict__)
+    return module
+
+
+def LoadAlgorithm(path):
+    # Execute an algorithm file unchanged and return its QCAlgorithm subclass
+    name = "_algorithm_" + "".join(c if c.isalnum() else "_" for c in os.path.basename(path)[:-3])
+    module = LoadModule(path, name)
+
+    candidates = [value for value in module.__dict__.values()
+                  if isinstance(value, type) and issubclass(value, QCAlgorithm)
+                  and value is not QCAlgorithm and value.__module__ == name]
+    if not candidates:
+        raise ValueError(f"No QCAlgorithm subclass defined in {path}")
+    return candidates[0]
+
+
+def _LoadBarArrays(source, period):
+    # Bar file / column dict -> _BarArrays with datetime start and end times;
+    # BarStore files (.bars) and BarFile objects are mapped, not loaded
+    if isinstance(source, str) and source.endswith(".bars"):
+        import BarStore
+        source = BarStore.BarFile(source)
+    if "BarStore" in sys.modules and isinstance(source, sys.modules["BarStore"].BarFile):
+        return _MappedBars(source, period)
+    if isinstance(source, str):
+        import VectorizedBacktest
+        source = VectorizedBacktest.LoadBars(source)
+    times = source["time"]
+    if hasattr(times, "dtype") and times.dtype.kind == "M":
+        times = times.astype("datetime64[s]").astype("int64")
+    seconds = times.tolist() if hasattr(times, "tolist") else list(times)
+    starts = [_EPOCH + timedelta(seconds=s) if not isinstance(s, datetime) else s for s in seconds]
+    column = lambda name: source[name].tolist() if hasattr(source[name], "tolist") else list(source[name])
+    return _BarArrays(starts, [s + period for s in starts], column("open"), column("high"), column("low"),
+                      column("close"), column("volume"))
+
+
+def _LoadCustomData(subscription, path, algorithm):
+    # Custom PythonData from a local file, one Reader call per line
+    dataType = subscription.dataType
+    instance = dataType()
+    config = SubscriptionDataConfig(subscription.symbol, dataType, subscription.resolution)
+    points = []
+    with open(path) as f:
+        for line in f:
+            point = instance.Reader(config, line.rstrip("\n"), algorithm.StartDate, False)
+            if point is not None:
+                points.append(point)
+    points.sort(key=lambda p: p.EndTime)
+    return points
+
+
+class RunResult:
+
+    def __init__(self, algorithm):
+        self.Algorithm = algorithm
+        self.Slices = 0
+        self.Bars = 0
+        self.ImportSeconds = _IMPORT_SECONDS
+        self.LoadSeconds = 0.0
+        self.InitializeSeconds = 0.0
+        self.DataSeconds = 0.0
+        self.ReplaySeconds = 0.0
+        self.OnDataSeconds = 0.0
+
+    @property
+    def DispatchSecondsPerSlice(self):
+        # Harness overhead per slice: replay time not spent inside OnData
+        return (self.ReplaySeconds - self.OnDataSeconds) / self.Slices if self.Slices else 0.0
+
+    def Timings(self):
+        return {
+            "import_s": self.ImportSeconds,
+            "load_s": self.LoadSeconds,
+            "initialize_s": self.InitializeSeconds,
+            "data_s": self.DataSeconds,
+            "replay_s": self.ReplaySeconds,
+            "ondata_s": self.OnDataSeconds,
+            "dispatch_us_per_slice": self.DispatchSecondsPerSlice * 1e6,
+            "slices": self.Slices,
+            "bars": self.Bars,
+        }
+
+
+def RunAlgorithm(algorithm, data, parameters=None, echo=False, onSlice=None, end=None, objectStore=None,
+                 allowMissing=False):
+    """Run an algorithm (file path, class or instance) over local data.
+
+    data maps a ticker, or (ticker, resolution), to a bar file path or a
+    column dict; custom data tickers may map to a text file fed through the
+    type's Reader, and "?TICKER" option tickers to a chain source such as
+    SyntheticOptionChains. onSlice(algorithm, slice) is called after every
+    OnData. end, if given, replaces the EndDate set in Initialize.
+    objectStore is a directory or a LocalObjectStore (default data/object_store).
+
+    A subscription with nothing in data raises ValueError, rather than
+    replaying an empty backtest, unless allowMissing is set; then it simply
+    gets no bars.
+    """
+    started = _clock.perf_counter()
+    if isinstance(algorithm, str):
+        algorithm = LoadAlgorithm(algorithm)
+    if isinstance(algorithm, type):
+        algorithm = algorithm()
+    result = RunResult(algorithm)
+    result.LoadSeconds = _clock.perf_counter() - started
+
+    algorithm._echo = echo
+    algorithm._dataSources = {_SourceKey(k): v for k, v in data.items()}
+    algorithm._allowMissing = allowMissing
+    if parameters:
+        algorithm.SetParameters(parameters)
+    if objectStore is not None:
+        algorithm.ObjectStore = objectStore if isinstance(objectStore, LocalObjectStore) else LocalObjectStore(objectStore)
+
+    started = _clock.perf_counter()
+    algorithm.Initialize()
+    result.InitializeSeconds = _clock.perf_counter() - started
+    if end is not None:
+        algorithm.EndDate = end
+
+    streams = _Streams(algorithm)
+    result.DataSeconds = algorithm._dataSeconds
+    result.InitializeSeconds -= result.DataSeconds
+
+    started = _clock.perf_counter()
+    _Replay(algorithm, streams, result, onSlice)
+    result.ReplaySeconds = _clock.perf_counter() - started
+
+    algorithm.OnEndOfAlgorithm()
+    return result
+
+
+def _SourceKey(key):
+    # "spy" -> "SPY"; ("spy", "Daily") or ("spy", Resolution.Daily) -> ("SPY", Resolution.Daily)
+    if isinstance(key, str):
+        return key.upper()
+    ticker, resolution = key
+    if isinstance(resolution, str):
+        resolution = getattr(Resolution, resolution.capitalize(), resolution)
+    return ticker.upper(), resolution
+
+
+def _ResolutionName(resolution):
+    names = {value: name for name, value in vars(Resolution).items() if not name.startswith("_")}
+    return names.get(resolution, str(resolution))
+
+
+def _MissingData(algorithm, ticker, resolution):
+    # A subscription nothing in data feeds would replay as an empty backtest
+    keys = ", ".join(repr(k) if isinstance(k, str) else f"({k[0]!r}, {_ResolutionName(k[1])})"
+                     for k in algorithm._dataSources)
+    return ValueError(f"No local data for {ticker} ({_ResolutionName(resolution)}); data has: {keys or 'nothing'}")
+
+
+def _AttachData(algorithm, subscription):
+    # Load the subscription's local data as soon as it is added, so History
+    # works inside Initialize
+    if subscription.symbol.SecurityType == SecurityType.Option:
+        _AttachOptionData(algorithm, subscription)
+        return
+
+    sources = algorithm._dataSources
+    ticker = subscription.symbol.Value
+    source = sources.get((ticker, subscription.resolution), sources.get(ticker))
+    if source is None:
+        if algorithm._allowMissing:
+            return
+        raise _MissingData(algorithm, ticker, subscription.resolution)
+
+    started = _clock.perf_counter()
+    dataType = subscription.dataType
+    if dataType is not None and getattr(dataType, "Reader", PythonData.Reader) is not PythonData.Reader:
+        points = _LoadCustomData(subscription, source, algorithm)
+        subscription.points = points
+        subscription.tradingDays = {p.EndTime.date() for p in points}
+    else:
+        bars = _LoadBarArrays(source, subscription.period)
+        subscription.bars = bars
+        subscription.tradingDays = bars.Days()
+    algorithm._dataSeconds += _clock.perf_counter() - started
+
+
+def _AttachOptionData(algorithm, subscription):
+    # Options are quoted by the chain source registered for "?<underlying>"
+    symbol = subscription.symbol
+    if symbol.Underlying is None:
+        return
+    source = algorithm._dataSources.get("?" + symbol.Underlying.Value)
+    if source is None:
+        if algorithm._allowMissing:
+            return
+        raise _MissingData(algorithm, "?" + symbol.Underlying.Value, subscription.resolution)
+    if symbol.ID.Date is None:
+        feed = _OptionChainFeed(algorithm, subscription.security, source)
+    else:
+        feed = _OptionContractFeed(algorithm, subscription, source)
+        feed.Seed(algorithm.Time)
+    algorithm._optionFeeds.append(feed)
+
+
+def _Streams(algorithm):
+    streams = []
+    for subscription in algorithm._subscriptions.values():
+        if subscription.bars is not None:
+            streams.append((subscription, subscription.bars))
+        elif subscription.points is not None:
+            streams.append((subscription, subscription.points))
+    return streams
+
+
+def _WarmUpStart(algorithm, streams):
+    warmup = algorithm._warmup
+    start = algorithm.StartDate
+    if warmup is None:
+        return start
+    if isinstance(warmup, timedelta):
+        return start - warmup
+    earliest = start
+    for subscription, stream in streams:
+        if isinstance(stream, list):
+            ends = [p.EndTime for p in stream]
+            first = bisect.bisect_left(ends, start)
+            if first > 0:
+                earliest = min(earliest, ends[max(first - warmup, 0)])
+        else:
+            first = stream.Search(start, "left")
+            if first > 0:
+                earliest = min(earliest, stream.End(max(first - warmup, 0)))
+    return earliest
+
+
+class _BarCursor:
+    # Position in one subscription's bars, walked a chunk of column lists at a time
+    __slots__ = ("subscription", "symbol", "period", "chunks", "columns", "ends", "i", "hi")
+    isBar = True
+
+    def __init__(self, subscription, stream, start, end):
+        self.subscription = subscription
+        self.symbol = subscription.symbol
+        self.period = subscription.period
+        self.chunks = stream.Chunks(stream.Search(start), stream.Search(end))
+        self.columns = self.ends = None
+        self.i, self.hi = -1, 0
+
+    def Next(self):
+        # End time of the next point (the cursor moves onto it), or None when exhausted
+        self.i += 1
+        while self.i >= self.hi:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return None
+            self.i, self.hi, self.columns = chunk
+            self.ends = self.columns[1]
+        return self.ends[self.i]
+
+    def Point(self):
+        columns, i = self.columns, self.i
+        return TradeBar(columns[0][i], self.symbol, columns[2][i], columns[3][i], columns[4][i], columns[5][i],
+                        columns[6][i], self.period)
+
+
+class _PointCursor(_BarCursor):
+    # Position in a list of custom data points
+    __slots__ = ()
+    isBar = False
+
+    def __init__(self, subscription, points, start, end):
+        ends = [p.EndTime for p in points]
+        first, last = bisect.bisect_right(ends, start), bisect.bisect_right(ends, end)
+        self.subscription = subscription
+        self.symbol = subscription.symbol
+        self.period = subscription.period
+        self.chunks = iter([(first, last, (points, ends))])
+        self.columns = self.ends = None
+        self.i, self.hi = -1, 0
+
+    def Point(self):
+        return self.columns[0][self.i]
+
+
+class _StreamMerge:
+    """K-way merge of stream cursors into time steps.
+
+    Iterating yields (time, group): every time at which some stream has a
+    point, in order, with the indices of the cursors positioned on a point
+    ending then, ascending. A stream with no point at that time is just not
+    in the group (nothing is carried forward); exhausted streams drop out.
+
+    The heap holds each pending time once and `waiting` maps it to the
+    cursors due then, so streams on a shared timeline (a universe of
+    equities, pairs on the same clock) cost one heap push and pop per step,
+    not per bar. Group lists are recycled; a group is only valid until the
+    next step is requested.
+    """
+
+    def __init__(self, cursors):
+        self.cursors = cursors
+        self.heap = []
+        self.waiting = {}
+        self.spare = []
+        for k, cursor in enumerate(cursors):
+            self._Wait(cursor.Next(), k)
+
+    def _Wait(self, time, k):
+        if time is None:
+            return
+        group = self.waiting.get(time)
+        if group is None:
+            group = self.waiting[time] = self.spare.pop() if self.spare else []
+            heapq.heappush(self.heap, time)
+        group.append(k)
+
+    def __iter__(self):
+        heap, waiting, spare, cursors = self.heap, self.waiting, self.spare, self.cursors
+        heappop, heappush = heapq.heappop, heapq.heappush
+        while heap:
+            time = heappop(heap)
+            group = waiting.pop(time)
+            group.sort()
+            yield time, group
+            for k in group:
+                following = cursors[k].Next()
+                if following is None:
+                    continue
+                due = waiting.get(following)
+                if due is None:
+                    due = waiting[following] = spare.pop() if spare else []
+                    heappush(heap, following)
+                due.append(k)
+            group.clear()
+            spare.append(group)
+
+
+def _Replay(algorithm, streams, result, onSlice):
+    start = _WarmUpStart(algorithm, streams)
+    end = algorithm.EndDate + timedelta(days=1)
+    cursors = [(_PointCursor if isinstance(stream, list) else _BarCursor)(subscription, stream, start, end)
+               for subscription, stream in streams]
+
+    transactions = algorithm.Transactions
+    onData = algorithm.OnData
+    optionFeeds = algorithm._optionFeeds
+    clock = _clock.perf_counter
+    events = _EventQueue(algorithm)
+    algorithm.IsWarmingUp = start < algorithm.StartDate
+
+    onDataSeconds = 0.0
+    slices = count = 0
+
+    for time, group in _StreamMerge(cursors):
+        if algorithm.IsWarmingUp and time >= algorithm.StartDate:
+            algorithm.IsWarmingUp = False
+        if not algorithm.IsWarmingUp:
+            events.FireUntil(time, inclusive=False)
+        algorithm.Time = time
+
+        data = DataDictionary()
+        bars = DataDictionary()
+        for k in group:
+            cursor = cursors[k]
+            point = cursor.Point()
+            symbol = cursor.symbol
+            if cursor.isBar:
+                bars[symbol] = point
+            data[symbol] = point
+
+            subscription = cursor.subscription
+            subscription.security.Update(point)
+            for consumer in subscription.consumers:
+                consumer(point)
+            if transactions._open:
+                transactions._Scan(symbol, point)
+        count += len(group)
+
+        chains = None
+        if optionFeeds:
+            chains = DataDictionary()
+            for feed in optionFeeds:
+                feed.Emit(time, data, chains)
+        if not algorithm.IsWarmingUp:
+            events.FireUntil(time)
+        algorithm.Time = time
+        slice = Slice(time, data, bars, chains)
+        started = clock()
+        onData(slice)
+        onDataSeconds += clock() - started
+        slices += 1
+        if onSlice is not None:
+            onSlice(algorithm, slice)
+
+    if not algorithm.IsWarmingUp:
+        events.FireUntil(algorithm.EndDate + timedelta(days=1) - timedelta(microseconds=1))
+
+    result.Slices = slices
+    result.Bars = count
+    result.OnDataSeconds = onDataSeconds
+
+
+class _EventQueue:
+    # Scheduled events expanded one day at a time, fired in time order
+
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        self.heap = []
+        self.day = None
+        self.sequence = 0
+
+    def FireUntil(self, time, inclusive=True):
+        algorithm = self.algorithm
+        if not algorithm.Schedule._events:
+            return
+        today = time.date()
+        if self.day is None:
+            self.day = max(algorithm.StartDate.date(), today) - timedelta(days=1)
+        while self.day < today:
+            self.day += timedelta(days=1)
+            self._Expand(self.day)
+
+        heap = self.heap
+        while heap and (heap[0][0] <= time if inclusive else heap[0][0] < time):
+            at, _, event = heapq.heappop(heap)
+            if event.Enabled:
+                algorithm.Time = at
+                event.Callback()
+
+    def _Expand(self, day):
+        for event in self.algorithm.Schedule._events:
+            if not event.Enabled or not event.DateRule.Includes(self.algorithm, day):
+                continue
+            for at in event.TimeRule.Times(self.algorithm, day):
+                self.sequence += 1
+                heapq.heappush(self.heap, (at, self.sequence, event))
+
+
+_IMPORT_SECONDS = _clock.perf_counter() - _importStarted
@@ -0,0 +1,146 @@
+# region imports
+from AlgorithmImports import *
+import json
+import struct
+import numpy as np
+from ModelInference import *
+# endregion
+
+"""
+Trained model artifacts: architecture and weights in one binary blob.
+
+Layout (little endian):
+    magic    4 bytes   b"QCMA"
+    version  uint16    FORMAT_VERSION
+    flags    uint16    reserved, 0
+    length   uint32    byte length of the JSON header
+    header   JSON      {"architecture", "layers", "arrays", "meta"}
+    padding  to a 64-byte boundary, then every array's raw bytes, each
+             starting on a 64-byte boundary at the offset the header gives
+
+Loading parses the small JSON header and wraps the array bytes with
+np.frombuffer (or np.memmap for a file path): nothing is copied or
+decoded, so startup does not depend on the model size, and a Dense /
+Flatten model runs through DenseForward without importing Keras at all.
+
+Usage (research):
+    qb.ObjectStore.SaveBytes("bitcoin_price_predictor", ModelArtifactBytes(model))
+Usage (algorithm):
+    artifact = LoadModelArtifact(bytes(self.ObjectStore.ReadBytes("bitcoin_price_predictor")))   # byte[] -> bytes
+    forward = artifact.Forward()          # or artifact.ToKeras()
+"""
+
+MAGIC = b"QCMA"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_PREFIX = struct.Struct("<4sHHI")
+
+
+def _Aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def ModelArtifactBytes(model, meta=None):
+    # Serialize a Keras model (anything with to_json / layers / get_weights)
+    layers, arrays = [], []
+    for layer in model.layers:
+        weights = [np.ascontiguousarray(w) for w in layer.get_weights()]
+        layers.append({
+            "name": layer.name,
+            "class_name": type(layer).__name__,
+            "config": json.loads(json.dumps(layer.get_config(), default=str)),
+            "weights": list(range(len(arrays), len(arrays) + len(weights))),
+        })
+        arrays.extend(weights)
+    return PackArtifact(model.to_json(), layers, arrays, meta)
+
+
+def PackArtifact(architecture, layers, arrays, meta=None):
+    # Lower level: architecture JSON text, layer specs and their arrays
+    table, offset = [], 0
+    for array in arrays:
+        table.append({"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset})
+        offset = _Aligned(offset + array.nbytes)
+
+    header = json.dumps({
+        "architecture": architecture,
+        "layers": layers,
+        "arrays": table,
+        "meta": meta or {},
+    }).encode()
+    start = _Aligned(_PREFIX.size + len(header))
+
+    blob = bytearray(start + offset)
+    _PREFIX.pack_into(blob, 0, MAGIC, FORMAT_VERSION, 0, len(header))
+    blob[_PREFIX.size:_PREFIX.size + len(header)] = header
+    for array, entry in zip(arrays, table):
+        position = start + entry["offset"]
+        blob[position:position + array.nbytes] = array.tobytes()
+    return bytes(blob)
+
+
+def IsModelArtifact(data):
+    return bytes(data[:len(MAGIC)]) == MAGIC
+
+
+def LoadModelArtifact(source):
+    # source: bytes-like, or a file path (memory-mapped)
+    if isinstance(source, str):
+        buffer = np.memmap(source, dtype=np.uint8, mode="r")
+    else:
+        buffer = np.frombuffer(source, dtype=np.uint8)
+
+    if buffer.size < _PREFIX.size:
+        raise ValueError("Not a model artifact: too short")
+    magic, version, _, length = _PREFIX.unpack(buffer[:_PREFIX.size].tobytes())
+    if magic != MAGIC:
+        raise ValueError("Not a model artifact: bad magic")
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Model artifact version {version} is newer than this reader ({FORMAT_VERSION})")
+
+    header = json.loads(buffer[_PREFIX.size:_PREFIX.size + length].tobytes())
+    start = _Aligned(_PREFIX.size + length)
+    arrays = []
+    for entry in header["arrays"]:
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"], dtype=np.int64))
+        array = np.frombuffer(buffer, dtype=dtype, count=count, offset=start + entry["offset"])
+        arrays.append(array.reshape(entry["shape"]))
+    return ModelArtifact(header["architecture"], header["layers"], arrays, header["meta"], version)
+
+
+class ModelArtifact:
+
+    def __init__(self, architecture, layers, arrays, meta, version=FORMAT_VERSION):
+        self.architecture = architecture    # model.to_json() text
+        self.layers = layers                # [{"name", "class_name", "config", "weights"}]
+        self.arrays = arrays                # read-only views over the artifact bytes
+        self.meta = meta
+        self.version = version
+
+    def LayerWeights(self, layer):
+        return [self.arrays[i] for i in layer["weights"]]
+
+    @property
+    def Weights(self):
+        # All arrays in model.get_weights() order
+        return [w for layer in self.layers for w in self.LayerWeights(layer)]
+
+    def Forward(self, dtype=np.float32):
+        # NumPy forward pass; raises ValueError for layers DenseForward can't run
+        return DenseForward.FromLayers(
+            [(layer["class_name"], layer["config"], self.LayerWeights(layer), layer["name"]) for layer in self.layers],
+            dtype)
+
+    def ToKeras(self):
+        from tensorflow.keras.models import model_from_json
+        model = model_from_json(self.architecture)
+        model.set_weights(self.Weights)
+        return model
+
+    def Compile(self):
+        # Forward pass when possible, else the rebuilt Keras model called directly
+        try:
+            return self.Forward()
+        except ValueError:
+            return CompileModel(self.ToKeras())
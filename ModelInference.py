@@ -0,0 +1,149 @@
+# region imports
+from AlgorithmImports import *
+import numpy as np
+# endregion
+
+"""
+Per-bar model inference without History() or Keras predict().
+
+FeatureWindow keeps, for every symbol, the last `steps` percent changes of
+OHLCV in a ring array, updated from each slice's bars. The change of a new
+bar is bar / previous bar - 1, the same arithmetic as DataFrame.pct_change,
+so the model sees the inputs it would get from History(...).pct_change()
+.tail(steps). (A 0/0 change stays NaN here, where dropna() would have
+skipped that row.)
+
+CompileModel turns a Keras Sequential of Dense / Flatten / Dropout layers
+into a plain NumPy forward pass over its current weights, evaluated for all
+symbols in one batch. Other models are called directly, model(x), which
+still skips predict()'s per-call setup.
+"""
+
+OHLCV = ("open", "high", "low", "close", "volume")
+
+
+def _Sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _Softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "sigmoid": _Sigmoid,
+    "tanh": np.tanh,
+    "softmax": _Softmax,
+}
+
+
+class DenseForward:
+    # Forward pass of a Dense / Flatten stack; Dense acts on the last axis like Keras
+
+    def __init__(self, layers, dtype=np.float32):
+        # layers: ("dense", kernel, bias, activation) or ("flatten",)
+        self.layers = layers
+        self.dtype = dtype
+
+    @staticmethod
+    def FromKeras(model, dtype=np.float32):
+        return DenseForward.FromLayers(
+            [(type(layer).__name__, layer.get_config(), layer.get_weights(), layer.name) for layer in model.layers],
+            dtype)
+
+    @staticmethod
+    def FromLayers(layers, dtype=np.float32):
+        # layers: (class name, Keras layer config, weights, name) in model order
+        forward = []
+        for kind, config, weights, name in layers:
+            if kind == "Dense":
+                if not weights:
+                    raise ValueError(f"Layer {name} has no weights (model not built)")
+                activation = config.get("activation", "linear")
+                if activation not in ACTIVATIONS:
+                    raise ValueError(f"Unsupported activation {activation!r} in {name}")
+                kernel = np.asarray(weights[0], dtype=dtype)
+                bias = np.asarray(weights[1], dtype=dtype) if config.get("use_bias", True) else None
+                forward.append(("dense", kernel, bias, ACTIVATIONS[activation]))
+            elif kind == "Flatten":
+                forward.append(("flatten",))
+            elif kind in ("Dropout", "InputLayer"):
+                continue    # identity at inference
+            else:
+                raise ValueError(f"Unsupported layer {kind} ({name})")
+        return DenseForward(forward, dtype)
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=self.dtype)
+        for layer in self.layers:
+            if layer[0] == "flatten":
+                x = x.reshape(len(x), -1)
+            else:
+                _, kernel, bias, activation = layer
+                x = x @ kernel
+                if bias is not None:
+                    x += bias
+                x = activation(x)
+        return x
+
+
+def CompileModel(model):
+    # Callable x -> outputs for a batch of inputs
+    try:
+        return DenseForward.FromKeras(model)
+    except ValueError:
+        return lambda x: np.asarray(model(np.asarray(x, dtype=np.float32), training=False))
+
+
+class FeatureWindow:
+
+    def __init__(self, symbols, steps=30, fields=len(OHLCV)):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.steps = steps
+        size = len(self.symbols)
+
+        self.changes = np.zeros((size, steps, fields))   # ring of percent changes
+        self.last = np.zeros((size, fields))              # previous bar
+        self.position = np.zeros(size, dtype=np.int64)    # next ring slot
+        self.count = np.zeros(size, dtype=np.int64)       # bars seen
+        self.offsets = np.arange(steps)
+
+    def Add(self, i, values):
+        # One OHLCV row for the symbol in row i
+        if self.count[i]:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                self.changes[i, self.position[i]] = values / self.last[i] - 1
+            self.position[i] = (self.position[i] + 1) % self.steps
+        self.last[i] = values
+        self.count[i] += 1
+
+    def Seed(self, history):
+        # History DataFrame indexed by (symbol, time) with OHLCV columns
+        if history is None or history.empty:
+            return
+        for symbol in history.index.get_level_values(0).unique():
+            i = self.index.get(symbol)
+            if i is None:
+                continue
+            for values in history.loc[symbol][list(OHLCV)].values[-(self.steps + 1):]:
+                self.Add(i, values)
+
+    def Update(self, bars):
+        for symbol, bar in bars.items():
+            i = self.index.get(symbol)
+            if i is not None:
+                self.Add(i, np.array((bar.Open, bar.High, bar.Low, bar.Close, bar.Volume), dtype=np.float64))
+
+    @property
+    def Ready(self):
+        return self.count > self.steps
+
+    def Inputs(self, rows=None):
+        # (symbols, steps, fields) windows, oldest change first
+        rows = np.flatnonzero(self.Ready) if rows is None else np.asarray(rows)
+        order = (self.position[rows, None] + self.offsets) % self.steps
+        return self.changes[rows[:, None], order]
@@ -0,0 +1,364 @@
+"""
+Columnar option quote store, partitioned by underlying, quote date and expiry
+
+Layout under <root>/<UNDERLYING>/:
+    <YYYYMMDD>/<EXPIRY YYYYMMDD>.<G>.npy   one structured array (QUOTE_FIELDS)
+                                           per quote date and expiry, rows
+                                           sorted by strike, right, then time;
+                                           G is the write generation
+    index.npy                              one INDEX_FIELDS row per (date,
+                                           expiry, strike, right): the
+                                           partition generation, where its
+                                           quotes sit in it and how many
+
+Every query goes through the index first. The strike range, days-to-expiry
+range and rights are applied to the index alone, so GetStrikes and
+GetExpiryDates never open a quote file. The quotes of the surviving entries
+are read lazily, one partition at a time, through memory maps: a partition
+that the predicates rule out is never opened, and within a partition only
+the selected strike rows are touched.
+
+Partitions and the index are written to a temporary file and renamed into
+place, so readers never see a partial file. A write never replaces a
+partition file in place: rewritten partitions go to new names under the
+next generation, the index is replaced, and only then are the files it no
+longer refers to deleted. A crash at any point leaves the old index with
+its old partitions, or the new index with its new ones (plus unreferenced
+files the next write of those dates removes); an index never points at
+offsets in a file it didn't describe.
+
+Usage:
+    store = OptionQuoteStore("data/options")
+    store.Import("BAC", "data/bac_option_quotes.csv")
+    history = store.History("BAC", datetime(2021, 1, 1), datetime(2021, 1, 10), days=(20, 50))
+    history.GetStrikes()            # from the index only
+    history.GetExpiryDates()
+    for date, expiry, quotes in history:
+        quotes["bid"]               # float64 view of the selected rows
+
+Command line:
+    python OptionQuoteStore.py import data/options BAC data/bac_option_quotes.csv
+    python OptionQuoteStore.py list data/options
+"""
+
+import csv
+import os
+from datetime import date, datetime
+
+import numpy as np
+
+DEFAULT_ROOT = os.path.join("data", "options")
+INDEX_FILE = "index.npy"
+
+CALL = 0
+PUT = 1
+
+QUOTE_FIELDS = np.dtype([("time", "<i8"), ("strike", "<f8"), ("right", "i1"), ("bid", "<f8"),
+                         ("ask", "<f8"), ("volume", "<f8"), ("openInterest", "<f8")])
+INDEX_FIELDS = np.dtype([("date", "<i4"), ("expiry", "<i4"), ("strike", "<f8"), ("right", "i1"),
+                         ("generation", "<i4"), ("offset", "<i8"), ("count", "<i8")])
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+_SECONDS_PER_DAY = 86400
+
+
+def _Ordinal(value):
+    # date / datetime / datetime64 -> date ordinal
+    if isinstance(value, np.datetime64):
+        value = value.astype("datetime64[D]").astype(date)
+    return value.toordinal()
+
+
+def _Date(ordinal):
+    return datetime.fromordinal(int(ordinal))
+
+
+def _Right(value):
+    # 0 / 1, "call" / "put", "C" / "P" -> CALL / PUT
+    if isinstance(value, str):
+        return CALL if value.strip()[:1].upper() == "C" else PUT
+    return int(value)
+
+
+def _Save(path, array):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    staging = f"{path}.tmp-{os.getpid()}.npy"
+    np.save(staging, array)
+    os.replace(staging, path)
+
+
+def StrikeWindow(strikes, low, high, minStrike, maxStrike):
+    """(first, last) strike of the union of LEAN's SetFilter(minStrike,
+    maxStrike, ...) windows while the underlying traded between low and high:
+    from minStrike strikes off the strike nearest low to maxStrike strikes
+    off the one nearest high, among the listed strikes. Pass it as
+    History(strikes=...) to select what the filtered chain would have held."""
+    strikes = np.unique(np.asarray(strikes, dtype=np.float64))
+    if strikes.size == 0:
+        return None
+    first = int(np.argmin(np.abs(strikes - low))) + minStrike
+    last = int(np.argmin(np.abs(strikes - high))) + maxStrike
+    return float(strikes[max(first, 0)]), float(strikes[min(last, strikes.size - 1)])
+
+
+class OptionQuoteHistory:
+    # Index entries selected by a query; quotes are read partition by partition on demand
+
+    def __init__(self, store, underlying, entries):
+        self.store = store
+        self.underlying = underlying
+        self.entries = entries      # INDEX_FIELDS rows, sorted by (date, expiry, strike, right)
+
+    def __len__(self):
+        # Quote rows selected, from the index
+        return int(self.entries["count"].sum())
+
+    def GetStrikes(self):
+        return np.unique(self.entries["strike"]).tolist()
+
+    def GetExpiryDates(self):
+        return [_Date(ordinal) for ordinal in np.unique(self.entries["expiry"]).tolist()]
+
+    def GetDates(self):
+        return [_Date(ordinal) for ordinal in np.unique(self.entries["date"]).tolist()]
+
+    def Partitions(self):
+        """(date, expiry, quotes) per partition with selected rows, in date
+        and expiry order; quotes is a QUOTE_FIELDS view when the rows are
+        contiguous in the file, a copy of just those rows otherwise."""
+        entries = self.entries
+        if entries.size == 0:
+            return
+        keys = entries["date"].astype(np.int64) << 32 | entries["expiry"].astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        stops = np.r_[starts[1:], entries.size]
+        for first, last in zip(starts.tolist(), stops.tolist()):
+            group = entries[first:last]
+            day, expiry = int(group["date"][0]), int(group["expiry"][0])
+            quotes = self.store.Partition(self.underlying, day, expiry, int(group["generation"][0]))
+            offsets, counts = group["offset"], group["count"]
+
+            # Runs of entries that follow each other in the file become one slice
+            breaks = np.flatnonzero(offsets[1:] != offsets[:-1] + counts[:-1]) + 1
+            runStarts = np.r_[0, breaks]
+            runStops = np.r_[breaks, offsets.size]
+            slices = [quotes[offsets[a]:offsets[b - 1] + counts[b - 1]]
+                      for a, b in zip(runStarts.tolist(), runStops.tolist())]
+            yield _Date(day), _Date(expiry), slices[0] if len(slices) == 1 else np.concatenate(slices)
+
+    def __iter__(self):
+        return self.Partitions()
+
+    def Frames(self):
+        # One pandas DataFrame per partition, built as it is reached
+        import pandas as pd
+        for day, expiry, quotes in self.Partitions():
+            frame = pd.DataFrame({name: quotes[name] for name in QUOTE_FIELDS.names})
+            frame.insert(0, "expiry", expiry)
+            frame.insert(0, "date", day)
+            frame["time"] = pd.to_datetime(frame["time"], unit="s")
+            yield frame
+
+    def GetAllData(self):
+        # Every selected quote in one DataFrame; only the partitions the query kept are read
+        import pandas as pd
+        frames = list(self.Frames())
+        if not frames:
+            return pd.DataFrame(columns=["date", "expiry"] + list(QUOTE_FIELDS.names))
+        return pd.concat(frames, ignore_index=True)
+
+
+class OptionQuoteStore:
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        self.indexes = {}       # underlying -> index array (memory-mapped)
+        self.partitions = {}    # partition path -> quotes (memory-mapped)
+
+    def Path(self, underlying, day=None, expiry=None, generation=0):
+        path = os.path.join(self.root, underlying.upper())
+        if day is not None:
+            path = os.path.join(path, f"{_Date(day):%Y%m%d}")
+            if expiry is not None:
+                # Generation 0 is the unversioned name of stores written before generations
+                suffix = f".{generation}" if generation else ""
+                path = os.path.join(path, f"{_Date(expiry):%Y%m%d}{suffix}.npy")
+        return path
+
+    def Contains(self, underlying):
+        return os.path.isfile(os.path.join(self.Path(underlying), INDEX_FILE))
+
+    def Underlyings(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if self.Contains(name))
+
+    def Index(self, underlying):
+        underlying = underlying.upper()
+        if underlying not in self.indexes:
+            path = os.path.join(self.Path(underlying), INDEX_FILE)
+            if os.path.isfile(path):
+                index = np.load(path, mmap_mode="r")
+                if "generation" not in index.dtype.names:
+                    # Written before generations: every partition is generation 0
+                    upgraded = np.zeros(index.size, dtype=INDEX_FIELDS)
+                    for name in index.dtype.names:
+                        upgraded[name] = index[name]
+                    index = upgraded
+                self.indexes[underlying] = index
+            else:
+                self.indexes[underlying] = np.zeros(0, dtype=INDEX_FIELDS)
+        return self.indexes[underlying]
+
+    def Partition(self, underlying, day, expiry, generation=0):
+        path = self.Path(underlying, day, expiry, generation)
+        if path not in self.partitions:
+            self.partitions[path] = np.load(path, mmap_mode="r")
+        return self.partitions[path]
+
+    # ---- writing ----
+    def Write(self, underlying, quotes):
+        """Add quotes given as a column dict: time (datetime64 or epoch
+        seconds), expiry (dates), strike, right (CALL / PUT or "call" /
+        "put"), bid, ask and optionally volume and openInterest. Every quote
+        date in `quotes` replaces what the store held for that date."""
+        underlying = underlying.upper()
+        times = np.asarray(quotes["time"])
+        if times.dtype.kind == "M":
+            times = times.astype("datetime64[s]").astype(np.int64)
+        times = times.astype(np.int64)
+        expiries = np.array([_Ordinal(e) for e in quotes["expiry"]], dtype=np.int64)
+        rights = np.array([_Right(r) for r in quotes["right"]], dtype=np.int8)
+
+        rows = np.zeros(times.size, dtype=QUOTE_FIELDS)
+        rows["time"] = times
+        rows["strike"] = quotes["strike"]
+        rows["right"] = rights
+        rows["bid"] = quotes["bid"]
+        rows["ask"] = quotes["ask"]
+        for name in ("volume", "openInterest"):
+            if name in quotes:
+                rows[name] = quotes[name]
+        days = times // _SECONDS_PER_DAY + _EPOCH_ORDINAL
+
+        # Partition order: date, expiry, then strike, right, time inside a partition
+        order = np.lexsort((rows["time"], rows["right"], rows["strike"], expiries, days))
+        rows, expiries, days = rows[order], expiries[order], days[order]
+
+        index = np.array(self.Index(underlying))
+        generation = int(index["generation"].max()) + 1 if index.size else 1
+
+        entries = []
+        keys = days << 32 | expiries
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if keys.size else np.zeros(0, np.int64)
+        stops = np.r_[starts[1:], keys.size]
+        for first, last in zip(starts.tolist(), stops.tolist()):
+            day, expiry = int(days[first]), int(expiries[first])
+            partition = rows[first:last]
+            _Save(self.Path(underlying, day, expiry, generation), partition)
+
+            contract = partition["strike"], partition["right"]
+            heads = np.flatnonzero(np.r_[True, (contract[0][1:] != contract[0][:-1]) |
+                                               (contract[1][1:] != contract[1][:-1])])
+            entry = np.zeros(heads.size, dtype=INDEX_FIELDS)
+            entry["date"] = day
+            entry["expiry"] = expiry
+            entry["strike"] = partition["strike"][heads]
+            entry["right"] = partition["right"][heads]
+            entry["generation"] = generation
+            entry["offset"] = heads
+            entry["count"] = np.diff(np.r_[heads, partition.size])
+            entries.append(entry)
+
+        rewritten = np.unique(days)
+        index = index[~np.isin(index["date"], rewritten)]
+        index = np.concatenate([index] + entries) if entries else index
+        index = index[np.lexsort((index["right"], index["strike"], index["expiry"], index["date"]))]
+        # The new partitions are all in place; switching the index publishes them
+        _Save(os.path.join(self.Path(underlying), INDEX_FILE), index)
+        self.indexes.pop(underlying, None)
+        self._RemoveUnreferenced(underlying, rewritten.tolist(), index)
+        return len(rows)
+
+    def _RemoveUnreferenced(self, underlying, days, index):
+        # Delete the files in these dates' directories that the index doesn't
+        # refer to: superseded generations, and leftovers of an interrupted write
+        kept = {self.Path(underlying, *key) for key in
+                zip(index["date"].tolist(), index["expiry"].tolist(), index["generation"].tolist())}
+        for day in days:
+            directory = self.Path(underlying, day)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if path not in kept:
+                    self.partitions.pop(path, None)
+                    os.remove(path)
+
+    def Import(self, underlying, source):
+        """CSV with a header of time, expiry, strike, right, bid, ask and
+        optionally volume, open_interest (time "YYYY-MM-DD HH:MM:SS", expiry
+        "YYYY-MM-DD", right call / put)."""
+        columns = {name: [] for name in ("time", "expiry", "strike", "right", "bid", "ask", "volume", "openInterest")}
+        with open(source, newline="") as f:
+            for row in csv.DictReader(f):
+                columns["time"].append(np.datetime64(row["time"].replace(" ", "T"), "s"))
+                columns["expiry"].append(np.datetime64(row["expiry"][:10], "D"))
+                columns["strike"].append(float(row["strike"]))
+                columns["right"].append(row["right"])
+                columns["bid"].append(float(row["bid"]))
+                columns["ask"].append(float(row["ask"]))
+                columns["volume"].append(float(row.get("volume") or 0))
+                columns["openInterest"].append(float(row.get("open_interest") or 0))
+        columns["time"] = np.array(columns["time"], dtype="datetime64[s]")
+        return self.Write(underlying, columns)
+
+    # ---- reading ----
+    def History(self, underlying, start=None, end=None, strikes=None, days=None, rights=None):
+        """Quotes of underlying for quote dates start <= date < end, pushed
+        down to the index: strikes=(low, high) and days=(min, max) days to
+        expiry are inclusive ranges, rights a collection of CALL / PUT."""
+        index = self.Index(underlying)
+        mask = np.ones(index.size, dtype=bool)
+        if start is not None:
+            mask &= index["date"] >= _Ordinal(start)
+        if end is not None:
+            # A quote date is in range if its midnight is before end
+            last = _Ordinal(end) - (0 if isinstance(end, datetime) and end.time() != datetime.min.time() else 1)
+            mask &= index["date"] <= last
+        if strikes is not None:
+            low, high = strikes
+            mask &= (index["strike"] >= low) & (index["strike"] <= high)
+        if days is not None:
+            low, high = days
+            remaining = index["expiry"] - index["date"]
+            mask &= (remaining >= low) & (remaining <= high)
+        if rights is not None:
+            mask &= np.isin(index["right"], [_Right(r) for r in rights])
+        return OptionQuoteHistory(self, underlying.upper(), np.array(index[mask]))
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Columnar option quote store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importing = commands.add_parser("import", help="add a CSV of option quotes to the store")
+    importing.add_argument("root")
+    importing.add_argument("underlying")
+    importing.add_argument("source")
+    listing = commands.add_parser("list", help="show the underlyings in the store")
+    listing.add_argument("root")
+    arguments = parser.parse_args()
+
+    store = OptionQuoteStore(arguments.root)
+    if arguments.command == "import":
+        print(f"{store.Import(arguments.underlying, arguments.source)} quotes")
+    else:
+        for underlying in store.Underlyings():
+            history = store.History(underlying)
+            dates = history.GetDates()
+            print(f"{underlying:<10} {len(history):>12} quotes  {len(history.GetExpiryDates()):>5} expiries  "
+                  f"{dates[0]:%Y-%m-%d} .. {dates[-1]:%Y-%m-%d}")
@@ -0,0 +1,250 @@
+# region imports
+from AlgorithmImports import *
+import bisect
+import numpy as np
+# endregion
+
+"""
+Option contract selection without sorting whole chains.
+
+OptionChainIndex: contracts bucketed by (expiry, right), strikes sorted.
+
+Each bucket keeps its strikes in a sorted list with the contract Symbols
+alongside, and the index keeps the distinct expiries sorted, so "furthest
+expiry" is the last expiry and "nearest strike to the price" is one bisect
+instead of sorting the whole chain.
+
+The index holds Symbols, not quotes. Sync(chain) brings it in line with a
+chain's contract set, inserting and removing only the contracts the option
+filter added or dropped since the previous chain (nothing when the set is
+unchanged), and the lookups return the chain's current OptionContract for
+the Symbol they pick.
+
+ContractTable: an OptionChainProvider contract list decoded once into a
+structured array of (expiry ordinal, strike, right), so a filter is a few
+array comparisons and picking the best contract is an argmin.
+DailyContractLists caches one table per underlying and trading day, so the
+provider is asked for a list at most once a day.
+
+Usage:
+    self.index = OptionChainIndex()
+    ...
+    for kvp in data.OptionChains:
+        chain = kvp.Value
+        self.index.Sync(chain)
+        contract = self.index.NearestStrike(chain, self.index.LastExpiry, OptionRight.Call,
+                                            chain.Underlying.Price)
+
+    self.contractLists = DailyContractLists(self)
+    ...
+    table = self.contractLists.Get(self.symbol, data.Time)
+    put = table.OutOfTheMoneyPut(data.Time, price, 0.01, 25, 8)
+"""
+
+
+class _Bucket:
+    __slots__ = ("strikes", "symbols")
+
+    def __init__(self):
+        self.strikes = []   # ascending
+        self.symbols = []   # contract Symbol of each strike
+
+    def Add(self, strike, symbol):
+        i = bisect.bisect_right(self.strikes, strike)
+        self.strikes.insert(i, strike)
+        self.symbols.insert(i, symbol)
+
+    def Remove(self, strike, symbol):
+        i = bisect.bisect_left(self.strikes, strike)
+        while self.symbols[i] != symbol:
+            i += 1
+        del self.strikes[i]
+        del self.symbols[i]
+
+    def Nearest(self, price):
+        # Symbol with the strike closest to price; a tie goes to the lower strike
+        strikes = self.strikes
+        if not strikes:
+            return None
+        i = bisect.bisect_left(strikes, price)
+        if i == len(strikes) or (i > 0 and price - strikes[i - 1] <= strikes[i] - price):
+            i -= 1
+        return self.symbols[i]
+
+
+class OptionChainIndex:
+
+    def __init__(self):
+        self.members = set()    # contract Symbols in the index
+        self.buckets = {}       # (expiry, right) -> _Bucket
+        self.expiries = []      # distinct expiries, ascending
+        self.perExpiry = {}     # expiry -> number of contracts
+        self.listed = None      # contract Symbols of the last synced chain, in chain order
+
+    def __len__(self):
+        return len(self.members)
+
+    def __contains__(self, symbol):
+        return symbol in self.members
+
+    def Add(self, symbol):
+        if symbol in self.members:
+            return
+        self.listed = None
+        identifier = symbol.ID
+        expiry = identifier.Date
+        key = (expiry, identifier.OptionRight)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = _Bucket()
+        bucket.Add(identifier.StrikePrice, symbol)
+        if expiry not in self.perExpiry:
+            bisect.insort(self.expiries, expiry)
+            self.perExpiry[expiry] = 0
+        self.perExpiry[expiry] += 1
+        self.members.add(symbol)
+
+    def Remove(self, symbol):
+        if symbol not in self.members:
+            return
+        self.listed = None
+        identifier = symbol.ID
+        expiry = identifier.Date
+        key = (expiry, identifier.OptionRight)
+        bucket = self.buckets[key]
+        bucket.Remove(identifier.StrikePrice, symbol)
+        if not bucket.strikes:
+            del self.buckets[key]
+        self.perExpiry[expiry] -= 1
+        if not self.perExpiry[expiry]:
+            del self.perExpiry[expiry]
+            self.expiries.remove(expiry)
+        self.members.discard(symbol)
+
+    def Sync(self, chain):
+        # Match the index to the chain's contracts; returns (added, removed) Symbols
+        keys = list(chain.Contracts.Keys)
+        if keys == self.listed:
+            # Same contracts in the same order as last time: no hashing at all
+            return [], []
+        current = set(keys)
+        added = [symbol for symbol in current if symbol not in self.members]
+        removed = [symbol for symbol in self.members if symbol not in current]
+        for symbol in removed:
+            self.Remove(symbol)
+        for symbol in added:
+            self.Add(symbol)
+        self.listed = keys
+        return added, removed
+
+    def Clear(self):
+        self.listed = None
+        self.members.clear()
+        self.buckets.clear()
+        self.expiries.clear()
+        self.perExpiry.clear()
+
+    @property
+    def FirstExpiry(self):
+        return self.expiries[0] if self.expiries else None
+
+    @property
+    def LastExpiry(self):
+        return self.expiries[-1] if self.expiries else None
+
+    def Strikes(self, expiry, right):
+        # Sorted strikes listed for (expiry, right); a view, don't modify it
+        bucket = self.buckets.get((expiry, right))
+        return bucket.strikes if bucket is not None else []
+
+    def NearestStrike(self, chain, expiry, right, price):
+        # The chain's contract at (expiry, right) with the strike closest to price, or None
+        bucket = self.buckets.get((expiry, right))
+        if bucket is None:
+            return None
+        symbol = bucket.Nearest(price)
+        return None if symbol is None else chain.Contracts[symbol]
+
+
+# ---------------------------------------------------------------------
+# Provider contract lists
+# ---------------------------------------------------------------------
+CONTRACT_FIELDS = np.dtype([("expiry", "<i4"), ("strike", "<f8"), ("right", "i1")])
+
+
+def _FirstWholeDay(time):
+    # Ordinal d such that (midnight expiry - time).days == expiry ordinal - d
+    if time.hour or time.minute or time.second or time.microsecond:
+        return time.toordinal() + 1
+    return time.toordinal()
+
+
+class ContractTable:
+
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        self.fields = np.empty(len(self.symbols), dtype=CONTRACT_FIELDS)
+        identifiers = [symbol.ID for symbol in self.symbols]
+        self.fields["expiry"] = [identifier.Date.toordinal() for identifier in identifiers]
+        self.fields["strike"] = [identifier.StrikePrice for identifier in identifiers]
+        self.fields["right"] = [int(identifier.OptionRight) for identifier in identifiers]
+        self.expiry = self.fields["expiry"]
+        self.strike = self.fields["strike"]
+        self.right = self.fields["right"]
+        self.puts = np.flatnonzero(self.right == int(OptionRight.Put))
+        self.window = None      # (key, put positions, their days to expiry) of the last expiry window
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def OutOfTheMoneyPut(self, time, price, otm, dte, tolerance):
+        """The put whose strike is more than otm * price below price, nearest to
+        it, expiring within tolerance days of dte (exclusive); None if there is none.
+
+        Equal strikes go to the expiry closest to dte, then to the earlier
+        contract in the provider's list, as a stable sort by expiry distance
+        and then by strike distance would order them.
+        """
+        candidates, days = self._Puts(time, dte, tolerance)
+        gap = price - self.strike[candidates]
+        outside = np.flatnonzero(gap > otm * price)
+        if outside.size == 0:
+            return None
+        gap = gap[outside]
+        nearest = outside[gap == gap.min()]
+        best = nearest[np.argmin(np.abs(days[nearest] - dte))]
+        return self.symbols[candidates[best]]
+
+    def _Puts(self, time, dte, tolerance):
+        # Puts with dte - tolerance < days to expiry < dte + tolerance, and their
+        # days to expiry; the same all day, so only worked out when the day changes
+        key = (_FirstWholeDay(time), dte, tolerance)
+        if self.window is None or self.window[0] != key:
+            days = self.expiry[self.puts] - key[0]
+            inside = (days > dte - tolerance) & (days < dte + tolerance)
+            self.window = (key, self.puts[inside], days[inside])
+        return self.window[1], self.window[2]
+
+
+class DailyContractLists:
+    # OptionChainProvider lists as ContractTables, fetched once per underlying and day
+
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        self.day = None
+        self.tables = {}        # underlying Symbol -> ContractTable for self.day
+        self.requests = 0       # provider calls so far
+
+    def Get(self, symbol, time):
+        day = time.date()
+        if day != self.day:
+            self.day = day
+            self.tables.clear()
+        table = self.tables.get(symbol)
+        if table is None:
+            self.requests += 1
+            table = ContractTable(self.algorithm.OptionChainProvider.GetOptionContractList(symbol, time))
+            # An empty list (e.g. no underlying price yet) is asked for again next time
+            if len(table):
+                self.tables[symbol] = table
+        return table
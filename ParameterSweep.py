@@ -0,0 +1,330 @@
+"""
+Local parameter sweep runner for GetParameter-driven algorithms
+
+Runs one objective per parameter set on a process pool:
+    - parameter sets come from a grid, a random sample or a Latin hypercube
+    - the price dataset is written once as .npy files and every worker opens
+      it read-only with mmap, so it is shared through the page cache
+      instead of being pickled into each task
+    - each finished run is appended to a CSV results table and flushed
+      right away, in completion order
+    - a run is keyed by a hash of its parameters; rerunning over an existing
+      table skips the keys already there, so an interrupted sweep resumes
+    - stopWhen(row) or Ctrl+C cancels the queued runs, stops the ones in
+      progress and keeps the rows written so far
+    - a run whose objective raises is written as a row with an "error"
+      column instead of ending the sweep, and is tried again on resume;
+      Results() keeps the last row per run key
+
+An objective is a picklable callable objective(parameters, dataset) -> dict.
+`parameters` maps names to strings (the way LEAN passes them to GetParameter),
+and `dataset` maps array names to read-only memmaps.
+
+Usage:
+    SaveDataset("sweep/data", time=times, spy=spyClose, bnd=bndClose)
+    runner = SweepRunner(SmaTrendObjective, "sweep/data", "sweep/results.csv")
+    runner.Run(GridSample({"sma_length": range(5, 400)}))
+
+To sweep the algorithm file itself on the local LEAN stand-in:
+    SaveBarDataset("sweep/bars", {"SPY": LoadBars("spy.csv"), "BND": LoadBars("bnd.csv")})
+    runner = SweepRunner(AlgorithmObjective("7_Backtesting.py"), "sweep/bars", "sweep/algo.csv")
+"""
+
+import csv
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import random
+
+import numpy as np
+
+import VectorizedBacktest
+
+
+# ---------------------------------------------------------------------
+# Parameter sampling
+# ---------------------------------------------------------------------
+def GridSample(space):
+    # Every combination of {name: [values]}
+    names = list(space)
+    for values in itertools.product(*(list(space[name]) for name in names)):
+        yield dict(zip(names, values))
+
+
+def RandomSample(space, count, seed=None):
+    # {name: (low, high)} draws uniformly (integers if both bounds are ints),
+    # {name: [values]} picks one of the listed values
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield {name: _Draw(bounds, rng.random(), rng) for name, bounds in space.items()}
+
+
+def LatinHypercubeSample(space, count, seed=None):
+    # One draw per equal-probability stratum in every dimension, with the
+    # strata shuffled independently per dimension
+    rng = random.Random(seed)
+    columns = {}
+    for name, bounds in space.items():
+        strata = [(k + rng.random()) / count for k in range(count)]
+        rng.shuffle(strata)
+        columns[name] = [_Draw(bounds, u, rng) for u in strata]
+    for k in range(count):
+        yield {name: columns[name][k] for name in space}
+
+
+def _Draw(bounds, u, rng):
+    if isinstance(bounds, tuple):
+        low, high = bounds
+        if isinstance(low, int) and isinstance(high, int):
+            return min(low + int(u * (high - low + 1)), high)
+        return low + u * (high - low)
+    values = list(bounds)
+    return values[min(int(u * len(values)), len(values) - 1)]
+
+
+def RunKey(parameters):
+    # Stable identifier of a parameter set, used to resume sweeps
+    text = json.dumps({k: str(v) for k, v in parameters.items()}, sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+# ---------------------------------------------------------------------
+# Shared read-only dataset
+# ---------------------------------------------------------------------
+def SaveDataset(path, **arrays):
+    os.makedirs(path, exist_ok=True)
+    for name, values in arrays.items():
+        np.save(os.path.join(path, name + ".npy"), np.ascontiguousarray(values))
+
+
+def SaveBarDataset(path, bars):
+    # {ticker: {"time": ..., "open": ..., ...}} saved as "TICKER.column" arrays
+    SaveDataset(path, **{f"{ticker}.{name}": values
+                         for ticker, columns in bars.items() for name, values in columns.items()})
+
+
+def OpenDataset(path):
+    return {
+        name[:-4]: np.load(os.path.join(path, name), mmap_mode="r")
+        for name in sorted(os.listdir(path)) if name.endswith(".npy")
+    }
+
+
+_dataset = None
+
+
+def _InitWorker(path):
+    # Runs once per worker process: map the dataset, don't copy it
+    global _dataset
+    _dataset = OpenDataset(path)
+
+
+def _RunOne(objective, parameters):
+    return objective({k: str(v) for k, v in parameters.items()}, _dataset)
+
+
+# ---------------------------------------------------------------------
+# Stub algorithm
+# ---------------------------------------------------------------------
+class StubAlgorithm:
+    # Just enough of QCAlgorithm for objectives that read their inputs the
+    # way the algorithms do (GetParameter returns a string or None)
+
+    def __init__(self, parameters):
+        self.parameters = parameters
+
+    def GetParameter(self, name):
+        return self.parameters.get(name)
+
+
+def SmaTrendObjective(parameters, dataset):
+    # 7_Backtesting.py through the vectorized engine
+    algorithm = StubAlgorithm(parameters)
+    length = algorithm.GetParameter("sma_length")
+    length = 30 if length is None else int(length)
+
+    result = VectorizedBacktest.RunBacktest(dataset["time"], dataset["spy"], dataset["bnd"], length)
+    return {
+        "total_return": result.TotalReturn,
+        "max_drawdown": result.MaxDrawdown,
+        "trades": int(result.Trades.size),
+    }
+
+
+class AlgorithmObjective:
+    # Runs an algorithm file through LocalLean with the sweep parameters;
+    # bar columns come from a SaveBarDataset dataset
+
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self, parameters, dataset):
+        import LocalLean
+
+        data = {}
+        for name, values in dataset.items():
+            ticker, _, column = name.rpartition(".")
+            data.setdefault(ticker, {})[column] = values
+
+        result = LocalLean.RunAlgorithm(_LoadedAlgorithm(self.path), data, parameters)
+        portfolio = result.Algorithm.Portfolio
+        cash = result.Algorithm._initialCash
+        return {
+            "final_value": portfolio.TotalPortfolioValue,
+            "total_return": portfolio.TotalPortfolioValue / cash - 1 if cash else 0.0,
+            "orders": result.Algorithm.Transactions.OrdersCount,
+            "replay_s": result.ReplaySeconds,
+        }
+
+
+_algorithms = {}
+
+
+def _LoadedAlgorithm(path):
+    # The algorithm file is executed once per worker process
+    import LocalLean
+    if path not in _algorithms:
+        _algorithms[path] = LocalLean.LoadAlgorithm(path)
+    return _algorithms[path]
+
+
+# ---------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------
+class SweepRunner:
+
+    def __init__(self, objective, datasetPath, resultsPath, workers=None):
+        self.objective = objective
+        self.datasetPath = datasetPath
+        self.resultsPath = resultsPath
+        self.workers = workers or os.cpu_count() or 1
+
+    def CompletedKeys(self):
+        # Keys with a result; a run that raised is tried again on resume
+        if not os.path.exists(self.resultsPath):
+            return set()
+        with open(self.resultsPath, newline="") as f:
+            return {row["run_key"] for row in csv.DictReader(f) if not row.get("error")}
+
+    def Iterate(self, samples, stopWhen=None):
+        # Yields each result row as soon as it has been written to the table
+        done = self.CompletedKeys()
+        pending = ((RunKey(p), p) for p in samples)
+        pending = ((key, p) for key, p in pending if key not in done)
+
+        with _ResultsTable(self.resultsPath) as table:
+            # A multiprocessing pool rather than ProcessPoolExecutor: an early
+            # stop has to terminate() the runs in progress, not wait for them
+            pool = multiprocessing.Pool(self.workers, initializer=_InitWorker, initargs=(self.datasetPath,))
+            finished = queue.Queue()    # (key, parameters, result, error) as runs complete
+            running = 0
+
+            def Submit(key, parameters):
+                pool.apply_async(_RunOne, (self.objective, parameters),
+                                 callback=lambda result: finished.put((key, parameters, result, None)),
+                                 error_callback=lambda error: finished.put((key, parameters, None, error)))
+
+            try:
+                # Keep a bounded number of runs in flight so huge samples aren't queued up front
+                for key, parameters in itertools.islice(pending, 2 * self.workers):
+                    Submit(key, parameters)
+                    running += 1
+
+                while running:
+                    key, parameters, result, error = finished.get()
+                    running -= 1
+                    if error is None:
+                        row = {"run_key": key, **parameters, **result, "error": ""}
+                    else:
+                        # One failing parameter set is a row, not the end of the sweep
+                        row = {"run_key": key, **parameters, "error": f"{type(error).__name__}: {error}"}
+                    table.Write(row)
+                    yield row
+
+                    if stopWhen is not None and stopWhen(row):
+                        return
+
+                    for nextKey, nextParameters in itertools.islice(pending, 1):
+                        Submit(nextKey, nextParameters)
+                        running += 1
+            finally:
+                if running:
+                    # Stopped early (stopWhen, Ctrl+C, an error, or the caller stopped
+                    # iterating): drop the queued runs and stop the ones in progress
+                    pool.terminate()
+                else:
+                    pool.close()
+                pool.join()
+
+    def Run(self, samples, stopWhen=None):
+        # Returns the number of runs completed in this call
+        count = 0
+        try:
+            for _ in self.Iterate(samples, stopWhen):
+                count += 1
+        except KeyboardInterrupt:
+            pass
+        return count
+
+    def Results(self):
+        # One row per run_key: a run retried on resume (after an error row) is
+        # appended again, and the last row written for a key wins
+        rows = {}
+        with open(self.resultsPath, newline="") as f:
+            for row in csv.DictReader(f):
+                rows.pop(row["run_key"], None)
+                rows[row["run_key"]] = row
+        return list(rows.values())
+
+
+class _ResultsTable:
+    # Append-only CSV; the header is taken from the first row ever written and
+    # widened (the file rewritten once) when a later row brings new columns
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.writer = None
+
+    def __enter__(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fields = None
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, newline="") as f:
+                fields = next(csv.reader(f))
+        self.file = open(self.path, "a", newline="")
+        if fields is not None:
+            self.writer = csv.DictWriter(self.file, fields, restval="")
+        return self
+
+    def Write(self, row):
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.file, list(row), restval="")
+            self.writer.writeheader()
+        elif any(name not in self.writer.fieldnames for name in row):
+            self._Widen([name for name in row if name not in self.writer.fieldnames])
+        self.writer.writerow(row)
+        self.file.flush()
+
+    def _Widen(self, names):
+        # e.g. the first row was an error row, without the objective's columns
+        fields = list(self.writer.fieldnames) + names
+        self.file.close()
+        with open(self.path, newline="") as f:
+            rows = list(csv.DictReader(f))
+        staging = f"{self.path}.tmp-{os.getpid()}"
+        with open(staging, "w", newline="") as f:
+            writer = csv.DictWriter(f, fields, restval="")
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(staging, self.path)
+        self.file = open(self.path, "a", newline="")
+        self.writer = csv.DictWriter(self.file, fields, restval="")
+
+    def __exit__(self, *exc):
+        self.file.close()
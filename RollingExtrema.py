@@ -0,0 +1,187 @@
+# region imports
+from AlgorithmImports import *
+import bisect
+from collections import deque
+# endregion
+
+"""
+Rolling highest-high / lowest-low over the last N bars.
+
+Both extremes are kept in monotonic deques of (sample index, value):
+- the max deque holds decreasing highs, its front is the window maximum
+- the min deque holds increasing lows, its front is the window minimum
+Every sample is pushed and popped at most once, so an update is amortized O(1)
+no matter how long the window is.
+
+RollingRank turns the same window into an IV-rank style indicator, e.g. for
+VIX: (value - lowest low) / (highest high - lowest low). With
+percentile=True it is a true percentile rank instead, the share of the
+window's closes below the value, kept in a sorted list (OrderStatistics)
+with a bisect insert and delete per sample, so long lookbacks stay cheap.
+"""
+
+
+class MonotonicExtrema:
+
+    def __init__(self, period):
+        self.period = period
+        self.count = 0           # samples seen so far
+        self.maxima = deque()    # (index, high), highs strictly decreasing
+        self.minima = deque()    # (index, low), lows strictly increasing
+
+    def Add(self, high, low):
+        index = self.count
+
+        # Drop values that can never be the extreme again
+        maxima = self.maxima
+        while maxima and maxima[-1][1] <= high:
+            maxima.pop()
+        maxima.append((index, high))
+
+        minima = self.minima
+        while minima and minima[-1][1] >= low:
+            minima.pop()
+        minima.append((index, low))
+
+        self.count += 1
+
+        # Expire samples that fell out of the window
+        oldest = self.count - self.period
+        if maxima[0][0] < oldest:
+            maxima.popleft()
+        if minima[0][0] < oldest:
+            minima.popleft()
+
+    @property
+    def Maximum(self):
+        return self.maxima[0][1] if self.maxima else 0
+
+    @property
+    def Minimum(self):
+        return self.minima[0][1] if self.minima else 0
+
+    @property
+    def IsFull(self):
+        return self.count >= self.period
+
+
+# Indicator wrapper, fed by RegisterIndicator with TradeBars
+class RollingHighLow(PythonIndicator):
+
+    def __init__(self, name, period):
+        self.Name = name
+        self.Time = datetime.min
+        self.Value = 0
+        self.High = 0
+        self.Low = 0
+        self.window = MonotonicExtrema(period)
+
+    def Update(self, input):
+        self.window.Add(float(input.High), float(input.Low))
+        self.Time = input.EndTime
+
+        self.High = self.window.Maximum
+        self.Low = self.window.Minimum
+        self.Value = self.High
+
+        # Ready once a full window has been seen
+        return self.window.IsFull
+
+    def UpdateMany(self, highs, lows, time=None):
+        # Warm-up from history columns: only the last `period` bars matter
+        period = self.window.period
+        for high, low in zip(list(highs)[-period:], list(lows)[-period:]):
+            self.window.Add(float(high), float(low))
+
+        if time is not None:
+            self.Time = time
+        self.High = self.window.Maximum
+        self.Low = self.window.Minimum
+        self.Value = self.High
+        return self.window.IsFull
+
+    @property
+    def Count(self):
+        # Bars seen so far, UpdateMany warm-up included (the engine's Samples
+        # only counts the bars it fed through Update)
+        return self.window.count
+
+
+class OrderStatistics:
+    # The last `period` values, also kept sorted for rank queries
+
+    def __init__(self, period):
+        self.period = period
+        self.values = deque()    # arrival order
+        self.sorted = []
+
+    def Add(self, value):
+        self.values.append(value)
+        bisect.insort(self.sorted, value)
+        if len(self.values) > self.period:
+            oldest = self.values.popleft()
+            del self.sorted[bisect.bisect_left(self.sorted, oldest)]
+
+    def Below(self, value):
+        # Number of values in the window strictly below value
+        return bisect.bisect_left(self.sorted, value)
+
+    def __len__(self):
+        return len(self.sorted)
+
+    @property
+    def IsFull(self):
+        return len(self.values) >= self.period
+
+
+# Rank of a value in its rolling range, fed by RegisterIndicator with bars
+class RollingRank(PythonIndicator):
+
+    def __init__(self, name, period, percentile=False):
+        self.Name = name
+        self.Time = datetime.min
+        self.Value = 0
+        self.High = 0
+        self.Low = 0
+        self.Last = 0
+        self.percentile = percentile
+        self.window = MonotonicExtrema(period)
+        self.closes = OrderStatistics(period) if percentile else None
+
+    def Update(self, input):
+        # Bars already counted (e.g. by a history warm-up) are skipped
+        if input.EndTime > self.Time:
+            self._Add(float(input.High), float(input.Low), float(input.Close))
+            self.Time = input.EndTime
+            self._Refresh()
+        return self.window.IsFull
+
+    def UpdateMany(self, highs, lows, closes, time=None):
+        # Warm-up from history columns: only the last `period` bars matter
+        period = self.window.period
+        for high, low, close in zip(list(highs)[-period:], list(lows)[-period:], list(closes)[-period:]):
+            self._Add(float(high), float(low), float(close))
+
+        if time is not None:
+            self.Time = time
+        self._Refresh()
+        return self.window.IsFull
+
+    def Rank(self, value):
+        # Rank of value against the current window, 0 when the window is flat or empty
+        if self.percentile:
+            return self.closes.Below(value) / len(self.closes) if len(self.closes) else 0
+        if self.High == self.Low:
+            return 0
+        return (value - self.Low) / (self.High - self.Low)
+
+    def _Add(self, high, low, close):
+        self.window.Add(high, low)
+        if self.closes is not None:
+            self.closes.Add(close)
+        self.Last = close
+
+    def _Refresh(self):
+        self.High = self.window.Maximum
+        self.Low = self.window.Minimum
+        self.Value = self.Rank(self.Last)
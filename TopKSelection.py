@@ -0,0 +1,89 @@
+# region imports
+from AlgorithmImports import *
+import time
+import numpy as np
+# endregion
+
+"""
+Filter-then-partial-sort universe selection.
+
+Coarse/fine selection usually sorts thousands of names only to keep the
+first few hundred. TopK() partitions an array of sort keys around the K-th
+value and sorts just the K winners, in O(n + K log K).
+
+The result is the same list, in the same order, as
+    sorted(filter(where, items), key=key, reverse=descending)[:count]
+including ties: equal keys keep their input order, as in a stable sort.
+
+TopKSelector wraps the filter, the key and the timing of each call, so the
+algorithm can log how long selection took on every rebalance.
+"""
+
+
+def TopK(values, count, descending=True):
+    # Positions of the `count` best values, best first; NaN ranks last
+    keys = np.asarray(values, dtype=np.float64)
+    if descending:
+        keys = -keys
+    if count <= 0:
+        return np.empty(0, dtype=np.int64)
+    if count >= keys.size:
+        return np.argsort(keys, kind="stable")
+
+    # Everything strictly better than the K-th key, then as many of the keys
+    # equal to it as still fit, earliest first
+    threshold = np.partition(keys, count - 1)[count - 1]
+    if np.isnan(threshold):
+        better = np.flatnonzero(~np.isnan(keys))
+        tied = np.flatnonzero(np.isnan(keys))
+    else:
+        better = np.flatnonzero(keys < threshold)
+        tied = np.flatnonzero(keys == threshold)
+    chosen = np.concatenate((better, tied[:count - better.size]))
+    chosen.sort()
+    return chosen[np.argsort(keys[chosen], kind="stable")]
+
+
+class TopKSelector:
+
+    def __init__(self, key, count, where=None, descending=True, name="Selection"):
+        self.key = key
+        self.count = count
+        self.where = where
+        self.descending = descending
+        self.name = name
+
+        # Stats of the last call and running totals
+        self.lastSeconds = 0.0
+        self.lastUniverse = 0
+        self.lastCandidates = 0
+        self.lastSelected = 0
+        self.calls = 0
+        self.totalSeconds = 0.0
+
+    def Select(self, items):
+        start = time.perf_counter()
+
+        items = list(items)
+        where = self.where
+        candidates = items if where is None else [x for x in items if where(x)]
+        key = self.key
+        values = np.fromiter((key(x) for x in candidates), dtype=np.float64, count=len(candidates))
+        selected = [candidates[i] for i in TopK(values, self.count, self.descending)]
+
+        self.lastSeconds = time.perf_counter() - start
+        self.lastUniverse = len(items)
+        self.lastCandidates = len(candidates)
+        self.lastSelected = len(selected)
+        self.calls += 1
+        self.totalSeconds += self.lastSeconds
+        return selected
+
+    @property
+    def AverageSeconds(self):
+        return self.totalSeconds / self.calls if self.calls else 0.0
+
+    def Summary(self):
+        return (f"{self.name}: {self.lastSelected} of {self.lastCandidates} candidates "
+                f"({self.lastUniverse} total) in {self.lastSeconds * 1e3:.2f} ms, "
+                f"avg {self.AverageSeconds * 1e3:.2f} ms over {self.calls} calls")
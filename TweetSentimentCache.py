@@ -0,0 +1,256 @@
+# region imports
+from AlgorithmImports import *
+import bisect
+import hashlib
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+# endregion
+
+"""
+Pre-scored tweet sentiment for the MuskTweet custom data reader.
+
+The tweet CSV is scored once with VADER on a process pool and written next
+to it as <source>.scores:
+
+    magic "QCTW", version, record count, SHA-256 of the source file
+    records  (time int64 epoch seconds, score float32, flags uint8,
+              offset int64, length int32)
+    text     the source lines, UTF-8, at each record's offset/length
+
+There is one record per candidate line (non-empty, starting with a digit),
+in file order. flags marks lines the reader would reject (VALID unset) and
+tweets that mention Tesla (RELEVANT). The cache is reused as long as the
+source hash matches and rebuilt otherwise.
+
+The reader walks the records with a cursor: the line it is handed must
+equal the record's stored line, so a cache can't silently attach scores to
+the wrong tweet. When it doesn't (a line dropped, reordered or re-read), the
+line is looked up by its text instead and the cursor resyncs right after
+it, so one stray line costs one lookup rather than the rest of the file.
+Lines that aren't in the cache at all are counted as misses and scored live
+by the caller; Stats() reports hits, resyncs and misses.
+
+Usage:
+    python TweetSentimentCache.py MuskTweetsPreProcessed.csv [--workers 8]
+"""
+
+MAGIC = b"QCTW"
+VERSION = 1
+CACHE_SUFFIX = ".scores"
+_HEADER = struct.Struct("<4sHHQ32s")
+
+RECORD = np.dtype([("time", "<i8"), ("score", "<f4"), ("flags", "u1"), ("offset", "<i8"), ("length", "<i4")])
+VALID = 1
+RELEVANT = 2
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def ParseTweetTime(text):
+    # Fixed "YYYY-MM-DD HH:MM:SS" by slicing; anything else goes through strptime
+    if len(text) == 19 and text[4] == "-" and text[7] == "-" and text[10] == " " and text[13] == ":" and text[16] == ":":
+        try:
+            return datetime(int(text[0:4]), int(text[5:7]), int(text[8:10]),
+                            int(text[11:13]), int(text[14:16]), int(text[17:19]))
+        except ValueError:
+            pass
+    return datetime.strptime(text, "%Y-%m-%d %H:%M:%S")
+
+
+def IsRelevant(content):
+    lower = content.lower()
+    return "tsla" in lower or "tesla" in lower
+
+
+def IsCandidate(line):
+    # Lines MuskTweet.Reader looks at at all
+    return bool(line.strip()) and line[0].isdigit()
+
+
+def SourceHash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+# ---------------------------------------------------------------------
+# Scoring
+# ---------------------------------------------------------------------
+_analyzer = None
+
+
+def SentimentAnalyzer():
+    global _analyzer
+    if _analyzer is None:
+        from nltk.sentiment import SentimentIntensityAnalyzer
+        _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+
+def _ScoreChunk(texts):
+    analyzer = SentimentAnalyzer()
+    return [analyzer.polarity_scores(text)["compound"] for text in texts]
+
+
+def ScoreTexts(texts, workers=None, chunk=500):
+    # VADER compound score of every text, on `workers` processes (1 = in this process)
+    chunks = [texts[k:k + chunk] for k in range(0, len(texts), chunk)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) <= 1:
+        scores = [score for part in chunks for score in _ScoreChunk(part)]
+    else:
+        with ProcessPoolExecutor(min(workers, len(chunks))) as pool:
+            scores = [score for part in pool.map(_ScoreChunk, chunks) for score in part]
+    return np.array(scores, dtype=np.float32)
+
+
+# ---------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------
+def CachePath(source):
+    return source + CACHE_SUFFIX
+
+
+def BuildTweetCache(source, cache=None, workers=None, force=False):
+    # Returns the cache path; rebuilds only when the source hash changed (or force=True)
+    cache = cache or CachePath(source)
+    digest = SourceHash(source)
+    if not force and _StoredHash(cache) == digest:
+        return cache
+
+    with open(source, encoding="utf-8") as f:
+        lines = [line.rstrip("\r\n") for line in f]
+    lines = [line for line in lines if IsCandidate(line)]
+
+    encoded = [line.encode("utf-8") for line in lines]
+    records = np.zeros(len(lines), dtype=RECORD)
+    records["length"] = [len(data) for data in encoded]
+    records["offset"][1:] = np.cumsum(records["length"][:-1])
+
+    texts, scored = [], []
+    for i, line in enumerate(lines):
+        # Same checks as the reader: a parsable time and a text field
+        fields = line.split(",")
+        try:
+            time = ParseTweetTime(fields[0])
+            content = fields[1]
+        except (ValueError, IndexError):
+            continue
+        records[i]["time"] = int((time - _EPOCH).total_seconds())
+        records[i]["flags"] = VALID | (RELEVANT if IsRelevant(content) else 0)
+        texts.append(content)
+        scored.append(i)
+
+    records["score"][scored] = ScoreTexts(texts, workers)
+
+    staging = f"{cache}.tmp-{os.getpid()}"
+    with open(staging, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, 0, len(records), digest))
+        f.write(records.tobytes())
+        f.write(b"".join(encoded))
+    os.replace(staging, cache)
+    return cache
+
+
+def _StoredHash(cache):
+    try:
+        with open(cache, "rb") as f:
+            magic, version, _, _, digest = _HEADER.unpack(f.read(_HEADER.size))
+    except (OSError, struct.error):
+        return None
+    return digest if magic == MAGIC and version == VERSION else None
+
+
+# ---------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------
+class TweetScores:
+
+    def __init__(self, path):
+        buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, version, _, count, self.digest = _HEADER.unpack(buffer[:_HEADER.size].tobytes())
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a tweet score cache")
+        end = _HEADER.size + count * RECORD.itemsize
+        self.records = np.frombuffer(buffer, dtype=RECORD, count=count, offset=_HEADER.size)
+        self.text = memoryview(buffer)[end:]
+
+        # Plain lists: the reader touches one record per call
+        self.times = self.records["time"].tolist()
+        self.scores = self.records["score"].tolist()
+        self.flags = self.records["flags"].tolist()
+        self.offsets = self.records["offset"].tolist()
+        self.lengths = self.records["length"].tolist()
+        self.cursor = 0
+        self.positions = None   # line bytes -> record positions, built on the first mismatch
+        self.hits = 0
+        self.resyncs = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.times)
+
+    def Span(self, i):
+        start = self.offsets[i]
+        return self.text[start:start + self.lengths[i]]
+
+    def Line(self, i):
+        return bytes(self.Span(i)).decode("utf-8")
+
+    def Stats(self):
+        # hits includes resyncs; a high resync or miss count means the streamed file drifted from the cache
+        return {"records": len(self.times), "hits": self.hits, "resyncs": self.resyncs, "misses": self.misses}
+
+    def Find(self, data):
+        # Position of the record holding these line bytes: the first one at or
+        # after the cursor, else the first one in the file; None if there is none
+        if self.positions is None:
+            self.positions = {}
+            for i in range(len(self.times)):
+                self.positions.setdefault(bytes(self.Span(i)), []).append(i)
+        positions = self.positions.get(data)
+        if not positions:
+            return None
+        k = bisect.bisect_left(positions, self.cursor)
+        return positions[k] if k < len(positions) else positions[0]
+
+    def Next(self, line):
+        """(time, score, relevant, valid) of the record for this line, None if
+        the line isn't in the cache.
+
+        score is the VADER compound (4 decimals), time the tweet's own time.
+        """
+        i = self.cursor
+        data = line.rstrip("\r\n").encode("utf-8")
+        if i >= len(self.times) or self.Span(i) != data:
+            i = self.Find(data)
+            if i is None:
+                self.misses += 1
+                return None
+            self.resyncs += 1
+        self.cursor = i + 1
+        self.hits += 1
+        flags = self.flags[i]
+        return (_EPOCH + timedelta(seconds=self.times[i]), round(self.scores[i], 4),
+                bool(flags & RELEVANT), bool(flags & VALID))
+
+
+def LoadTweetScores(source, cache=None, workers=None):
+    # Build (or reuse) the cache of a local tweet CSV and open it
+    return TweetScores(BuildTweetCache(source, cache, workers))
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Score a MuskTweet CSV once into a binary cache")
+    parser.add_argument("source")
+    parser.add_argument("--cache", help=f"cache path (default <source>{CACHE_SUFFIX})")
+    parser.add_argument("--workers", type=int, help="scoring processes (default: all cores)")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the source is unchanged")
+    arguments = parser.parse_args()
+    path = BuildTweetCache(arguments.source, arguments.cache, arguments.workers, arguments.force)
+    print(f"{path}: {len(TweetScores(path))} tweets")
@@ -0,0 +1,241 @@
+"""
+Offline NumPy replay of the SPY/BND SMA trend strategy (7_Backtesting.py)
+
+Same rules as CrawlingYellowGreenJackal:
+    - SPY close >= SMA(close)  -> uptrend   -> 80% SPY / 20% BND
+    - SPY close <  SMA(close)  -> downtrend -> 20% SPY / 80% BND
+    - rebalance when the trend flips, or when the 30-day lock has expired
+    - no trading until the SMA is ready and both SPY and BND have a bar
+
+The signal and the equity curve are computed on whole arrays. The lock-out
+state machine only visits the bars where a rebalance happens: from each
+rebalance it jumps straight to the next trend flip or the first bar past
+the lock, whichever comes first.
+
+Orders fill at the close of the bar that triggered them (the event loop
+sees that close in OnData). Quantities are fractional unless
+wholeShares=True, and fees are a flat rate on traded notional.
+
+Usage:
+    spy = LoadBars("data/spy_daily.csv")
+    bnd = LoadBars("data/bnd_daily.csv")
+    times, spyClose, bndClose = AlignCloses(spy, bnd)
+    result = RunBacktest(times, spyClose, bndClose, smaLength=30)
+    sweep = RunSweep(times, spyClose, bndClose, range(5, 250))
+"""
+
+import csv
+import numpy as np
+
+SECONDS_PER_DAY = 86400
+
+UPTREND_WEIGHTS = (0.8, 0.2)     # (SPY, BND)
+DOWNTREND_WEIGHTS = (0.2, 0.8)
+
+BAR_COLUMNS = ("open", "high", "low", "close", "volume")
+
+# Relative slack for close >= SMA: the event loop compares exact decimals, so a
+# close equal to its SMA must not flip to "below" through float rounding here.
+# Cent-quantized prices can't differ from the SMA by less than this otherwise.
+TIE_TOLERANCE = 1e-9
+
+
+# ---------------------------------------------------------------------
+# Data loading
+# ---------------------------------------------------------------------
+def LoadBars(path):
+    # Read local OHLCV bars into {"time": int64 epoch seconds, "open": float64, ...}
+    # CSV needs a header with time/open/high/low/close/volume (time in ISO format)
+    # Parquet needs pandas with a parquet engine
+    if path.endswith(".parquet"):
+        import pandas as pd
+        frame = pd.read_parquet(path)
+        if "time" not in frame.columns:
+            frame = frame.reset_index()
+        frame.columns = [str(c).lower() for c in frame.columns]
+        times = frame["time"].values.astype("datetime64[s]")
+        columns = {name: frame[name].to_numpy(dtype=np.float64) for name in BAR_COLUMNS}
+    else:
+        with open(path, newline="") as f:
+            reader = csv.reader(f)
+            header = [h.strip().lower() for h in next(reader)]
+            rows = [row for row in reader if row]
+        position = {name: header.index(name) for name in ("time",) + BAR_COLUMNS}
+        times = np.array([row[position["time"]].strip() for row in rows], dtype="datetime64[s]")
+        columns = {
+            name: np.array([row[position[name]] for row in rows], dtype=np.float64)
+            for name in BAR_COLUMNS
+        }
+
+    columns["time"] = times.astype(np.int64)
+    return columns
+
+
+def AlignCloses(first, second):
+    # Keep only the timestamps both symbols traded (the event loop waits for both)
+    common, i, j = np.intersect1d(first["time"], second["time"], assume_unique=True, return_indices=True)
+    return common, first["close"][i], second["close"][j]
+
+
+# ---------------------------------------------------------------------
+# Signal
+# ---------------------------------------------------------------------
+def SimpleMovingAverage(close, length, cumulative=None):
+    # SMA from a cumulative sum; NaN until `length` samples are available.
+    # Prices are summed relative to the first close to keep rounding small.
+    close = np.asarray(close, dtype=np.float64)
+    sma = np.full(close.shape, np.nan)
+    if length > close.size:
+        return sma
+    if cumulative is None:
+        cumulative = Cumulative(close)
+    sma[length - 1:] = (cumulative[length:] - cumulative[:-length]) / length + close[0]
+    return sma
+
+
+def Cumulative(close):
+    # Zero-prefixed running sum of (close - close[0]), shared across SMA lengths
+    out = np.zeros(close.size + 1)
+    np.cumsum(close - close[0], out=out[1:])
+    return out
+
+
+def RebalanceEvents(times, above, lockDays=30):
+    # Bars where the event loop rebalances, and the trend it rebalances into.
+    # `above` is close >= SMA for bars where the SMA is ready (callers slice off warm-up).
+    n = above.size
+    if n == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=bool)
+
+    lock = lockDays * SECONDS_PER_DAY
+
+    # Index of every trend flip, so "next flip after i" is one searchsorted
+    flips = np.flatnonzero(above[1:] != above[:-1]) + 1
+
+    events = []
+    # Starting state (uptrend=True, rebalanceTime=min) triggers on the first bar
+    i = 0
+    while i < n:
+        events.append(i)
+        nextFlip = np.searchsorted(flips, i, side="right")
+        nextFlip = flips[nextFlip] if nextFlip < flips.size else n
+        unlock = np.searchsorted(times, times[i] + lock, side="left")
+        i = max(min(nextFlip, unlock), i + 1)
+
+    events = np.asarray(events, dtype=np.int64)
+    return events, above[events]
+
+
+# ---------------------------------------------------------------------
+# Backtest
+# ---------------------------------------------------------------------
+class BacktestResult:
+
+    def __init__(self, times, equity, trades):
+        self.Times = times        # int64 epoch seconds
+        self.Equity = equity      # total portfolio value per bar
+        self.Trades = trades      # structured array, one row per rebalance
+
+    @property
+    def TotalReturn(self):
+        return self.Equity[-1] / self.Equity[0] - 1 if self.Equity.size else 0.0
+
+    @property
+    def MaxDrawdown(self):
+        if self.Equity.size == 0:
+            return 0.0
+        peak = np.maximum.accumulate(self.Equity)
+        return float(np.max(1 - self.Equity / peak))
+
+
+TRADE_DTYPE = np.dtype([
+    ("time", np.int64),
+    ("uptrend", bool),
+    ("spyWeight", np.float64),
+    ("bndWeight", np.float64),
+    ("spyQuantity", np.float64),
+    ("bndQuantity", np.float64),
+    ("cash", np.float64),
+])
+
+
+def RunBacktest(times, spyClose, bndClose, smaLength=30, cash=100000.0,
+                lockDays=30, feeRate=0.0, wholeShares=False, cumulative=None):
+    times = np.asarray(times, dtype=np.int64)
+    spyClose = np.asarray(spyClose, dtype=np.float64)
+    bndClose = np.asarray(bndClose, dtype=np.float64)
+
+    sma = SimpleMovingAverage(spyClose, smaLength, cumulative)
+
+    # OnData returns early until the SMA is ready
+    start = smaLength - 1
+    if start >= times.size:
+        return BacktestResult(times, np.full(times.size, float(cash)), np.empty(0, TRADE_DTYPE))
+
+    above = spyClose[start:] - sma[start:] >= -TIE_TOLERANCE * spyClose[start:]
+    events, uptrend = RebalanceEvents(times[start:], above, lockDays)
+    events = events + start
+
+    # Holdings only change at events, so walk the events and fill the
+    # per-segment holdings; the per-bar equity is then one vector expression
+    trades = np.empty(events.size, TRADE_DTYPE)
+    spyQuantity = bndQuantity = 0.0
+    balance = float(cash)
+    for k, (i, up) in enumerate(zip(events, uptrend)):
+        value = balance + spyQuantity * spyClose[i] + bndQuantity * bndClose[i]
+        spyWeight, bndWeight = UPTREND_WEIGHTS if up else DOWNTREND_WEIGHTS
+
+        newSpy = spyWeight * value / spyClose[i]
+        newBnd = bndWeight * value / bndClose[i]
+        if wholeShares:
+            newSpy, newBnd = np.floor(newSpy), np.floor(newBnd)
+
+        traded = abs(newSpy - spyQuantity) * spyClose[i] + abs(newBnd - bndQuantity) * bndClose[i]
+        balance += (spyQuantity - newSpy) * spyClose[i] + (bndQuantity - newBnd) * bndClose[i]
+        balance -= feeRate * traded
+        spyQuantity, bndQuantity = newSpy, newBnd
+
+        trades[k] = (times[i], up, spyWeight, bndWeight, spyQuantity, bndQuantity, balance)
+
+    equity = _EquityCurve(spyClose, bndClose, events, trades, cash)
+    return BacktestResult(times, equity, trades)
+
+
+def _EquityCurve(spyClose, bndClose, events, trades, cash):
+    spyQuantity = trades["spyQuantity"]
+    bndQuantity = trades["bndQuantity"]
+    balance = trades["cash"]
+
+    # Segment k covers bars [events[k], events[k+1]); bars before the first event hold cash
+    segment = np.searchsorted(events, np.arange(spyClose.size), side="right") - 1
+    invested = segment >= 0
+    segment = np.maximum(segment, 0)
+
+    equity = np.full(spyClose.size, float(cash))
+    if events.size:
+        equity[invested] = (balance[segment] + spyQuantity[segment] * spyClose
+                            + bndQuantity[segment] * bndClose)[invested]
+    return equity
+
+
+def RunSweep(times, spyClose, bndClose, lengths, **kwargs):
+    # Final return and max drawdown for every SMA length, sharing one cumulative sum
+    spyClose = np.asarray(spyClose, dtype=np.float64)
+    cumulative = Cumulative(spyClose)
+
+    lengths = np.asarray(list(lengths), dtype=np.int64)
+    totalReturn = np.empty(lengths.size)
+    maxDrawdown = np.empty(lengths.size)
+    tradeCount = np.empty(lengths.size, dtype=np.int64)
+    for k, length in enumerate(lengths):
+        result = RunBacktest(times, spyClose, bndClose, int(length), cumulative=cumulative, **kwargs)
+        totalReturn[k] = result.TotalReturn
+        maxDrawdown[k] = result.MaxDrawdown
+        tradeCount[k] = result.Trades.size
+
+    return {
+        "sma_length": lengths,
+        "total_return": totalReturn,
+        "max_drawdown": maxDrawdown,
+        "trades": tradeCount,
+    }
@@ -0,0 +1,91 @@
+# region imports
+from AlgorithmImports import *
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+# endregion
+
+"""
+Sliding-window training samples as strided views.
+
+The history is copied once into a contiguous float32 buffer of shape
+(bars, features). Window i is buffer[i:i + steps], exposed through
+sliding_window_view, so (samples, steps, features) costs no memory beyond
+the buffer no matter how long the windows are. Train/test splits are
+slices of that view, and only mini-batches are ever materialized.
+
+Usage:
+    dataset = WindowDataset.FromValues(df.values, 30, NextStepLabels(df["close"].values, 30))
+    train, test = dataset.Split(0.7)
+    model.fit(train.Batches(32, shuffle=True, repeat=True), steps_per_epoch=train.Steps(32), epochs=5)
+"""
+
+
+def Windows(values, steps, dtype=np.float32):
+    # (bars - steps + 1, steps, features) view over one contiguous copy of `values`
+    buffer = np.ascontiguousarray(values, dtype=dtype)
+    if buffer.ndim == 1:
+        buffer = buffer[:, None]
+    # sliding_window_view puts the window axis last; swap it to (samples, steps, features)
+    return sliding_window_view(buffer, steps, axis=0).transpose(0, 2, 1)
+
+
+def NextStepLabels(target, steps, dtype=np.float32):
+    # 1 if the value right after window i (target[i + steps]) is positive, else 0
+    return (np.asarray(target)[steps:] > 0).astype(dtype)
+
+
+class WindowDataset:
+
+    def __init__(self, features, labels=None):
+        # features: (samples, steps, features) windows, normally a view from Windows()
+        if labels is not None:
+            labels = np.asarray(labels)
+            # Windows without a label (the last one, for next-step labels) are left out
+            features = features[:len(labels)]
+        self.features = features
+        self.labels = labels
+
+    @staticmethod
+    def FromValues(values, steps, labels=None, dtype=np.float32):
+        return WindowDataset(Windows(values, steps, dtype), labels)
+
+    def __len__(self):
+        return len(self.features)
+
+    @property
+    def WindowShape(self):
+        # (steps, features) of a single sample, e.g. a model's input_shape
+        return self.features.shape[1:]
+
+    def Split(self, fraction):
+        # Leading `fraction` of the samples and the rest, both still views
+        cut = int(len(self) * fraction)
+        return self[:cut], self[cut:]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError("WindowDataset only slices; use Batches() for samples")
+        labels = None if self.labels is None else self.labels[index]
+        return WindowDataset(self.features[index], labels)
+
+    def Steps(self, batchSize):
+        # Batches per pass, the last one possibly short
+        return -(-len(self) // batchSize)
+
+    def Batches(self, batchSize=32, shuffle=False, seed=None, repeat=False):
+        # Yields (x, y) mini-batches, or x alone without labels; x is a fresh
+        # (batch, steps, features) array, everything else stays a view
+        rng = np.random.default_rng(seed)
+        while True:
+            order = rng.permutation(len(self)) if shuffle else None
+            for start in range(0, len(self), batchSize):
+                if order is None:
+                    rows = slice(start, start + batchSize)
+                    x = np.array(self.features[rows])
+                else:
+                    rows = order[start:start + batchSize]
+                    x = self.features[rows]
+                yield x if self.labels is None else (x, self.labels[rows])
+            if not repeat:
+                return
+
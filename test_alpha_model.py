@@ -0,0 +1,59 @@
+"""
+FundamentalFactorAlphaModel against LocalLean: the ranks follow the members'
+current fundamentals at every rebalance, not the values read when they joined.
+"""
+
+import os
+import types
+from datetime import datetime, timedelta
+
+import LocalLean
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+AlphaModel = LocalLean.LoadModule(os.path.join(HERE, "12_Alpha_Modeel.py"), "AlphaModel")
+
+TECHNOLOGY = LocalLean.MorningstarSectorCode.Technology
+
+
+def _Security(algorithm, ticker, roe, netMargin, peRatio):
+    symbol = LocalLean.Symbol(ticker)
+    security = LocalLean.Security(symbol, LocalLean.Resolution.Daily, algorithm)
+    security.Fundamentals = LocalLean.FineFundamental(symbol, sector=TECHNOLOGY, roe=roe,
+                                                      netMargin=netMargin, peRatio=peRatio)
+    return security
+
+
+def _Selected(model, algorithm):
+    return [insight.Symbol.Value for insight in model.Update(algorithm, None)]
+
+
+def test_held_member_rank_follows_new_fundamentals():
+    algorithm = types.SimpleNamespace(Time=datetime(2020, 1, 2))
+    securities = [_Security(algorithm, "AAA", 0.30, 0.20, 10.0)] + [
+        _Security(algorithm, f"S{k}", 0.05 + 0.01 * k, 0.05 + 0.01 * k, 20.0 + k) for k in range(4)]
+
+    model = AlphaModel.FundamentalFactorAlphaModel()
+    model.OnSecuritiesChanged(algorithm, LocalLean.SecurityChanges(securities))
+    assert _Selected(model, algorithm) == ["AAA"]
+
+    # A new filing makes AAA the worst of the sector while it stays in the universe
+    securities[0].Fundamentals = LocalLean.FineFundamental(securities[0].Symbol, sector=TECHNOLOGY,
+                                                           roe=-0.2, netMargin=-0.1, peRatio=80.0)
+    algorithm.Time = model.rebalanceTime + timedelta(days=1)
+    assert _Selected(model, algorithm) == ["S3"]
+
+
+def test_refresh_marks_only_given_members_stale():
+    algorithm = types.SimpleNamespace(Time=datetime(2020, 1, 2))
+    securities = [_Security(algorithm, f"S{k}", 0.1 * k, 0.1, 10.0) for k in range(3)]
+    index = AlphaModel.SectorIndex(AlphaModel.QUALITY_VALUE_FACTORS)
+    for security in securities:
+        index.Add(security)
+    assert index.Columns(TECHNOLOGY)[0].tolist() == [0.0, 0.1, 0.2]
+
+    for security in securities:
+        security.Fundamentals.OperationRatios.ROE.Value += 1
+    index.Refresh([securities[2]])
+    assert index.Columns(TECHNOLOGY)[0].tolist() == [0.0, 0.1, 1.2]
+    index.Refresh()
+    assert index.Columns(TECHNOLOGY)[0].tolist() == [1.0, 1.1, 1.2]
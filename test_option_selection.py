@@ -0,0 +1,52 @@
+"""
+OptionChainIndex against LocalLean chains: NearestStrike picks the strike
+closest to the price and, with the price exactly between two strikes, the
+lower one whatever order the chain lists the contracts in.
+"""
+
+import os
+import random
+from datetime import datetime
+
+import LocalLean
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+OptionSelection = LocalLean.LoadModule(os.path.join(HERE, "OptionSelection.py"), "OptionSelection")
+
+UNDERLYING = LocalLean.Symbol("SPY")
+EXPIRY = datetime(2021, 1, 15)
+TIME = datetime(2020, 12, 1, 10)
+
+
+def _Chain(strikes, right=LocalLean.OptionRight.Call):
+    contracts = [
+        LocalLean.OptionContract(
+            LocalLean.Symbol.CreateOption(UNDERLYING, "usa", LocalLean.OptionStyle.American,
+                                          right, strike, EXPIRY),
+            TIME, 1.0, 1.1, 100.0)
+        for strike in strikes
+    ]
+    return LocalLean.OptionChain(UNDERLYING, TIME, None, contracts)
+
+
+def _NearestStrike(strikes, price):
+    chain = _Chain(strikes)
+    index = OptionSelection.OptionChainIndex()
+    index.Sync(chain)
+    return index.NearestStrike(chain, EXPIRY, LocalLean.OptionRight.Call, price).Strike
+
+
+def test_nearest_strike_tie_takes_lower_strike_in_any_chain_order():
+    strikes = [95.0, 97.5, 100.0, 102.5, 105.0]
+    orders = [strikes, strikes[::-1]] + [random.Random(seed).sample(strikes, len(strikes)) for seed in range(5)]
+    for order in orders:
+        assert _NearestStrike(order, 101.25) == 100.0
+        assert _NearestStrike(order, 96.25) == 95.0
+
+
+def test_nearest_strike_matches_sort_by_distance():
+    # The sort BuyCall used before the index, on a strike-ordered chain
+    strikes = [90.0 + 2.5 * k for k in range(9)]
+    for price in [80.0, 90.0, 91.0, 93.7, 100.0, 101.25, 106.2, 110.0, 130.0]:
+        expected = sorted(strikes, key=lambda strike: abs(strike - price))[0]
+        assert _NearestStrike(strikes, price) == expected